@@ -0,0 +1,163 @@
+import os
+import re
+import shlex
+import subprocess
+import xml.etree.ElementTree as ET
+
+# Path to the adb binary, override to point at a specific SDK install
+ADB_PATH = os.getenv("AUTOX_ADB", "adb")
+
+
+def adb_command(*args, serial: str = None) -> list:
+    """Build an adb command line, optionally targeting a single device"""
+    command = [ADB_PATH]
+    if serial:
+        command += ["-s", serial]
+    return command + [str(arg) for arg in args]
+
+
+def run_adb(*args, serial: str = None, timeout: float = 30) -> str:
+    """Run an adb command and return its stdout"""
+    result = subprocess.run(
+        adb_command(*args, serial=serial),
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        check=True,
+    )
+    return result.stdout
+
+
+def list_devices() -> list:
+    """Return the serials of all connected devices that are ready to use"""
+    output = run_adb("devices")
+    serials = []
+    # First line is the "List of devices attached" banner
+    for line in output.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] == "device":
+            serials.append(parts[0])
+    return serials
+
+
+def parse_bounds(bounds: str) -> tuple:
+    """Parse uiautomator bounds "[x1,y1][x2,y2]" into (x1, y1, x2, y2)"""
+    numbers = re.findall(r"-?\d+", bounds or "")
+    if len(numbers) != 4:
+        return None
+    return tuple(int(n) for n in numbers)
+
+
+def dump_ui(serial: str = None) -> list:
+    """Return the nodes of the current screen as dicts with text and bounds"""
+    output = run_adb("exec-out", "uiautomator", "dump", "/dev/tty", serial=serial)
+    # The XML is followed by a "UI hierchary dumped to" message
+    xml = output[output.find("<") : output.rfind(">") + 1]
+    if not xml:
+        return []
+    nodes = []
+    for node in ET.fromstring(xml).iter("node"):
+        nodes.append(
+            {
+                "text": node.get("text", ""),
+                "description": node.get("content-desc", ""),
+                "resource_id": node.get("resource-id", ""),
+                "package": node.get("package", ""),
+                "bounds": parse_bounds(node.get("bounds")),
+            }
+        )
+    return nodes
+
+
+def screen_size(serial: str = None) -> str:
+    """Return the screen size as "WIDTHxHEIGHT", preferring an override size"""
+    output = run_adb("shell", "wm", "size", serial=serial)
+    sizes = dict(
+        line.split(":", 1) for line in output.splitlines() if ":" in line
+    )
+    size = sizes.get("Override size") or sizes.get("Physical size") or ""
+    return size.strip()
+
+
+def foreground_package(serial: str = None) -> str:
+    """Return the package of the focused window, or "" """
+    output = run_adb("shell", "dumpsys", "window", "windows", serial=serial)
+    for line in output.splitlines():
+        if "mCurrentFocus" in line or "mFocusedApp" in line:
+            match = re.search(r"\s([\w.]+)/[\w.$]+", line)
+            if match:
+                return match.group(1)
+    return ""
+
+
+def latest_image_uri(serial: str = None) -> str:
+    """Return the content:// URI of the newest image in the device gallery, or None"""
+    output = run_adb(
+        "shell",
+        "content",
+        "query",
+        "--uri",
+        "content://media/external/images/media",
+        "--projection",
+        "_id:date_added",
+        serial=serial,
+    )
+    newest = None
+    for line in output.splitlines():
+        match = re.search(r"_id=(\d+), date_added=(\d+)", line)
+        if match:
+            media_id, added = int(match.group(1)), int(match.group(2))
+            if newest is None or (added, media_id) > newest:
+                newest = (added, media_id)
+    if newest is None:
+        return None
+    return f"content://media/external/images/media/{newest[1]}"
+
+
+def share_intent(
+    package: str, text: str, media_uri: str = None, serial: str = None
+) -> str:
+    """Open an app's share target (ACTION_SEND) with text and an optional image"""
+    args = [
+        "shell",
+        "am",
+        "start",
+        "-W",
+        "-a",
+        "android.intent.action.SEND",
+        "-t",
+        "image/*" if media_uri else "text/plain",
+        # adb shell joins the arguments into one device shell command line
+        "--es",
+        "android.intent.extra.TEXT",
+        shlex.quote(text),
+    ]
+    if media_uri:
+        args += ["--eu", "android.intent.extra.STREAM", media_uri, "--grant-read-uri-permission"]
+    args += ["-p", package]
+    try:
+        return run_adb(*args, serial=serial)
+    except subprocess.CalledProcessError as e:
+        # am exits non-zero when no activity accepted the intent
+        lines = (e.stdout or e.stderr or "").strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"am start exited with {e.returncode}") from e
+
+
+def push_to_gallery(
+    local_path: str, serial: str = None, remote_dir: str = "/sdcard/Pictures/AutoX"
+) -> str:
+    """Copy an image to the device and let the media scanner add it to the gallery"""
+    remote_path = f"{remote_dir}/{os.path.basename(local_path)}"
+    run_adb("shell", "mkdir", "-p", remote_dir, serial=serial)
+    run_adb("push", local_path, remote_path, serial=serial, timeout=120)
+    run_adb(
+        "shell",
+        "am",
+        "broadcast",
+        "-a",
+        "android.intent.action.MEDIA_SCANNER_SCAN_FILE",
+        "-d",
+        f"file://{remote_path}",
+        serial=serial,
+    )
+    return remote_path
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import time
+
+from agents.llm_registry import registry
+from agents.trajectory_store import get_trajectory_store
+from budgets import (
+    TOKEN_CHECK_INTERVAL,
+    BudgetExceeded,
+    agent_limits,
+    agent_token_budget,
+)
+from telemetry import current_span, get_telemetry
+
+# Where DroidAgent writes trajectories with save_trajectories="action"
+TRAJECTORY_SOURCE_DIR = os.getenv("AUTOX_TRAJECTORY_SOURCE", "trajectories")
+
+
+async def store_trajectories(name: str, serial: str, since: float, goal: str = None):
+    """Move the trajectories an agent just saved into the trajectory store.
+
+    Only trajectories that record the agent's goal are taken, the ones of
+    agents running alongside it are left to them.
+    """
+    store = get_trajectory_store()
+    if store is None:
+        return []
+    span = current_span()
+    try:
+        return await asyncio.to_thread(
+            store.ingest_new,
+            TRAJECTORY_SOURCE_DIR,
+            since,
+            name,
+            serial,
+            span["trace_id"] if span else None,
+            goal,
+        )
+    except Exception as e:
+        print(f"Could not store trajectory of {name}: {e}")
+        return []
+
+
+async def _cancel_agent(handler, task):
+    """Stop a running agent workflow and wait until it has stopped"""
+    cancel_run = getattr(handler, "cancel_run", None)
+    if cancel_run and not task.done():
+        try:
+            await cancel_run()
+        except Exception as e:
+            print(f"Could not cancel the agent cleanly: {e}")
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def run_within_budget(agent, name: str, span: dict) -> dict:
+    """Run an agent, cancelling it once its span used up the token budget.
+
+    A stage deadline cancels the caller, which cancels the agent too.
+    """
+    max_tokens = agent_token_budget()
+    handler = agent.run()
+    task = asyncio.ensure_future(handler)
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                {task}, timeout=TOKEN_CHECK_INTERVAL if max_tokens else None
+            )
+            if done:
+                return task.result()
+            used = span["prompt_tokens"] + span["completion_tokens"]
+            if used > max_tokens:
+                span["budget_exceeded"] = "tokens"
+                raise BudgetExceeded(
+                    f"{name} used {used} tokens, the budget is {max_tokens}"
+                )
+    except BaseException:
+        await _cancel_agent(handler, task)
+        raise
+
+
+async def run_agent(agent, name: str, model: str, serial: str = None) -> dict:
+    """Run a DroidAgent inside an agent span and return its result.
+
+    The ids of the stored trajectories are added as "trajectory_ids".
+    """
+    started = time.time()
+    result = None
+    try:
+        async with registry.track(model), get_telemetry().span(
+            name, "agent", model=model, serial=serial
+        ) as span:
+            result = await run_within_budget(agent, name, span)
+            span["steps"] = result.get("steps")
+            span["success"] = result.get("success")
+            steps = result.get("steps") or 0
+            if not result.get("success") and steps >= agent_limits()["max_steps"]:
+                span["budget_exceeded"] = "steps"
+    finally:
+        trajectory_ids = await store_trajectories(
+            name, serial, started, getattr(agent, "goal", None)
+        )
+        if result is not None:
+            result["trajectory_ids"] = trajectory_ids
+    return result
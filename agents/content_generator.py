@@ -1,99 +1,350 @@
 #!/usr/bin/env python3
+import asyncio
+import json
 import os
-from llama_index.llms.google_genai import GoogleGenAI
+import re
+from agents.duplicate_index import get_duplicate_index
+from agents.generation_cache import get_generation_cache, template_hash
+from agents.llm_registry import get_llm, registry
+from agents.model_router import model_key, route
+from agents.prompts.prompts import (
+    CREATE_IMAGE_PROMPT_FROM_TREND_PROMPT,
+    CREATE_IMAGE_PROMPT_PROMPT,
+    CREATE_POST_AND_IMAGE_PROMPT,
+    CREATE_TWITTER_POST_CANDIDATES_PROMPT,
+    CREATE_TWITTER_POST_PROMPT,
+)
+from agents.stopwords import STOPWORDS
+from agents.tweet_validator import TweetValidator
 from dotenv import load_dotenv
+from telemetry import get_telemetry
 
-load_dotenv()
+# sequential: image prompt is generated from the finished post (two round-trips)
+# concurrent: image prompt is generated from the trend alone, in parallel
+# structured: one LLM call returns both the post and the image prompt
+CONTENT_MODES = ("sequential", "concurrent", "structured")
+
+
+def _keywords(text: str) -> set:
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    return {word for word in words if len(word) > 2 and word not in STOPWORDS}
+
+
+def prompt_matches_post(
+    image_prompt: str, twitter_post: str, trending_topic: str, min_overlap: int = 2
+) -> bool:
+    """Check that an image prompt generated without the post still fits it.
+
+    The prompt has to name the trend and share a few keywords with the post.
+    """
+    prompt_words = _keywords(image_prompt)
+    trend_words = _keywords(trending_topic)
+    if trend_words and not trend_words & prompt_words:
+        return False
+    shared = (_keywords(twitter_post) - trend_words) & prompt_words
+    return len(shared) >= min_overlap
+
+
+def _parse_json_output(text: str) -> dict:
+    """Parse a JSON object from an LLM reply, tolerating markdown fences"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text)
+    return json.loads(text)
+
+
+def parse_structured_content(text: str):
+    """Return (twitter_post, image_prompt) from a structured reply, or None"""
+    try:
+        content = _parse_json_output(text)
+        twitter_post = content["twitter_post"].strip()
+        image_prompt = content["image_prompt"].strip()
+    except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+        return None
+    if not twitter_post or not image_prompt:
+        return None
+    return twitter_post, image_prompt
+
+
+def parse_tweet_candidates(text: str) -> list:
+    """Return the candidate tweets of a candidates reply, or []"""
+    try:
+        candidates = _parse_json_output(text)["candidates"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return []
+    if not isinstance(candidates, list):
+        return []
+    return [c.strip() for c in candidates if isinstance(c, str) and c.strip()]
 
 
 class ContentGenerator:
-    def __init__(self):
-        self.llm = GoogleGenAI(
-            api_key=os.getenv("GEMINI_API_KEY"),
-            model="gemini-2.5-flash",
+    def __init__(self, mode: str = None, cache=None, validator=None):
+        self.mode = mode or os.getenv("AUTOX_CONTENT_MODE", "sequential")
+        if self.mode not in CONTENT_MODES:
+            raise ValueError(
+                f"Unknown content mode {self.mode!r}, expected one of {CONTENT_MODES}"
+            )
+        self.cache = cache if cache is not None else get_generation_cache()
+        self.validator = validator or TweetValidator()
+        # Tweets asked for in one call, 1 uses the single-tweet prompt
+        self.candidates = int(os.getenv("AUTOX_TWEET_CANDIDATES", "3"))
+        self.attempts = int(os.getenv("AUTOX_TWEET_ATTEMPTS", "2"))
+        self.duplicates = get_duplicate_index()
+
+    def _is_duplicate(self, text: str, kind: str) -> bool:
+        """Check a text against everything posted before"""
+        if self.duplicates is None:
+            return False
+        match = self.duplicates.find(text, kind)
+        if match is None:
+            return False
+        print(
+            f"Near duplicate ({match['similarity']:.0%} similar) of a {kind} "
+            f"from run {match['run_id']}: {match['text'][:80]}"
         )
+        return True
+
+    def _cache_key(self, template, trending_topic: str, category: str, extra: str = ""):
+        if not self.cache:
+            return None
+        task = template.__name__
+        return self.cache.make_key(
+            task,
+            trending_topic,
+            category,
+            model_key(task),
+            template_hash(template),
+            extra,
+        )
+
+    async def _complete(
+        self,
+        template,
+        args: tuple,
+        trending_topic: str,
+        category: str,
+        extra: str = "",
+        accept=None,
+        fresh: bool = False,
+        store: bool = True,
+    ) -> str:
+        """Complete a prompt template, serving repeated trends from the cache.
+
+        accept(text) can reject a reply so that it is not cached, fresh=True
+        skips the cache lookup and store=False leaves caching the reply to
+        the caller, for replies that can only be checked later.
+        """
+        telemetry = get_telemetry()
+        task = template.__name__
+        async with telemetry.span(task, "llm") as span:
+            key = self._cache_key(template, trending_topic, category, extra)
+            if key:
+                cached = None if fresh else self.cache.get(key)
+                span["cache_hit"] = cached is not None
+                if cached is not None:
+                    return cached
+
+            async def call(model):
+                span["model"] = model
+                async with registry.limit(), registry.track(model):
+                    response = await get_llm(model).acomplete(template(*args))
+                telemetry.record_llm_usage(response, span)
+                return response.text.strip()
+
+            # A reply accept() rejects counts as a failure of the model
+            text = await route(
+                task, call, lambda text: text and (accept is None or accept(text))
+            )
+        if store and key and text and (accept is None or accept(text)):
+            self.cache.put(key, text)
+        return text
 
     async def generate_twitter_post(
         self, trending_topic: str, description: str = "", category: str = ""
     ) -> str:
-        """Generate a Twitter post based on trending topic"""
-        prompt = f"""{trending_topic} is trending now. Create a trendy, cringe post about droidrun relating to it. This post needs to be posted on twitter, and it should be less than 250 characters long. It should not sound like an advertisement. it should start with a small clickbait story, but a twist should come and it should be reach gracefully about droidrun at end. 
-        
-        category: {category}
-        
-        About Droidrun
-          DroidRun is a powerful framework for controlling Android and iOS devices through LLM agents. It allows you to automate device interactions using natural language commands. Droidrun is the topmost android use agent according to android world benchmark 
-          Why Droidrun?
-            🤖 Control Android and iOS devices with natural language commands 
-            🔀 Supports multiple LLM providers (OpenAI, Anthropic, Gemini, Ollama, DeepSeek) 
-            🧠 Planning capabilities for complex multi-step tasks 
-            💻 Easy to use CLI with enhanced debugging features 
-            🐍 Extendable Python API for custom automations 
-            📸 Screenshot analysis for visual understanding of the device 
-            🫆 Execution tracing with Arize Phoenix
-        
-        Requirements:
-        - Keep it under 250 characters
-        - Emojis are considered of 2 character length
-        - Make it engaging and shareable
-        - Include relevant hashtags (2-3 max)
-        - Use trending/popular tone
-        - Don't include quotes around the final output
-        
-
-        Make sure the tweet is strictly less than 250 characters.
-        Return only the tweet content, nothing else.
-        """
+        """Generate a Twitter post based on trending topic.
 
-        response = await self.llm.acomplete(prompt)
-        return response.text.strip()
+        Several candidates come from one LLM call. They are checked locally
+        for length, hashtags and banned phrases and the best valid one is
+        returned; a new batch is only requested when every candidate fails.
+        """
+        for attempt in range(self.attempts):
+            if attempt:
+                get_telemetry().count_retry("tweet_validation")
+            if self.candidates > 1:
+                text = await self._complete(
+                    CREATE_TWITTER_POST_CANDIDATES_PROMPT,
+                    (trending_topic, category, self.candidates),
+                    trending_topic,
+                    category,
+                    extra=str(self.candidates),
+                    accept=lambda text: bool(
+                        self.validator.rank(parse_tweet_candidates(text))
+                    ),
+                    fresh=attempt > 0,
+                )
+                candidates = parse_tweet_candidates(text)
+            else:
+                text = await self._complete(
+                    CREATE_TWITTER_POST_PROMPT,
+                    (trending_topic, category),
+                    trending_topic,
+                    category,
+                    accept=lambda text: not self.validator.problems(text),
+                    fresh=attempt > 0,
+                )
+                candidates = [text]
+            ranked = self.validator.rank(candidates, trending_topic)
+            for candidate in ranked:
+                if not self._is_duplicate(candidate, "post"):
+                    return candidate
+            if ranked:
+                print("Every valid candidate repeats an earlier post")
+                continue
+            reasons = (
+                "; ".join(", ".join(self.validator.problems(c)) for c in candidates)
+                or "no candidates in the reply"
+            )
+            print(f"No valid tweet among {len(candidates)} candidates: {reasons}")
+        raise ValueError(f"No valid tweet after {self.attempts} attempts")
 
     async def generate_image_prompt(
-        self, trending_topic: str, twitter_post: str
+        self, trending_topic: str, twitter_post: str, fresh: bool = False
     ) -> str:
         """Generate an image prompt for the trending topic"""
-        prompt = f"""{trending_topic} is trending now. Create a trendy clickbait image prompt about it for AI image generator. This image needs to be posted on twitter. It should not look like an advertisement, it would be better if it is some illustration, comic or drawing. For context the text captions to be posted with the image is:
-        {twitter_post}
-        
-        About Droidrun
-          DroidRun is a powerful framework for controlling Android and iOS devices through LLM agents. It allows you to automate device interactions using natural language commands. Droidrun is the topmost android usee agent according to android world benchmark 
-          Why Droidrun?
-            🤖 Control Android and iOS devices with natural language commands 
-            🔀 Supports multiple LLM providers (OpenAI, Anthropic, Gemini, Ollama, DeepSeek) 
-            🧠 Planning capabilities for complex multi-step tasks 
-            💻 Easy to use CLI with enhanced debugging features 
-            🐍 Extendable Python API for custom automations 
-            📸 Screenshot analysis for visual understanding of the device 
-            🫆 Execution tracing with Arize Phoenix
-        
-        Requirements:
-        - Make it visually appealing and relevant to the topic
-        - Include style descriptors (e.g., modern, colorful, professional)
-        - Specify image composition and elements
-        - Keep it concise but descriptive
-        - Make it suitable for social media sharing
-        - Don't include quotes around the final output
-        
-        Make sure to create one of illustration, comic style or drawing. Also mention style and instruction in prompt.
-        Return only the image prompt, nothing else.
-        """
+        return await self._complete(
+            CREATE_IMAGE_PROMPT_PROMPT,
+            (trending_topic, twitter_post),
+            trending_topic,
+            "",
+            extra=twitter_post,
+            fresh=fresh,
+        )
+
+    async def generate_image_prompt_from_trend(
+        self,
+        trending_topic: str,
+        description: str = "",
+        category: str = "",
+        store: bool = True,
+    ) -> str:
+        """Generate an image prompt from the trend alone, without the post"""
+        return await self._complete(
+            CREATE_IMAGE_PROMPT_FROM_TREND_PROMPT,
+            (trending_topic, description, category),
+            trending_topic,
+            category,
+            extra=description,
+            store=store,
+        )
+
+    async def _generate_sequential(self, trending_topic, description, category):
+        twitter_post = await self.generate_twitter_post(
+            trending_topic, description, category
+        )
+        image_prompt = await self.generate_image_prompt(trending_topic, twitter_post)
+        return twitter_post, image_prompt
 
-        response = await self.llm.acomplete(prompt)
-        return response.text.strip()
+    async def _generate_concurrent(self, trending_topic, description, category):
+        # Start the image prompt speculatively while the post is written; it
+        # is only cached once it turned out to fit the post
+        twitter_post, image_prompt = await asyncio.gather(
+            self.generate_twitter_post(trending_topic, description, category),
+            self.generate_image_prompt_from_trend(
+                trending_topic, description, category, store=False
+            ),
+            return_exceptions=True,
+        )
+        if isinstance(twitter_post, Exception):
+            raise twitter_post
+        if isinstance(image_prompt, Exception) or not prompt_matches_post(
+            image_prompt, twitter_post, trending_topic
+        ):
+            print("Speculative image prompt does not fit the post, regenerating")
+            get_telemetry().count_retry("image_prompt_mismatch")
+            image_prompt = await self.generate_image_prompt(
+                trending_topic, twitter_post
+            )
+        elif image_prompt:
+            key = self._cache_key(
+                CREATE_IMAGE_PROMPT_FROM_TREND_PROMPT,
+                trending_topic,
+                category,
+                description,
+            )
+            if key:
+                self.cache.put(key, image_prompt)
+        return twitter_post, image_prompt
+
+    async def _generate_structured(self, trending_topic, description, category):
+        text = await self._complete(
+            CREATE_POST_AND_IMAGE_PROMPT,
+            (trending_topic, description, category),
+            trending_topic,
+            category,
+            extra=description,
+            accept=lambda text: bool(self._valid_structured(text)),
+        )
+        content = parse_structured_content(text)
+        if not content:
+            print(f"Could not parse structured content: {text}")
+            get_telemetry().count_retry("structured_parse")
+            return await self._generate_sequential(
+                trending_topic, description, category
+            )
+        problems = self.validator.problems(content[0])
+        if problems:
+            print(
+                f"Structured tweet is not valid ({', '.join(problems)}), regenerating"
+            )
+            get_telemetry().count_retry("tweet_validation")
+            return await self._generate_sequential(
+                trending_topic, description, category
+            )
+        if self._is_duplicate(content[0], "post"):
+            get_telemetry().count_retry("duplicate_post")
+            return await self._generate_sequential(
+                trending_topic, description, category
+            )
+        return content
 
-    async def generate_content_from_trend(self, trend_data: dict) -> dict:
+    def _valid_structured(self, text: str):
+        content = parse_structured_content(text)
+        if content and not self.validator.problems(content[0]):
+            return content
+        return None
+
+    async def generate_content_from_trend(
+        self, trend_data: dict, use_prefetched: bool = True
+    ) -> dict:
         """Generate both Twitter post and image prompt from trend data"""
         trending_topic = trend_data.get("trending_topic", "")
         description = trend_data.get("description", "")
         category = trend_data.get("category", "")
 
-        # Generate Twitter post
-        twitter_post = await self.generate_twitter_post(
+        if use_prefetched and self.cache:
+            content = self.cache.take_prefetched(trending_topic)
+            # Something similar may have been posted since it was generated
+            if content and not self._is_duplicate(content["twitter_post"], "post"):
+                print(f"Using content prefetched for {trending_topic}")
+                content["original_trend"] = trend_data
+                return content
+
+        if self.mode == "concurrent":
+            generate = self._generate_concurrent
+        elif self.mode == "structured":
+            generate = self._generate_structured
+        else:
+            generate = self._generate_sequential
+
+        twitter_post, image_prompt = await generate(
             trending_topic, description, category
         )
-
-        # Generate image prompt
-        image_prompt = await self.generate_image_prompt(trending_topic, twitter_post)
+        if self._is_duplicate(image_prompt, "image_prompt"):
+            get_telemetry().count_retry("duplicate_image_prompt")
+            image_prompt = await self.generate_image_prompt(
+                trending_topic, twitter_post, fresh=True
+            )
 
         return {
             "twitter_post": twitter_post,
@@ -101,6 +352,33 @@ class ContentGenerator:
             "original_trend": trend_data,
         }
 
+    async def prefetch(self, trends: list) -> int:
+        """Generate content for trends that later runs will claim.
+
+        All trends are generated concurrently, bounded by the LLM
+        concurrency limit, and kept in the generation cache until a run
+        claims the trend. Returns how many were stored.
+        """
+        if not self.cache or not trends:
+            return 0
+        results = await asyncio.gather(
+            *(
+                self.generate_content_from_trend(trend, use_prefetched=False)
+                for trend in trends
+            ),
+            return_exceptions=True,
+        )
+        stored = 0
+        for trend, content in zip(trends, results):
+            if isinstance(content, Exception):
+                print(
+                    f"Could not prefetch content for {trend.get('trending_topic')}: {content}"
+                )
+                continue
+            self.cache.put_prefetched(trend.get("trending_topic", ""), content)
+            stored += 1
+        return stored
+
 
 async def test_content_generator():
     """Test function for the content generator"""
@@ -120,6 +398,5 @@ async def test_content_generator():
 
 
 if __name__ == "__main__":
-    import asyncio
-
+    load_dotenv()
     asyncio.run(test_content_generator())
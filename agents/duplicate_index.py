@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from array import array
+
+from agents.stopwords import STOPWORDS
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.getenv("AUTOX_STATE_DIR", ".autox"), "duplicate_index.sqlite3"
+)
+
+PERMUTATIONS = 64
+# 32 bands of 2 rows: a pair at the default threshold (Jaccard 0.5) shares a
+# band 99.99% of the time, 0.3 95%, so near duplicates are always candidates;
+# their similarity is then estimated from the full signatures
+BANDS = 32
+_UNPACK = struct.Struct(f"<{PERMUTATIONS}I").unpack
+# Two-row bands of common words collect thousands of documents. A lookup
+# reads only the newest BUCKET_LIMIT documents of each band, and only those
+# sharing MIN_BAND_HITS bands (a pair at Jaccard 0.5 shares 8 on average)
+# have their similarity estimated, so its cost does not grow with the index
+BUCKET_LIMIT = 16
+MIN_BAND_HITS = 3
+# Candidates sharing the most bands that get their similarity estimated
+MAX_CANDIDATES = 50
+
+
+def _slot_hashes(shingle: str) -> tuple:
+    """One 32-bit hash per signature slot from a single SHAKE digest"""
+    return _UNPACK(hashlib.shake_128(shingle.encode()).digest(4 * PERMUTATIONS))
+
+
+def shingles(text: str) -> set:
+    """Words and word pairs of a text, without stopwords"""
+    words = [w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS]
+    pairs = {f"{a} {b}" for a, b in zip(words, words[1:])}
+    return set(words) | pairs
+
+
+class DuplicateIndex:
+    """MinHash/LSH index of every tweet and image prompt that was posted.
+
+    Each text gets a MinHash signature over its words and word pairs. The
+    signature is cut into bands and every band is a bucket key in SQLite,
+    so a lookup reads only the texts that share a bucket with the new one
+    (never the whole history) and estimates their Jaccard similarity from
+    the signatures. A lookup costs one query over at most BANDS *
+    BUCKET_LIMIT bucket rows however many posts are stored.
+    """
+
+    def __init__(self, path: str = None, threshold: float = None):
+        self.path = path or os.getenv("AUTOX_DUPLICATE_INDEX_PATH", DEFAULT_INDEX_PATH)
+        self.threshold = threshold if threshold is not None else float(
+            os.getenv("AUTOX_DUPLICATE_THRESHOLD", "0.5")
+        )
+        self._rows = PERMUTATIONS // BANDS
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                text TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                run_id TEXT,
+                created_at REAL NOT NULL
+            )"""
+        )
+        # Clustered by bucket, so the newest documents of a bucket are one seek
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS buckets (
+                bucket INTEGER NOT NULL,
+                document_id INTEGER NOT NULL,
+                PRIMARY KEY (bucket, document_id)
+            ) WITHOUT ROWID"""
+        )
+        self._db.commit()
+
+    def signature(self, text: str) -> array:
+        """MinHash signature of a text, None when it has no words to compare"""
+        hashes = [_slot_hashes(shingle) for shingle in shingles(text)]
+        if not hashes:
+            return None
+        # Slot i keeps the smallest i-th hash, i.e. 64 independent min-hashes
+        return array("q", map(min, zip(*hashes)))
+
+    def _buckets(self, kind: str, signature: array) -> list:
+        buckets = []
+        for band in range(BANDS):
+            values = signature[band * self._rows:(band + 1) * self._rows]
+            key = f"{kind}:{band}:".encode() + values.tobytes()
+            digest = hashlib.blake2b(key, digest_size=8).digest()
+            # SQLite integers are signed 64-bit
+            buckets.append(int.from_bytes(digest, "big", signed=True))
+        return buckets
+
+    def find(self, text: str, kind: str = "post"):
+        """Return the most similar indexed text of a kind, or None below the threshold"""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        buckets = self._buckets(kind, signature)
+        bands = " UNION ALL ".join(
+            ["SELECT * FROM (SELECT document_id FROM buckets WHERE bucket = ? "
+             "ORDER BY document_id DESC LIMIT ?)"] * len(buckets)
+        )
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT d.id, d.text, d.signature, d.run_id, d.created_at "
+                "FROM documents d JOIN ("
+                f"  SELECT document_id, COUNT(*) AS hits FROM ({bands})"
+                "   GROUP BY document_id HAVING hits >= ? ORDER BY hits DESC LIMIT ?"
+                ") c ON c.document_id = d.id",
+                (
+                    *[arg for bucket in buckets for arg in (bucket, BUCKET_LIMIT)],
+                    MIN_BAND_HITS,
+                    MAX_CANDIDATES,
+                ),
+            ).fetchall()
+        best = None
+        for document_id, other_text, blob, run_id, created_at in rows:
+            other = array("q")
+            other.frombytes(blob)
+            similarity = sum(x == y for x, y in zip(signature, other)) / PERMUTATIONS
+            if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                best = {
+                    "id": document_id,
+                    "text": other_text,
+                    "similarity": similarity,
+                    "run_id": run_id,
+                    "created_at": created_at,
+                }
+        return best
+
+    def add(self, text: str, kind: str = "post", run_id: str = None, created_at: float = None):
+        """Index a posted text"""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        buckets = self._buckets(kind, signature)
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO documents (kind, text, signature, run_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (kind, text, signature.tobytes(), run_id, created_at or time.time()),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO buckets (bucket, document_id) VALUES (?, ?)",
+                [(bucket, cursor.lastrowid) for bucket in buckets],
+            )
+            self._db.commit()
+        return cursor.lastrowid
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def backfill(self, records) -> int:
+        """Index the posts and image prompts of run history records"""
+        added = 0
+        for record in records:
+            for kind in ("post", "image_prompt"):
+                text = record.get("twitter_post" if kind == "post" else "image_prompt")
+                if text and (kind == "post" or record.get("image_generated")):
+                    self.add(text, kind, record.get("run_id"))
+                    added += 1
+        return added
+
+
+_default_index = None
+
+
+def get_duplicate_index():
+    """Return the shared duplicate index, or None when AUTOX_DUPLICATE_CHECK=0"""
+    global _default_index
+    if os.getenv("AUTOX_DUPLICATE_CHECK", "1").lower() in ("0", "false", "no"):
+        return None
+    if _default_index is None:
+        _default_index = DuplicateIndex()
+        if _default_index.count() == 0:
+            # First start: index everything the run history says was posted
+            from run_store import get_run_store
+
+            added = _default_index.backfill(get_run_store().query(outcome="posted"))
+            if added:
+                print(f"Indexed {added} posts and image prompts from the run history")
+    return _default_index
@@ -1,65 +1,142 @@
 #!/usr/bin/env python3
 import asyncio
 import json
+import os
 import re
-from droidrun import AdbTools, DroidAgent
-from llama_index.llms.google_genai import GoogleGenAI
+from agents.agent_runner import run_agent
+from agents.llm_registry import get_llm
+from agents.model_router import route
 from agents.prompts.prompts import OPEN_CHROME_GOOGLE_TRENDS_GOAL
+from agents.trend_cache import get_trend_cache
+from agents.trend_sources import get_trend_source
+from budgets import agent_limits
 from dotenv import load_dotenv
-import os
 
-load_dotenv()
 
+def parse_trends(text: str) -> list:
+    """Parse the agent's trend list, a single trend object is a list of one"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text)
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("trends", [data])
+    return [
+        trend
+        for trend in data
+        if isinstance(trend, dict) and trend.get("trending_topic")
+    ]
 
-async def find_trend():
-    """Find trending topics using Chrome and Google Trends"""
-    # Load adb tools for the first connected device
-    tools = AdbTools()
 
-    # Set up the Gemini LLM
-    llm = GoogleGenAI(
-        api_key=os.getenv("GEMINI_API_KEY"),
-        model="gemini-2.5-pro",
-    )
+def _parsed_trends(result: dict, count: int) -> list:
+    """The trends of an agent result, an empty list when there are none"""
+    try:
+        return parse_trends(result["output"])[:count] if result.get("output") else []
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        return []
+
+
+async def find_trend(serial: str = None, on_fetch=None):
+    """Find the top trending topic that has not been posted about yet.
+
+    on_fetch(trends, trend_data) is called when this call fetched a new
+    trend list into the trend cache, so the caller can prepare content for
+    the trends that later runs will claim.
+    """
+    source = get_trend_source()
+    cache = get_trend_cache()
+
+    if cache is None:
+        trends = await source.fetch(serial)
+        trend_data = trends[0] if trends else None
+    else:
+        # Reuse a fresh list from an earlier or concurrent run. When all of
+        # its trends are claimed or posted there is nothing new until it
+        # expires, fetching again would return the same list
+        trends, _ = cache.get_trends()
+        if trends is not None:
+            trend_data = cache.claim_next(trends)
+        else:
+            async with cache.refresh_lock():
+                # Another run may have fetched while we waited for the lock
+                trends, _ = cache.get_trends()
+                fetched = trends is None
+                if fetched:
+                    trends = await source.fetch(serial)
+                    if trends:
+                        cache.put_trends(trends)
+            trend_data = cache.claim_next(trends) if trends else None
+            if fetched and trend_data and on_fetch:
+                on_fetch(trends, trend_data)
+
+    if not trend_data:
+        print("No new trending topic found, current trends were already posted")
+        return None
+    print(f"Found trending topic: {trend_data.get('trending_topic', 'Unknown')}")
+    return trend_data
 
-    # Create the DroidAgent
-    agent = DroidAgent(
-        goal=OPEN_CHROME_GOOGLE_TRENDS_GOAL(),
-        llm=llm,
-        tools=tools,
-        enable_tracing=True,
-        save_trajectories="action",
-        reasoning=True,
-        vision=True,
+
+async def find_trend_with_agent(serial: str = None):
+    """Find the top trending topic using Chrome and Google Trends"""
+    trends = await find_trends_with_agent(serial)
+    return trends[0] if trends else None
+
+
+async def find_trends_with_agent(serial: str = None, count: int = None):
+    """Read the top `count` trends from Google Trends in Chrome, in one agent run"""
+    count = count or int(os.getenv("AUTOX_TREND_TOP_K", "5"))
+    # droidrun is slow to import, load it only when an agent actually runs
+    from droidrun import AdbTools, DroidAgent
+
+    # Load adb tools for the leased device (first connected one if no serial)
+    tools = AdbTools(serial=serial)
+
+    async def attempt(model):
+        # Shared Gemini client, reused across runs
+        agent = DroidAgent(
+            goal=OPEN_CHROME_GOOGLE_TRENDS_GOAL(count),
+            llm=get_llm(model),
+            tools=tools,
+            enable_tracing=True,
+            save_trajectories="action",
+            reasoning=True,
+            vision=True,
+            **agent_limits(),
+        )
+        return await run_agent(agent, "find_trend", model, serial)
+
+    # A run that returned no parsable trends escalates to a bigger model
+    result = await route(
+        "find_trend", attempt, lambda result: _parsed_trends(result, count)
     )
-    # Run the agent
-    result = await agent.run()
     print(f"Trend finder - Success: {result['success']}")
 
     if result.get("output"):
-        try:
-            # Parse the JSON output
-            trend_data = json.loads(result["output"])
-            print(
-                f"Found trending topic: {trend_data.get('trending_topic', 'Unknown')}"
-            )
-            return trend_data
-        except json.JSONDecodeError:
-            print(f"Could not parse trend data: {result['output']}")
-            # Return a fallback trend
-            return {
+        trends = _parsed_trends(result, count)
+        if trends:
+            topics = ", ".join(trend["trending_topic"] for trend in trends)
+            print(f"Found {len(trends)} trending topics: {topics}")
+            return trends
+        print(f"Could not parse trend data: {result['output']}")
+        # Return a fallback trend
+        return [
+            {
                 "trending_topic": "Latest Technology Trends",
                 "description": "Current technology trends and innovations",
                 "category": "Technology",
             }
+        ]
     else:
         print("No trend data found, using fallback")
-        return {
-            "trending_topic": "Daily Tech News",
-            "description": "Latest technology news and updates",
-            "category": "Technology",
-        }
+        return [
+            {
+                "trending_topic": "Daily Tech News",
+                "description": "Latest technology news and updates",
+                "category": "Technology",
+            }
+        ]
 
 
 if __name__ == "__main__":
+    load_dotenv()
     asyncio.run(find_trend())
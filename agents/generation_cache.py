@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+import hashlib
+import inspect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.getenv("AUTOX_STATE_DIR", ".autox"), "generation_cache.sqlite3"
+)
+
+
+def normalize_trend(trending_topic: str) -> str:
+    """Normalize a trend so "AFG vs BAN!" and "afg  vs ban" share a cache key"""
+    return " ".join(re.findall(r"\w+", trending_topic.lower()))
+
+
+def template_hash(prompt_fn) -> str:
+    """Hash a prompt template by rendering it with placeholder arguments.
+
+    Any edit to the prompt text changes the hash, which invalidates every
+    cached generation made with the old template.
+    """
+    placeholders = [
+        "{%s}" % name for name in inspect.signature(prompt_fn).parameters
+    ]
+    rendered = prompt_fn(*placeholders)
+    return hashlib.sha256(rendered.encode()).hexdigest()[:16]
+
+
+class GenerationCache:
+    """On-disk cache of LLM generations with TTL and LRU eviction.
+
+    Lookups miss until `variants` generations were stored for a key, then
+    serve the distinct ones in least recently used order, so a trend that
+    keeps coming back does not always get the same post. A model that
+    returns the same text every time counts every repeat, so its key is
+    served from the cache too.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        ttl: float = None,
+        max_entries: int = None,
+        variants: int = None,
+    ):
+        self.path = path or os.getenv("AUTOX_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.ttl = ttl if ttl is not None else float(os.getenv("AUTOX_CACHE_TTL", "259200"))
+        self.max_entries = max_entries or int(os.getenv("AUTOX_CACHE_MAX_ENTRIES", "5000"))
+        self.variants = max(1, variants or int(os.getenv("AUTOX_CACHE_VARIANTS", "3")))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS generations (
+                cache_key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                puts INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (cache_key, value)
+            )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS generations_last_used ON generations (last_used)"
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS prefetched (
+                topic_key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(
+        kind: str,
+        trending_topic: str,
+        category: str,
+        model: str,
+        prompt_hash: str,
+        extra: str = "",
+    ) -> str:
+        """Build the cache key of one kind of generation"""
+        parts = [
+            kind,
+            normalize_trend(trending_topic),
+            normalize_trend(category or ""),
+            model,
+            prompt_hash,
+            hashlib.sha256(extra.encode()).hexdigest()[:16] if extra else "",
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+    def get(self, key: str):
+        """Return a cached variant for key, or None when a new one should be generated"""
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT value FROM generations WHERE cache_key = ? AND created_at > ? "
+                "ORDER BY last_used LIMIT ?",
+                (key, now - self.ttl, self.variants),
+            ).fetchall()
+            count = self._db.execute(
+                "SELECT COALESCE(SUM(puts), 0) FROM generations "
+                "WHERE cache_key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()[0]
+            if count < self.variants:
+                self.misses += 1
+                return None
+            value = rows[0][0]
+            self._db.execute(
+                "UPDATE generations SET last_used = ? WHERE cache_key = ? AND value = ?",
+                (now, key, value),
+            )
+            self._db.commit()
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        """Store a generation as one more variant of key, a repeat counts again"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO generations (cache_key, value, created_at, last_used) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (cache_key, value) DO UPDATE SET "
+                "created_at = excluded.created_at, last_used = excluded.last_used, "
+                "puts = puts + 1",
+                (key, value, now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def put_prefetched(self, trending_topic: str, content: dict):
+        """Keep content generated ahead of time for the run that claims the trend"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO prefetched VALUES (?, ?, ?)",
+                (normalize_trend(trending_topic), json.dumps(content), time.time()),
+            )
+            self._db.commit()
+
+    def take_prefetched(self, trending_topic: str):
+        """Remove and return the prefetched content of a trend, or None"""
+        key = normalize_trend(trending_topic)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content, created_at FROM prefetched WHERE topic_key = ? AND created_at > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            # Only the run whose delete removed the row gets the content
+            deleted = self._db.execute(
+                "DELETE FROM prefetched WHERE topic_key = ? AND created_at = ?",
+                (key, row[1]),
+            ).rowcount
+            self._db.commit()
+        return json.loads(row[0]) if deleted else None
+
+    def _evict(self, now: float):
+        self._db.execute(
+            "DELETE FROM generations WHERE created_at <= ?", (now - self.ttl,)
+        )
+        self._db.execute("DELETE FROM prefetched WHERE created_at <= ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM generations WHERE rowid IN ("
+            "SELECT rowid FROM generations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        """Drop every cached generation"""
+        with self._lock:
+            self._db.execute("DELETE FROM generations")
+            self._db.execute("DELETE FROM prefetched")
+            self._db.commit()
+
+
+_default_cache = None
+
+
+def get_generation_cache():
+    """Return the shared cache, or None when AUTOX_GENERATION_CACHE=0"""
+    global _default_cache
+    if os.getenv("AUTOX_GENERATION_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    if _default_cache is None:
+        _default_cache = GenerationCache()
+    return _default_cache
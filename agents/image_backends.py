@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+import urllib.request
+
+from adb_helper import push_to_gallery
+from telemetry import get_telemetry
+
+DEFAULT_IMAGE_API_URL = (
+    "https://generativelanguage.googleapis.com/v1beta/models/"
+    "gemini-2.5-flash-image:generateContent"
+)
+DEFAULT_ARCHIVE_DIR = os.path.join(os.getenv("AUTOX_STATE_DIR", ".autox"), "images")
+
+EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+
+def parse_image_response(body: bytes, content_type: str) -> tuple:
+    """Return (image bytes, mime type) from an image API response.
+
+    Accepts a raw image body, the Gemini generateContent format
+    (inlineData parts) and the {"data": [{"b64_json": ...}]} format.
+    """
+    content_type = (content_type or "").split(";")[0].strip()
+    if content_type.startswith("image/"):
+        return body, content_type
+    data = json.loads(body)
+    for candidate in data.get("candidates", []):
+        for part in candidate.get("content", {}).get("parts", []):
+            inline = part.get("inlineData") or part.get("inline_data")
+            if inline and inline.get("data"):
+                mime_type = inline.get("mimeType") or inline.get("mime_type") or "image/png"
+                return base64.b64decode(inline["data"]), mime_type
+    for item in data.get("data", []):
+        if item.get("b64_json"):
+            return base64.b64decode(item["b64_json"]), "image/png"
+    raise ValueError("no image in the API response")
+
+
+def archive_image(image: bytes, mime_type: str, image_prompt: str, directory: str) -> str:
+    """Save a generated image on the host and append it to the archive index"""
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256(image).hexdigest()
+    name = f"autox-{time.strftime('%Y%m%d-%H%M%S')}-{digest[:12]}.{EXTENSIONS.get(mime_type, 'png')}"
+    path = os.path.join(directory, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(image)
+    os.replace(tmp_path, path)
+    record = {
+        "created_at": time.time(),
+        "path": path,
+        "sha256": digest,
+        "bytes": len(image),
+        "prompt": image_prompt,
+    }
+    with open(os.path.join(directory, "index.jsonl"), "a") as f:
+        f.write(json.dumps(record) + "\n")
+    return path
+
+
+async def push_image(path: str, serial: str = None) -> dict:
+    """Push an archived image into the device gallery"""
+    device_path = await asyncio.to_thread(push_to_gallery, path, serial)
+    print(f"Pushed {os.path.basename(path)} to {device_path}")
+    return {
+        "success": True,
+        "message": "Image pushed to the device gallery",
+        "path": path,
+        "device_path": device_path,
+    }
+
+
+class ImageBackend:
+    """A backend that puts an image for the prompt into the device gallery"""
+
+    name = "base"
+    # Whether the image is also kept on the host, so it outlives the device gallery
+    on_host = False
+
+    async def generate(self, image_prompt: str, serial: str = None) -> dict:
+        raise NotImplementedError
+
+
+class HttpImageBackend(ImageBackend):
+    """Generates the image on the host through an HTTP image API.
+
+    The image is archived in AUTOX_IMAGE_ARCHIVE_DIR, then pushed to the
+    device with adb and added to the gallery by the media scanner, so the
+    post stage attaches it like an image saved from the Gemini app.
+    """
+
+    name = "http"
+    on_host = True
+
+    def __init__(self, url: str = None, timeout: float = None, archive_dir: str = None):
+        self.url = url or os.getenv("AUTOX_IMAGE_API_URL", DEFAULT_IMAGE_API_URL)
+        self.timeout = timeout if timeout is not None else float(
+            os.getenv("AUTOX_IMAGE_API_TIMEOUT", "120")
+        )
+        self.archive_dir = archive_dir or os.getenv(
+            "AUTOX_IMAGE_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR
+        )
+
+    def _request(self, image_prompt: str) -> tuple:
+        payload = {
+            "contents": [{"parts": [{"text": image_prompt}]}],
+            "generationConfig": {"responseModalities": ["IMAGE"]},
+        }
+        headers = {"Content-Type": "application/json"}
+        key = os.getenv("AUTOX_IMAGE_API_KEY") or os.getenv("GEMINI_API_KEY")
+        if key:
+            headers["x-goog-api-key"] = key
+        request = urllib.request.Request(
+            self.url, data=json.dumps(payload).encode(), headers=headers
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return parse_image_response(
+                response.read(), response.headers.get("Content-Type")
+            )
+
+    async def generate(self, image_prompt: str, serial: str = None) -> dict:
+        async with get_telemetry().span("http_image", "image", serial=serial) as span:
+            image, mime_type = await asyncio.to_thread(self._request, image_prompt)
+            span["bytes"] = len(image)
+        path = archive_image(image, mime_type, image_prompt, self.archive_dir)
+        return await push_image(path, serial)
+
+
+class AgentImageBackend(ImageBackend):
+    """Creates the image in the Gemini app with a DroidAgent"""
+
+    name = "agent"
+
+    async def generate(self, image_prompt: str, serial: str = None) -> dict:
+        from agents.image_generator import generate_image
+
+        return await generate_image(image_prompt, serial=serial)
+
+
+class FallbackImageBackend(ImageBackend):
+    """Tries each backend in order until one succeeds"""
+
+    name = "fallback"
+
+    def __init__(self, backends: list):
+        self.backends = backends
+        self.on_host = any(backend.on_host for backend in backends)
+
+    async def generate(self, image_prompt: str, serial: str = None) -> dict:
+        result = None
+        for index, backend in enumerate(self.backends):
+            if index:
+                get_telemetry().count_retry(f"image_backend_{backend.name}")
+            try:
+                result = await backend.generate(image_prompt, serial)
+            except Exception as e:
+                print(f"Image backend {backend.name} failed: {e}")
+                result = {"success": False, "message": str(e)}
+                continue
+            if result and result.get("success"):
+                return result
+            print(f"Image backend {backend.name} did not make an image")
+        return result
+
+
+IMAGE_BACKENDS = {
+    "http": HttpImageBackend,
+    "agent": AgentImageBackend,
+}
+
+_default_backend = None
+
+
+def get_image_backend() -> ImageBackend:
+    """Return the shared backend chain configured by AUTOX_IMAGE_BACKENDS"""
+    global _default_backend
+    if _default_backend is None:
+        names = os.getenv("AUTOX_IMAGE_BACKENDS", "agent").split(",")
+        backends = [IMAGE_BACKENDS[name.strip()]() for name in names if name.strip()]
+        _default_backend = FallbackImageBackend(backends)
+    return _default_backend
@@ -1,40 +1,60 @@
 #!/usr/bin/env python3
 import asyncio
 import json
-from droidrun import AdbTools, DroidAgent
-from llama_index.llms.google_genai import GoogleGenAI
+from adb_helper import latest_image_uri
+from agents.agent_runner import run_agent
+from agents.llm_registry import get_llm
+from agents.model_router import route
+from agents.replay import get_replay_engine, record_if_missing, replay_or_none
 from agents.prompts.prompts import OPEN_GEMINI_CREATE_IMAGE_GOAL
+from budgets import agent_limits
 from dotenv import load_dotenv
-import os
 
-load_dotenv()
 
-
-async def generate_image(image_prompt: str):
+async def generate_image(image_prompt: str, serial: str = None):
     """Generate image using Gemini with the provided prompt"""
-    # Load adb tools for the first connected device
-    tools = AdbTools()
-    # Set up the Gemini LLM
-    llm = GoogleGenAI(
-        api_key=os.getenv("GEMINI_API_KEY"),
-        model="gemini-2.5-flash",
-    )
+    # Recorded UI flows replay without the LLM; the agent takes over on a mismatch
+    verify = None
+    if get_replay_engine():
+        # A replay only counts once a new image is the newest in the gallery
+        before = await asyncio.to_thread(latest_image_uri, serial)
 
-    # Create the DroidAgent
-    agent = DroidAgent(
-        goal=OPEN_GEMINI_CREATE_IMAGE_GOAL(image_prompt),
-        llm=llm,
-        tools=tools,
-        enable_tracing=True,
-        save_trajectories="action",
-        reasoning=True,
-        vision=True,
+        def verify():
+            return latest_image_uri(serial) not in (None, before)
+
+    replayed = await replay_or_none(
+        "generate_image", {"image_prompt": image_prompt}, serial, verify=verify
     )
+    if replayed:
+        return replayed
+
+    # droidrun is slow to import, load it only when an agent actually runs
+    from droidrun import AdbTools, DroidAgent
 
-    # Run the agent
-    result = await agent.run()
+    # Load adb tools for the leased device (first connected one if no serial)
+    tools = AdbTools(serial=serial)
+
+    async def attempt(model):
+        # Shared Gemini client, reused across runs
+        agent = DroidAgent(
+            goal=OPEN_GEMINI_CREATE_IMAGE_GOAL(image_prompt),
+            llm=get_llm(model),
+            tools=tools,
+            enable_tracing=True,
+            save_trajectories="action",
+            reasoning=True,
+            vision=True,
+            **agent_limits(),
+        )
+        return await run_agent(agent, "generate_image", model, serial)
+
+    # Run the agent, on a bigger model if the routed one fails
+    result = await route("generate_image", attempt, lambda result: result["success"])
     print(f"Image generator - Success: {result['success']}")
 
+    if result["success"]:
+        await record_if_missing("generate_image", {"image_prompt": image_prompt}, serial, result)
+
     if result.get("output"):
         try:
             # Parse the JSON output
@@ -53,6 +73,7 @@ async def generate_image(image_prompt: str):
 
 
 if __name__ == "__main__":
+    load_dotenv()
     # Test with a sample prompt
     test_prompt = (
         "A futuristic cityscape with flying cars and neon lights, digital art style"
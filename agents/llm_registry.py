@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+
+
+def _google_genai_factory(model: str):
+    from llama_index.llms.google_genai import GoogleGenAI
+
+    return GoogleGenAI(api_key=os.getenv("GEMINI_API_KEY"), model=model)
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class LLMRegistry:
+    """Hands out one shared LLM client per model name.
+
+    Each client owns its own HTTP connection pool, so reusing it across
+    runs avoids new sessions and TLS handshakes for every stage. Async
+    clients are bound to an event loop, so a client is rebuilt when it is
+    requested from a different loop than the one it was created on.
+    """
+
+    def __init__(self, factory=None):
+        self.factory = factory or _google_genai_factory
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._env_loaded = False
+        self.created = Counter()
+        self.leases = Counter()
+        self.requests = Counter()
+        self.in_flight = Counter()
+        # Concurrent LLM completions per event loop, 0 means no limit
+        self.max_concurrency = int(os.getenv("AUTOX_LLM_CONCURRENCY", "4"))
+        self._semaphores = {}
+
+    def get(self, model: str):
+        """Return the shared client for a model, creating it on first use"""
+        loop = _running_loop()
+        with self._lock:
+            if not self._env_loaded:
+                load_dotenv()
+                self._env_loaded = True
+            entry = self._clients.get(model)
+            if entry is None or entry[0] is not loop:
+                entry = (loop, self.factory(model))
+                self._clients[model] = entry
+                self.created[model] += 1
+            self.leases[model] += 1
+            return entry[1]
+
+    @asynccontextmanager
+    async def track(self, model: str):
+        """Count a request (or an agent session) against a model while it runs"""
+        self.requests[model] += 1
+        self.in_flight[model] += 1
+        try:
+            yield
+        finally:
+            self.in_flight[model] -= 1
+
+    @asynccontextmanager
+    async def limit(self):
+        """Wait for a free slot under AUTOX_LLM_CONCURRENCY completions"""
+        if self.max_concurrency <= 0:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                # Semaphores are bound to the loop they are first used on
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with semaphore:
+            yield
+
+    def stats(self) -> dict:
+        """Return per-model counts of pooled clients and requests"""
+        models = set(self.created) | set(self.requests)
+        return {
+            model: {
+                "clients": 1 if model in self._clients else 0,
+                "clients_created": self.created[model],
+                "leases": self.leases[model],
+                "requests": self.requests[model],
+                "in_flight": self.in_flight[model],
+            }
+            for model in sorted(models)
+        }
+
+    def clear(self):
+        """Drop every pooled client"""
+        with self._lock:
+            self._clients.clear()
+
+
+# Process-wide registry used by every agent and the content generator
+registry = LLMRegistry()
+
+
+def get_llm(model: str):
+    """Return the process-wide shared client for a model"""
+    return registry.get(model)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+import threading
+import time
+
+from telemetry import get_telemetry
+
+DEFAULT_STATS_PATH = os.path.join(
+    os.getenv("AUTOX_STATE_DIR", ".autox"), "model_stats.sqlite3"
+)
+
+# Models per task, cheapest first; content prompts use CONTENT_LADDER
+DEFAULT_LADDERS = {
+    "find_trend": ("gemini-2.5-flash", "gemini-2.5-pro"),
+    "generate_image": ("gemini-2.5-flash", "gemini-2.5-pro"),
+    "confirm_twitter_post": ("gemini-2.5-flash-lite", "gemini-2.5-flash"),
+    "post_to_twitter": ("gemini-2.5-flash", "gemini-2.5-pro"),
+}
+CONTENT_LADDER = ("gemini-2.5-flash-lite", "gemini-2.5-flash")
+
+# The models every task used before routing, kept with AUTOX_MODEL_ROUTER=0
+FIXED_MODELS = {"find_trend": "gemini-2.5-pro"}
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Posting twice is worse than a failed run, these only escalate on the next run
+NO_ESCALATION_TASKS = ("confirm_twitter_post", "post_to_twitter")
+
+
+def fixed_model(task: str) -> str:
+    return FIXED_MODELS.get(task, DEFAULT_MODEL)
+
+
+class ModelRouter:
+    """Picks the model for each task from its rolling latency and success rate.
+
+    Every task has a ladder of models, cheapest first. A cheap model is
+    used until `min_samples` outcomes are recorded for it, and kept while
+    its success rate over the last `window` outcomes stays at or above
+    `min_success`; among the models that qualify the one with the lowest
+    expected time to a success (mean latency / success rate) wins. A model
+    that fell below the bar is probed again after `retry_after` seconds.
+    Outcomes persist in SQLite, so what was learned survives restarts.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        ladders: dict = None,
+        window: int = None,
+        min_success: float = None,
+        min_samples: int = None,
+        retry_after: float = None,
+        max_age: float = None,
+    ):
+        self.path = path or os.getenv("AUTOX_MODEL_STATS_PATH", DEFAULT_STATS_PATH)
+        self.ladders = dict(DEFAULT_LADDERS)
+        self.ladders.update(ladders or {})
+        self.window = window or int(os.getenv("AUTOX_ROUTER_WINDOW", "20"))
+        self.min_success = min_success if min_success is not None else float(
+            os.getenv("AUTOX_ROUTER_MIN_SUCCESS", "0.8")
+        )
+        self.min_samples = min_samples or int(os.getenv("AUTOX_ROUTER_MIN_SAMPLES", "5"))
+        self.retry_after = retry_after if retry_after is not None else float(
+            os.getenv("AUTOX_ROUTER_RETRY_AFTER", "3600")
+        )
+        self.max_age = max_age or float(os.getenv("AUTOX_ROUTER_MAX_AGE", "604800"))
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS outcomes (
+                id INTEGER PRIMARY KEY,
+                task TEXT NOT NULL,
+                model TEXT NOT NULL,
+                success INTEGER NOT NULL,
+                latency REAL NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS outcomes_task_model ON outcomes (task, model, id)"
+        )
+        self._db.execute(
+            "DELETE FROM outcomes WHERE created_at < ?", (time.time() - self.max_age,)
+        )
+
+    def ladder(self, task: str) -> tuple:
+        """Models of a task, cheapest first; AUTOX_MODELS_<TASK> overrides it"""
+        configured = os.getenv(f"AUTOX_MODELS_{task.upper()}")
+        if configured is None and task not in self.ladders:
+            configured = os.getenv("AUTOX_MODELS_CONTENT")
+        if configured:
+            return tuple(m.strip() for m in configured.split(",") if m.strip())
+        return self.ladders.get(task, CONTENT_LADDER)
+
+    def model_stats(self, task: str, model: str) -> dict:
+        """Success rate and mean latency over the model's last `window` outcomes"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT success, latency, created_at FROM outcomes "
+                "WHERE task = ? AND model = ? AND created_at >= ? ORDER BY id DESC LIMIT ?",
+                (task, model, time.time() - self.max_age, self.window),
+            ).fetchall()
+        if not rows:
+            return {"samples": 0, "success_rate": 0.0, "latency": 0.0, "last_at": 0.0}
+        return {
+            "samples": len(rows),
+            "success_rate": sum(row[0] for row in rows) / len(rows),
+            "latency": sum(row[1] for row in rows) / len(rows),
+            "last_at": rows[0][2],
+        }
+
+    def choose(self, task: str) -> str:
+        """Return the model to use for the next call of a task"""
+        ladder = self.ladder(task)
+        now = time.time()
+        best = best_expected = None
+        for model in ladder:
+            stats = self.model_stats(task, model)
+            if stats["samples"] < self.min_samples:
+                # Not enough data yet: try it, unless a cheaper model already does the job
+                if best is None:
+                    return model
+                continue
+            if stats["success_rate"] < self.min_success:
+                if best is None and now - stats["last_at"] >= self.retry_after:
+                    return model
+                continue
+            expected = stats["latency"] / stats["success_rate"]
+            if best is None or expected < best_expected:
+                best, best_expected = model, expected
+        return best or ladder[-1]
+
+    def record(self, task: str, model: str, success: bool, latency: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO outcomes (task, model, success, latency, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (task, model, int(bool(success)), latency, time.time()),
+            )
+
+    async def run(self, task: str, call, succeeded=None):
+        """Await call(model) on the chosen model, escalating up the ladder on failure.
+
+        succeeded(result) decides whether a call did its job, by default
+        any truthy result. Returns the last result, or raises the last
+        model's error.
+        """
+        succeeded = succeeded or bool
+        ladder = self.ladder(task)
+        model = self.choose(task)
+        models = [model]
+        if task not in NO_ESCALATION_TASKS and model in ladder:
+            models += list(ladder[ladder.index(model) + 1:])
+        result = None
+        for index, model in enumerate(models):
+            if index:
+                get_telemetry().count_retry("model_escalation")
+                print(f"{task} failed on {models[index - 1]}, escalating to {model}")
+            started = time.monotonic()
+            try:
+                result = await call(model)
+            except Exception:
+                self.record(task, model, False, time.monotonic() - started)
+                if index == len(models) - 1:
+                    raise
+                continue
+            success = bool(succeeded(result))
+            self.record(task, model, success, time.monotonic() - started)
+            if success:
+                return result
+        return result
+
+    def stats(self) -> dict:
+        """Rolling stats of every task and model with recorded outcomes"""
+        with self._lock:
+            pairs = self._db.execute(
+                "SELECT DISTINCT task, model FROM outcomes ORDER BY task, model"
+            ).fetchall()
+        return {(task, model): self.model_stats(task, model) for task, model in pairs}
+
+
+_default_router = None
+
+
+def get_model_router():
+    """Return the shared model router, or None when AUTOX_MODEL_ROUTER=0"""
+    global _default_router
+    if os.getenv("AUTOX_MODEL_ROUTER", "1").lower() in ("0", "false", "no"):
+        return None
+    if _default_router is None:
+        _default_router = ModelRouter()
+    return _default_router
+
+
+async def route(task: str, call, succeeded=None):
+    """Run call(model) with the routed model, or the fixed one without a router"""
+    router = get_model_router()
+    if router is None:
+        return await call(fixed_model(task))
+    return await router.run(task, call, succeeded)
+
+
+def model_key(task: str) -> str:
+    """The models a task's output can come from, for cache keys"""
+    router = get_model_router()
+    if router is None:
+        return fixed_model(task)
+    return ",".join(router.ladder(task))
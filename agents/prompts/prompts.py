@@ -1,16 +1,18 @@
-def OPEN_CHROME_GOOGLE_TRENDS_GOAL():
-    prompt = """
+def OPEN_CHROME_GOOGLE_TRENDS_GOAL(count: int = 5):
+    prompt = f"""
 1. Open Chrome browser using package name com.android.chrome
 2. Navigate to Google Trends website (trends.google.com)
 3. Look for trending now section in the hamburger menu
-4. Find the most trending/popular topic or search term currently
-5. Take note of the trending topic title and any related information
-6. Return the trending topic information in JSON format as output:
-{
-  "trending_topic": "string",
-  "description": "string",
-  "category": "string"
-}
+4. Find the top {count} trending/popular topics or search terms currently, most popular first
+5. Take note of each trending topic title and any related information
+6. Return the trending topics in JSON format as output:
+[
+  {{
+    "trending_topic": "string",
+    "description": "string",
+    "category": "string"
+  }}
+]
 
 Output only the JSON string, do not include any other text.
 """
@@ -56,3 +58,175 @@ def OPEN_TWITTER_CREATE_POST_GOAL(post_content: str, has_image: bool = True):
 Output only the JSON string, do not include any other text.
 """
     return prompt
+
+
+def CONFIRM_TWITTER_POST_GOAL(post_content: str, has_image: bool = True):
+    prompt = f"""
+The Twitter/X tweet composer (package com.twitter.android) is already open with the tweet filled in.
+1. Check that the composer shows the following content: "{post_content}"
+2. {"Check that an image is attached to the tweet" if has_image else "Check that no image is attached"}
+3. If the content is cut off or missing, do not type it again, return success false
+4. Tap the "Post" or "Tweet" button to publish the tweet, only once
+5. Wait for the tweet to be posted successfully
+6. Return success status in JSON format:
+{{
+  "success": true,
+  "message": "Tweet posted successfully"
+}}
+
+Output only the JSON string, do not include any other text.
+"""
+    return prompt
+
+
+def CREATE_TWITTER_POST_PROMPT(trending_topic: str, category: str = ""):
+    prompt = f"""{trending_topic} is trending now. Create a trendy, cringe post about droidrun relating to it. This post needs to be posted on twitter, and it should be less than 250 characters long. It should not sound like an advertisement. it should start with a small clickbait story, but a twist should come and it should be reach gracefully about droidrun at end. 
+        
+        category: {category}
+        
+        About Droidrun
+          DroidRun is a powerful framework for controlling Android and iOS devices through LLM agents. It allows you to automate device interactions using natural language commands. Droidrun is the topmost android use agent according to android world benchmark 
+          Why Droidrun?
+            🤖 Control Android and iOS devices with natural language commands 
+            🔀 Supports multiple LLM providers (OpenAI, Anthropic, Gemini, Ollama, DeepSeek) 
+            🧠 Planning capabilities for complex multi-step tasks 
+            💻 Easy to use CLI with enhanced debugging features 
+            🐍 Extendable Python API for custom automations 
+            📸 Screenshot analysis for visual understanding of the device 
+            🫆 Execution tracing with Arize Phoenix
+        
+        Requirements:
+        - Keep it under 250 characters
+        - Emojis are considered of 2 character length
+        - Make it engaging and shareable
+        - Include relevant hashtags (2-3 max)
+        - Use trending/popular tone
+        - Don't include quotes around the final output
+        
+
+        Make sure the tweet is strictly less than 250 characters.
+        Return only the tweet content, nothing else.
+        """
+    return prompt
+
+
+def CREATE_IMAGE_PROMPT_PROMPT(trending_topic: str, twitter_post: str):
+    prompt = f"""{trending_topic} is trending now. Create a trendy clickbait image prompt about it for AI image generator. This image needs to be posted on twitter. It should not look like an advertisement, it would be better if it is some illustration, comic or drawing. For context the text captions to be posted with the image is:
+        {twitter_post}
+        
+        About Droidrun
+          DroidRun is a powerful framework for controlling Android and iOS devices through LLM agents. It allows you to automate device interactions using natural language commands. Droidrun is the topmost android usee agent according to android world benchmark 
+          Why Droidrun?
+            🤖 Control Android and iOS devices with natural language commands 
+            🔀 Supports multiple LLM providers (OpenAI, Anthropic, Gemini, Ollama, DeepSeek) 
+            🧠 Planning capabilities for complex multi-step tasks 
+            💻 Easy to use CLI with enhanced debugging features 
+            🐍 Extendable Python API for custom automations 
+            📸 Screenshot analysis for visual understanding of the device 
+            🫆 Execution tracing with Arize Phoenix
+        
+        Requirements:
+        - Make it visually appealing and relevant to the topic
+        - Include style descriptors (e.g., modern, colorful, professional)
+        - Specify image composition and elements
+        - Keep it concise but descriptive
+        - Make it suitable for social media sharing
+        - Don't include quotes around the final output
+        
+        Make sure to create one of illustration, comic style or drawing. Also mention style and instruction in prompt.
+        Return only the image prompt, nothing else.
+        """
+    return prompt
+
+
+ABOUT_DROIDRUN = """
+About Droidrun
+  DroidRun is a powerful framework for controlling Android and iOS devices through LLM agents. It allows you to automate device interactions using natural language commands. Droidrun is the topmost android use agent according to android world benchmark
+  Why Droidrun?
+    🤖 Control Android and iOS devices with natural language commands
+    🔀 Supports multiple LLM providers (OpenAI, Anthropic, Gemini, Ollama, DeepSeek)
+    🧠 Planning capabilities for complex multi-step tasks
+    💻 Easy to use CLI with enhanced debugging features
+    🐍 Extendable Python API for custom automations
+    📸 Screenshot analysis for visual understanding of the device
+    🫆 Execution tracing with Arize Phoenix
+"""
+
+
+def CREATE_TWITTER_POST_CANDIDATES_PROMPT(
+    trending_topic: str, category: str = "", count: int = 3
+):
+    prompt = f"""
+{trending_topic} is trending now. Write {count} different candidate tweets about droidrun relating to it. Each one should be a trendy, cringe post that does not sound like an advertisement. It should start with a small clickbait story, but a twist should come and it should reach gracefully about droidrun at the end. Make the candidates differ in story and tone.
+
+category: {category}
+{ABOUT_DROIDRUN}
+Requirements for every candidate:
+- Keep it strictly under 250 characters, emojis are considered of 2 character length
+- Make it engaging and shareable
+- Include relevant hashtags (2-3 max)
+- Use trending/popular tone
+- Don't include quotes around the tweet
+
+Return the result in JSON format as output:
+{{
+  "candidates": ["string", "string"]
+}}
+
+Output only the JSON string, do not include any other text.
+"""
+    return prompt
+
+
+def CREATE_IMAGE_PROMPT_FROM_TREND_PROMPT(
+    trending_topic: str, description: str = "", category: str = ""
+):
+    prompt = f"""
+{trending_topic} is trending now. Create a trendy clickbait image prompt about it for AI image generator. This image needs to be posted on twitter together with a short, funny story about the trend that twists into a mention of droidrun. It should not look like an advertisement, it would be better if it is some illustration, comic or drawing.
+
+description: {description}
+category: {category}
+{ABOUT_DROIDRUN}
+Requirements:
+- Make it visually appealing and relevant to the topic
+- Name the trending topic explicitly in the scene
+- Include style descriptors (e.g., modern, colorful, professional)
+- Specify image composition and elements
+- Keep it concise but descriptive
+- Make it suitable for social media sharing
+- Don't include quotes around the final output
+
+Make sure to create one of illustration, comic style or drawing. Also mention style and instruction in prompt.
+Return only the image prompt, nothing else.
+"""
+    return prompt
+
+
+def CREATE_POST_AND_IMAGE_PROMPT(
+    trending_topic: str, description: str = "", category: str = ""
+):
+    prompt = f"""
+{trending_topic} is trending now. Create two matching artifacts about it:
+
+1. twitter_post: a trendy, cringe post about droidrun relating to the trend. It should not sound like an advertisement. It should start with a small clickbait story, but a twist should come and it should reach gracefully about droidrun at the end.
+   - Keep it strictly under 250 characters, emojis are considered of 2 character length
+   - Make it engaging and shareable
+   - Include relevant hashtags (2-3 max)
+   - Use trending/popular tone
+2. image_prompt: a clickbait image prompt for an AI image generator that illustrates the story of the twitter_post. It should be an illustration, comic or drawing, not an advertisement.
+   - Name the trending topic explicitly in the scene
+   - Include style descriptors and specify image composition and elements
+   - Keep it concise but descriptive
+
+description: {description}
+category: {category}
+{ABOUT_DROIDRUN}
+Return the result in JSON format as output:
+{{
+  "twitter_post": "string",
+  "image_prompt": "string"
+}}
+
+Output only the JSON string, do not include any other text.
+"""
+    return prompt
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import os
+import shlex
+import time
+
+from adb_helper import dump_ui, run_adb, screen_size
+from telemetry import get_telemetry
+
+DEFAULT_RECORDING_DIR = os.path.join(
+    os.getenv("AUTOX_STATE_DIR", ".autox"), "recordings"
+)
+
+# A recording is dropped after this many replays in a row did not match the
+# screen, so the next successful agent run records the flow again
+MAX_MISMATCHES = 3
+
+
+class ReplayMismatch(Exception):
+    """Raised when the screen differs from the recording"""
+
+
+class ReplayUnconfirmed(Exception):
+    """Raised when a replay failed after its commit step, e.g. the Post tap.
+
+    The flow may have done its job already, so it must not be run again.
+    """
+
+
+def _center(bounds) -> tuple:
+    x1, y1, x2, y2 = bounds
+    return (x1 + x2) // 2, (y1 + y2) // 2
+
+
+def _action_bounds(action: dict):
+    for key in ("element_bounds", "bounds"):
+        value = action.get(key)
+        if isinstance(value, (list, tuple)) and len(value) == 4:
+            return tuple(int(v) for v in value)
+        if isinstance(value, str):
+            numbers = value.replace("[", " ").replace("]", " ").replace(",", " ").split()
+            if len(numbers) == 4:
+                return tuple(int(float(n)) for n in numbers)
+    return None
+
+
+def _action_point(action: dict):
+    if "x" in action and "y" in action:
+        return int(action["x"]), int(action["y"])
+    coordinates = action.get("coordinates")
+    if isinstance(coordinates, (list, tuple)) and len(coordinates) == 2:
+        return int(coordinates[0]), int(coordinates[1])
+    bounds = _action_bounds(action)
+    return _center(bounds) if bounds else None
+
+
+def normalize_action(action: dict, params: dict) -> dict:
+    """Turn one DroidAgent macro action into a replay step.
+
+    Typed text that contains a parameter value is stored as a template, so
+    the step types the new post or prompt on replay.
+    """
+    kind = str(
+        action.get("action_type") or action.get("type") or action.get("action") or ""
+    ).lower()
+    if kind in ("tap", "tap_by_index", "tap_by_coordinates", "click", "tap_element"):
+        point = _action_point(action)
+        if point is None:
+            raise ValueError(f"tap without coordinates: {action}")
+        step = {"action": "tap", "x": point[0], "y": point[1]}
+        # The element text is the checkpoint that the screen still matches
+        expected = action.get("element_text") or action.get("text") or ""
+        if expected:
+            step["expect_text"] = expected
+        return step
+    if kind in ("input_text", "type", "type_text"):
+        text = action.get("text", "")
+        template = text.replace("{", "{{").replace("}", "}}")
+        for name, value in params.items():
+            if value and value in text:
+                escaped = value.replace("{", "{{").replace("}", "}}")
+                template = template.replace(escaped, "{" + name + "}")
+        return {"action": "text", "template": template}
+    if kind in ("swipe", "scroll"):
+        return {
+            "action": "swipe",
+            "start": [int(action["start_x"]), int(action["start_y"])],
+            "end": [int(action["end_x"]), int(action["end_y"])],
+            "duration_ms": int(action.get("duration_ms", 300)),
+        }
+    if kind in ("start_app", "open_app", "launch_app"):
+        return {"action": "start_app", "package": action["package"]}
+    if kind in ("back", "press_back"):
+        return {"action": "key", "keycode": 4}
+    if kind == "home":
+        return {"action": "key", "keycode": 3}
+    if kind == "enter":
+        return {"action": "key", "keycode": 66}
+    if kind in ("press_key", "key"):
+        return {"action": "key", "keycode": int(action["keycode"])}
+    if kind in ("wait", "sleep"):
+        return {"action": "wait", "seconds": float(action.get("seconds", action.get("duration", 1)))}
+    raise ValueError(f"cannot replay action {kind!r}")
+
+
+def commit_step(steps: list, labels: tuple):
+    """Index of a flow's irreversible tap: the first on one of labels, else the last tap"""
+    taps = [index for index, step in enumerate(steps) if step["action"] == "tap"]
+    wanted = {label.lower() for label in labels}
+    for index in taps:
+        if steps[index].get("expect_text", "").strip().lower() in wanted:
+            return index
+    return taps[-1] if taps else None
+
+
+def find_macro(trajectory_actions: dict):
+    """Return the action list of a stored trajectory, macro.json first"""
+    names = sorted(trajectory_actions, key=lambda name: not name.endswith("macro.json"))
+    for name in names:
+        content = trajectory_actions[name]
+        if isinstance(content, dict) and isinstance(content.get("actions"), list):
+            return content["actions"]
+    return None
+
+
+class ReplayEngine:
+    """Records the fixed UI flows of successful agent runs and replays them.
+
+    A recording is the macro of one successful DroidAgent run, keyed by
+    flow and screen size, with the post text or image prompt turned into
+    parameters. Replays drive the device directly with adb input commands.
+    Before every tap whose target had a label in the recording, the screen
+    is polled until an element with that label shows up (its current
+    center is tapped, so small layout shifts are fine). When it does not
+    show up in time the replay stops with ReplayMismatch and the caller
+    hands the flow back to the agent, unless the flow's commit step (the
+    Post tap) already ran.
+    """
+
+    def __init__(
+        self,
+        directory: str = None,
+        step_delay: float = None,
+        checkpoint_timeout: float = None,
+    ):
+        self.directory = directory or os.getenv(
+            "AUTOX_RECORDING_DIR", DEFAULT_RECORDING_DIR
+        )
+        self.step_delay = step_delay if step_delay is not None else float(
+            os.getenv("AUTOX_REPLAY_STEP_DELAY", "1.0")
+        )
+        self.checkpoint_timeout = checkpoint_timeout if checkpoint_timeout is not None else float(
+            os.getenv("AUTOX_REPLAY_TIMEOUT", "60")
+        )
+        self._screen_sizes = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    async def _screen_size(self, serial: str) -> str:
+        if serial not in self._screen_sizes:
+            size = await asyncio.to_thread(screen_size, serial)
+            self._screen_sizes[serial] = size.replace("x", "_") or "unknown"
+        return self._screen_sizes[serial]
+
+    async def _path(self, flow: str, serial: str) -> str:
+        return os.path.join(self.directory, f"{flow}-{await self._screen_size(serial)}.json")
+
+    def _load(self, path: str):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save(self, path: str, recording: dict):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(recording, f, indent=2)
+        os.replace(tmp_path, path)
+
+    async def has_recording(self, flow: str, serial: str) -> bool:
+        return os.path.exists(await self._path(flow, serial))
+
+    async def record(self, flow: str, serial: str, actions: list, params: dict) -> bool:
+        """Save the macro of a successful agent run as the recording of a flow"""
+        try:
+            steps = [normalize_action(action, params) for action in actions]
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Not recording {flow}: {e}")
+            return False
+        typed = "".join(step.get("template", "") for step in steps)
+        if not all("{" + name + "}" in typed for name in params):
+            print(f"Not recording {flow}: the macro never types the post or prompt")
+            return False
+        recording = {
+            "flow": flow,
+            "serial": serial,
+            "recorded_at": time.time(),
+            "params": sorted(params),
+            "steps": steps,
+            "replays": 0,
+            "mismatches": 0,
+        }
+        self._save(await self._path(flow, serial), recording)
+        print(f"Recorded {flow} ({len(steps)} steps)")
+        return True
+
+    async def _wait_for(self, text: str, serial: str):
+        """Poll the screen until an element labelled `text` is visible"""
+        deadline = time.monotonic() + self.checkpoint_timeout
+        wanted = text.strip().lower()
+        while True:
+            nodes = await asyncio.to_thread(dump_ui, serial)
+            for node in nodes:
+                labels = (node["text"].strip().lower(), node["description"].strip().lower())
+                if wanted in labels and node["bounds"]:
+                    return node
+            if time.monotonic() >= deadline:
+                raise ReplayMismatch(f"{text!r} is not on the screen")
+            await asyncio.sleep(1.0)
+
+    async def _confirm(self, verify):
+        """Poll verify() until it reports the flow's outcome or the timeout passes"""
+        deadline = time.monotonic() + self.checkpoint_timeout
+        while not await asyncio.to_thread(verify):
+            if time.monotonic() >= deadline:
+                raise ReplayMismatch("the flow finished without its expected outcome")
+            await asyncio.sleep(1.0)
+
+    async def _run_step(self, step: dict, params: dict, serial: str):
+        action = step["action"]
+        if action == "tap":
+            x, y = step["x"], step["y"]
+            if step.get("expect_text"):
+                node = await self._wait_for(step["expect_text"], serial)
+                x, y = _center(node["bounds"])
+            await asyncio.to_thread(run_adb, "shell", "input", "tap", x, y, serial=serial)
+        elif action == "text":
+            text = step["template"].format(**params)
+            if not text.isascii():
+                # adb input text cannot type emoji or other non-ASCII text
+                raise ReplayMismatch("text is not ASCII")
+            # input text reads %s as a space
+            escaped = shlex.quote(text.replace(" ", "%s"))
+            await asyncio.to_thread(run_adb, "shell", "input", "text", escaped, serial=serial)
+        elif action == "swipe":
+            await asyncio.to_thread(
+                run_adb,
+                "shell",
+                "input",
+                "swipe",
+                *step["start"],
+                *step["end"],
+                step["duration_ms"],
+                serial=serial,
+            )
+        elif action == "start_app":
+            await asyncio.to_thread(
+                run_adb,
+                "shell",
+                "monkey",
+                "-p",
+                step["package"],
+                "-c",
+                "android.intent.category.LAUNCHER",
+                "1",
+                serial=serial,
+            )
+        elif action == "key":
+            await asyncio.to_thread(
+                run_adb, "shell", "input", "keyevent", step["keycode"], serial=serial
+            )
+        elif action == "wait":
+            await asyncio.sleep(step["seconds"])
+
+    async def replay(
+        self, flow: str, params: dict, serial: str, commit_labels: tuple = (), verify=None
+    ) -> bool:
+        """Replay the recording of a flow, False when there is none.
+
+        verify() is polled after the last step until it confirms the
+        flow's outcome. Raises ReplayMismatch when the screen differs from
+        the recording or the outcome is not confirmed, and ReplayUnconfirmed
+        instead once the commit step ran (the first tap on one of
+        commit_labels, else the last tap) for flows given commit_labels.
+        """
+        path = await self._path(flow, serial)
+        recording = self._load(path)
+        if recording is None:
+            return False
+        steps = recording["steps"]
+        typed = [
+            step["template"].format(**params)
+            for step in steps
+            if step["action"] == "text"
+        ]
+        if not all(text.isascii() for text in typed):
+            print(f"Not replaying {flow}: adb input cannot type emoji or other non-ASCII text")
+            return False
+
+        commit_index = commit_step(steps, commit_labels) if commit_labels else None
+        committed = False
+        async with get_telemetry().span(flow, "replay", serial=serial) as span:
+            span["steps"] = len(steps)
+            where = flow
+            try:
+                for index, step in enumerate(steps):
+                    where = f"step {index + 1} of {flow}"
+                    if index == commit_index:
+                        if step.get("expect_text"):
+                            # A label that never shows up was not tapped, that is still safe
+                            await self._wait_for(step["expect_text"], serial)
+                        committed = True
+                    await self._run_step(step, params, serial)
+                    if index < len(steps) - 1:
+                        await asyncio.sleep(self.step_delay)
+                if verify:
+                    where = f"end of {flow}"
+                    await self._confirm(verify)
+            except Exception as e:
+                if isinstance(e, ReplayMismatch):
+                    self._missed(flow, path, recording)
+                if committed:
+                    raise ReplayUnconfirmed(f"{where}: {e}") from e
+                if isinstance(e, ReplayMismatch):
+                    raise ReplayMismatch(f"{where}: {e}") from e
+                raise
+
+        recording["replays"] += 1
+        recording["mismatches"] = 0
+        self._save(path, recording)
+        return True
+
+    def _missed(self, flow: str, path: str, recording: dict):
+        recording["mismatches"] += 1
+        if recording["mismatches"] >= MAX_MISMATCHES:
+            print(f"Recording of {flow} failed {MAX_MISMATCHES} times in a row, dropping it")
+            os.remove(path)
+        else:
+            self._save(path, recording)
+
+
+_default_engine = None
+
+
+def get_replay_engine():
+    """Return the shared replay engine, or None unless AUTOX_REPLAY=1"""
+    global _default_engine
+    if os.getenv("AUTOX_REPLAY", "0").lower() not in ("1", "true", "yes"):
+        return None
+    if _default_engine is None:
+        _default_engine = ReplayEngine()
+    return _default_engine
+
+
+async def replay_or_none(
+    flow: str, params: dict, serial: str, commit_labels: tuple = (), verify=None
+):
+    """Replay a flow, return a result dict or None when the agent has to run.
+
+    After the commit step of a flow the agent never takes over, a failure
+    is returned as a result with "unknown" set instead: the flow may have
+    done its job, e.g. posted the tweet.
+    """
+    engine = get_replay_engine()
+    if engine is None:
+        return None
+    try:
+        if await engine.replay(flow, params, serial, commit_labels, verify):
+            print(f"Replayed {flow} without the agent")
+            return {"success": True, "message": f"Replayed recorded {flow} flow"}
+    except ReplayUnconfirmed as e:
+        print(f"Replay of {flow} failed after its commit step, not handing over: {e}")
+        get_telemetry().count_retry("replay_unconfirmed")
+        return {
+            "success": False,
+            "unknown": True,
+            "message": f"Replay of {flow} unconfirmed: {e}",
+        }
+    except ReplayMismatch as e:
+        print(f"Replay of {flow} stopped, handing over to the agent: {e}")
+        get_telemetry().count_retry("replay_mismatch")
+    except Exception as e:
+        print(f"Replay of {flow} failed, handing over to the agent: {e}")
+        get_telemetry().count_retry("replay_error")
+    return None
+
+
+async def record_if_missing(flow: str, params: dict, serial: str, result: dict):
+    """Record a flow from the trajectory of a successful agent run"""
+    engine = get_replay_engine()
+    if engine is None or not result.get("trajectory_ids"):
+        return
+    if await engine.has_recording(flow, serial):
+        return
+    from agents.trajectory_store import get_trajectory_store
+
+    store = get_trajectory_store()
+    for trajectory_id in result["trajectory_ids"]:
+        actions = find_macro(store.load(trajectory_id)["actions"])
+        if actions and await engine.record(flow, serial, actions, params):
+            return
@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+
+# Words too common to tell two texts apart: left out when checking that a
+# post and an image prompt tell one story, and when comparing past posts
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "you", "your", "are", "was",
+    "but", "not", "its", "it's", "from", "have", "has", "all", "just", "about",
+    "when", "what", "who", "how", "they", "their", "them", "into", "out",
+    "like", "can", "will", "one", "more", "now", "our", "get", "got", "too",
+    "image", "style", "illustration", "comic", "drawing", "droidrun",
+}
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+import base64
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+DEFAULT_TRAJECTORY_DIR = os.path.join(
+    os.getenv("AUTOX_STATE_DIR", ".autox"), "trajectories"
+)
+
+# Screenshots are stored compressed only when zlib saves at least this much
+MIN_COMPRESSION_GAIN = 0.1
+
+# Unreferenced blobs younger than this may belong to an ingest in progress
+ORPHAN_GRACE = 3600
+
+# Base64 strings that are really images, e.g. screenshots inlined in JSON logs
+_DATA_URL_RE = re.compile(r"^data:image/[a-z]+;base64,")
+_BASE64_IMAGE_PREFIXES = ("iVBORw0KGg", "/9j/", "R0lGOD", "UklGR")
+_MIN_INLINE_IMAGE_CHARS = 1024
+
+
+def _mentions(path: str, text: str) -> bool:
+    """Check whether a JSON file of a trajectory contains text as (part of) a string"""
+    if os.path.isdir(path):
+        files = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in sorted(names, key=lambda name: name != "macro.json")
+            if name.endswith(".json")
+        ]
+    else:
+        files = [path] if path.endswith(".json") else []
+    # Compare in the JSON encoding, so escaped quotes and newlines match
+    needle = json.dumps(text)[1:-1]
+    for file_path in files:
+        try:
+            with open(file_path) as f:
+                if needle in json.dumps(json.load(f)):
+                    return True
+        except (OSError, ValueError):
+            continue
+    return False
+
+
+class TrajectoryStore:
+    """Keeps DroidAgent trajectories compact and bounded on disk.
+
+    Screenshots and other files are stored once per sha256 under blobs/,
+    so the many identical frames of a session cost one write. Action logs
+    (the JSON files of a trajectory) are zlib-compressed into one SQLite
+    row, with inlined base64 screenshots swapped for blob references.
+    Trajectories older than `max_age` are dropped, the oldest ones are
+    evicted while the store is over `max_bytes`, and blobs no trajectory
+    refers to anymore are deleted after a grace period.
+    """
+
+    def __init__(self, directory: str = None, max_age: float = None, max_bytes: int = None):
+        self.directory = directory or os.getenv("AUTOX_TRAJECTORY_DIR", DEFAULT_TRAJECTORY_DIR)
+        self.max_age = max_age if max_age is not None else float(
+            os.getenv("AUTOX_TRAJECTORY_MAX_AGE", "604800")
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv("AUTOX_TRAJECTORY_MAX_BYTES", str(2 * 1024**3))
+        )
+        self.blob_dir = os.path.join(self.directory, "blobs")
+        self.incoming_dir = os.path.join(self.directory, "incoming")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.incoming_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._db = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite3"),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS trajectories (
+                id TEXT PRIMARY KEY,
+                agent TEXT NOT NULL,
+                serial TEXT,
+                run_id TEXT,
+                created_at REAL NOT NULL,
+                actions BLOB NOT NULL,
+                files TEXT NOT NULL
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                compressed INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS trajectory_blobs (
+                trajectory_id TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (trajectory_id, hash)
+            )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS trajectories_created ON trajectories (created_at)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS trajectory_blobs_hash ON trajectory_blobs (hash)"
+        )
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def put_blob(self, data: bytes) -> str:
+        """Store bytes once under their sha256 and return the hash"""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            known = self._db.execute(
+                "UPDATE blobs SET last_used = ? WHERE hash = ?", (time.time(), digest)
+            ).rowcount
+        if known:
+            return digest
+
+        packed = zlib.compress(data, 6)
+        compressed = len(packed) <= len(data) * (1 - MIN_COMPRESSION_GAIN)
+        stored = packed if compressed else data
+        path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(stored)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?)",
+                (digest, len(data), len(stored), int(compressed), time.time()),
+            )
+        return digest
+
+    def get_blob(self, digest: str) -> bytes:
+        """Return the original bytes of a blob"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT compressed FROM blobs WHERE hash = ?", (digest,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(digest)
+        with open(self._blob_path(digest), "rb") as f:
+            data = f.read()
+        return zlib.decompress(data) if row[0] else data
+
+    def _extract_images(self, value, hashes: set):
+        """Replace inlined base64 images in parsed JSON with blob references"""
+        if isinstance(value, dict):
+            return {k: self._extract_images(v, hashes) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._extract_images(v, hashes) for v in value]
+        if isinstance(value, str) and len(value) >= _MIN_INLINE_IMAGE_CHARS:
+            prefix = _DATA_URL_RE.match(value)
+            payload = value[prefix.end():] if prefix else value
+            if prefix or payload.startswith(_BASE64_IMAGE_PREFIXES):
+                try:
+                    data = base64.b64decode(payload, validate=True)
+                except ValueError:
+                    return value
+                digest = self.put_blob(data)
+                hashes.add(digest)
+                return {"$blob": digest, "$prefix": prefix.group(0) if prefix else ""}
+        return value
+
+    def ingest(
+        self, path: str, agent: str, serial: str = None, run_id: str = None, name: str = None
+    ) -> str:
+        """Move a trajectory file or directory into the store, return its id"""
+        if os.path.isdir(path):
+            files = [
+                os.path.join(root, name)
+                for root, _, names in os.walk(path)
+                for name in sorted(names)
+            ]
+        else:
+            files = [path]
+
+        actions = {}
+        file_hashes = {}
+        hashes = set()
+        for file_path in files:
+            if os.path.isdir(path):
+                relative = os.path.relpath(file_path, path)
+            else:
+                relative = name or os.path.basename(path)
+            with open(file_path, "rb") as f:
+                data = f.read()
+            if relative.endswith(".json"):
+                try:
+                    actions[relative] = self._extract_images(json.loads(data), hashes)
+                    continue
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    pass
+            digest = self.put_blob(data)
+            hashes.add(digest)
+            file_hashes[relative] = digest
+
+        trajectory_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        packed = zlib.compress(
+            json.dumps(actions, separators=(",", ":"), default=str).encode(), 9
+        )
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT INTO trajectories VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        trajectory_id,
+                        agent,
+                        serial,
+                        run_id,
+                        time.time(),
+                        packed,
+                        json.dumps(file_hashes),
+                    ),
+                )
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO trajectory_blobs VALUES (?, ?)",
+                    [(trajectory_id, digest) for digest in hashes],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+        if time.time() - self._last_prune > 600 or self.total_bytes() > self.max_bytes:
+            self.prune()
+        return trajectory_id
+
+    def ingest_new(
+        self,
+        source_dir: str,
+        since: float,
+        agent: str,
+        serial: str = None,
+        run_id: str = None,
+        goal: str = None,
+    ) -> list:
+        """Ingest the trajectories written to source_dir since a timestamp.
+
+        Agents running at the same time share source_dir, so with a goal
+        only the trajectories that record that goal are taken. Each entry
+        is first renamed into incoming/, so every trajectory is ingested
+        exactly once.
+        """
+        if not os.path.isdir(source_dir):
+            return []
+        ingested = []
+        for name in sorted(os.listdir(source_dir)):
+            path = os.path.join(source_dir, name)
+            try:
+                if os.path.getmtime(path) < since:
+                    continue
+                if goal and not _mentions(path, goal):
+                    # Written by another agent, which ingests it itself
+                    continue
+                claimed = os.path.join(self.incoming_dir, f"{uuid.uuid4().hex[:8]}-{name}")
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                # Claimed by a concurrent run
+                continue
+            ingested.append(self.ingest(claimed, agent, serial, run_id, name))
+        return ingested
+
+    def load(self, trajectory_id: str) -> dict:
+        """Return the metadata, action logs and file hashes of a trajectory"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT agent, serial, run_id, created_at, actions, files "
+                "FROM trajectories WHERE id = ?",
+                (trajectory_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(trajectory_id)
+        agent, serial, run_id, created_at, actions, files = row
+        return {
+            "id": trajectory_id,
+            "agent": agent,
+            "serial": serial,
+            "run_id": run_id,
+            "created_at": created_at,
+            "actions": json.loads(zlib.decompress(actions)),
+            "files": json.loads(files),
+        }
+
+    def _inline_images(self, value):
+        if isinstance(value, dict):
+            if "$blob" in value:
+                data = self.get_blob(value["$blob"])
+                return value.get("$prefix", "") + base64.b64encode(data).decode()
+            return {k: self._inline_images(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._inline_images(v) for v in value]
+        return value
+
+    def restore(self, trajectory_id: str, directory: str):
+        """Write a trajectory back out as the files DroidAgent saved"""
+        trajectory = self.load(trajectory_id)
+        for relative, actions in trajectory["actions"].items():
+            path = os.path.join(directory, relative)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(self._inline_images(actions), f)
+        for relative, digest in trajectory["files"].items():
+            path = os.path.join(directory, relative)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(self.get_blob(digest))
+
+    def total_bytes(self) -> int:
+        """Return the bytes used by blobs and compressed action logs"""
+        with self._lock:
+            blobs = self._db.execute("SELECT COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()[0]
+            actions = self._db.execute(
+                "SELECT COALESCE(SUM(LENGTH(actions)), 0) FROM trajectories"
+            ).fetchone()[0]
+        return blobs + actions
+
+    def _delete_trajectories(self, trajectory_ids: list):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                released = set()
+                for trajectory_id in trajectory_ids:
+                    released.update(
+                        row[0]
+                        for row in self._db.execute(
+                            "SELECT hash FROM trajectory_blobs WHERE trajectory_id = ?",
+                            (trajectory_id,),
+                        )
+                    )
+                    self._db.execute("DELETE FROM trajectories WHERE id = ?", (trajectory_id,))
+                    self._db.execute(
+                        "DELETE FROM trajectory_blobs WHERE trajectory_id = ?", (trajectory_id,)
+                    )
+                # Blobs of the deleted trajectories go now, never referenced
+                # ones only after the grace period
+                candidates = released | {
+                    row[0]
+                    for row in self._db.execute(
+                        "SELECT hash FROM blobs WHERE last_used < ?",
+                        (time.time() - ORPHAN_GRACE,),
+                    )
+                }
+                orphans = [
+                    digest
+                    for digest in candidates
+                    if not self._db.execute(
+                        "SELECT 1 FROM trajectory_blobs WHERE hash = ?", (digest,)
+                    ).fetchone()
+                ]
+                self._db.executemany("DELETE FROM blobs WHERE hash = ?", [(h,) for h in orphans])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        for digest in orphans:
+            try:
+                os.remove(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+    def prune(self):
+        """Drop expired trajectories, then evict the oldest while over max_bytes"""
+        self._last_prune = time.time()
+        with self._lock:
+            expired = [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT id FROM trajectories WHERE created_at < ?",
+                    (self._last_prune - self.max_age,),
+                )
+            ]
+        # Also collects old blobs left behind by an interrupted ingest
+        self._delete_trajectories(expired)
+
+        while self.total_bytes() > self.max_bytes:
+            with self._lock:
+                oldest = [
+                    row[0]
+                    for row in self._db.execute(
+                        "SELECT id FROM trajectories ORDER BY created_at LIMIT 1"
+                    )
+                ]
+            if not oldest:
+                break
+            self._delete_trajectories(oldest)
+
+    def stats(self) -> dict:
+        """Return counts and sizes, including the bytes saved by dedup"""
+        with self._lock:
+            trajectories = self._db.execute("SELECT COUNT(*) FROM trajectories").fetchone()[0]
+            blobs, size, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+            ).fetchone()
+            references = self._db.execute(
+                "SELECT COALESCE(SUM(b.size), 0) FROM trajectory_blobs t JOIN blobs b ON b.hash = t.hash"
+            ).fetchone()[0]
+        return {
+            "trajectories": trajectories,
+            "blobs": blobs,
+            "blob_bytes": size,
+            "stored_bytes": stored,
+            "referenced_bytes": references,
+            "total_bytes": self.total_bytes(),
+        }
+
+
+_default_store = None
+
+
+def get_trajectory_store():
+    """Return the shared trajectory store, or None when AUTOX_TRAJECTORIES=0"""
+    global _default_store
+    if os.getenv("AUTOX_TRAJECTORIES", "1").lower() in ("0", "false", "no"):
+        return None
+    if _default_store is None:
+        _default_store = TrajectoryStore()
+    return _default_store
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+import asyncio
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from agents.generation_cache import normalize_trend
+
+DEFAULT_TREND_CACHE_PATH = os.path.join(
+    os.getenv("AUTOX_STATE_DIR", ".autox"), "trend_cache.sqlite3"
+)
+
+
+class TrendCache:
+    """Shared, persistent cache of fetched trends and of trends already used.
+
+    Fresh trend lists are reused by every run until they are older than
+    `ttl`. A run claims the trend it works on so concurrent runs pick
+    different ones, and a posted trend is skipped until `repost_after` has
+    passed. Unposted claims expire after `claim_ttl`.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        ttl: float = None,
+        claim_ttl: float = None,
+        repost_after: float = None,
+    ):
+        self.path = path or os.getenv("AUTOX_TREND_CACHE_PATH", DEFAULT_TREND_CACHE_PATH)
+        self.ttl = ttl if ttl is not None else float(os.getenv("AUTOX_TREND_TTL", "900"))
+        self.claim_ttl = claim_ttl if claim_ttl is not None else float(
+            os.getenv("AUTOX_TREND_CLAIM_TTL", "1800")
+        )
+        self.repost_after = repost_after if repost_after is not None else float(
+            os.getenv("AUTOX_TREND_REPOST_AFTER", "86400")
+        )
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS trend_lists (
+                name TEXT PRIMARY KEY,
+                trends TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS used_trends (
+                topic_key TEXT PRIMARY KEY,
+                trending_topic TEXT NOT NULL,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+
+    def get_trends(self, name: str = "default"):
+        """Return (trends, fetched_at) of the cached list, trends is None when stale"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT trends, fetched_at FROM trend_lists WHERE name = ?", (name,)
+            ).fetchone()
+        if not row:
+            return None, 0.0
+        trends, fetched_at = json.loads(row[0]), row[1]
+        if time.time() - fetched_at > self.ttl:
+            return None, fetched_at
+        return trends, fetched_at
+
+    def put_trends(self, trends: list, name: str = "default"):
+        """Store a freshly fetched trend list"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO trend_lists VALUES (?, ?, ?)",
+                (name, json.dumps(trends), time.time()),
+            )
+
+    def _usable(self, key: str, now: float) -> bool:
+        row = self._db.execute(
+            "SELECT status, updated_at FROM used_trends WHERE topic_key = ?", (key,)
+        ).fetchone()
+        if row:
+            status, updated_at = row
+            if status == "posted" and now - updated_at < self.repost_after:
+                return False
+            if status == "claimed" and now - updated_at < self.claim_ttl:
+                return False
+        return True
+
+    def available(self, trends: list) -> list:
+        """Return the trends that a run could still claim"""
+        now = time.time()
+        with self._lock:
+            return [
+                trend
+                for trend in trends
+                if self._usable(normalize_trend(trend.get("trending_topic", "")), now)
+            ]
+
+    def claim_next(self, trends: list):
+        """Claim the first trend that is neither posted recently nor claimed"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for trend in trends:
+                    topic = trend.get("trending_topic", "")
+                    key = normalize_trend(topic)
+                    if not self._usable(key, now):
+                        continue
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO used_trends VALUES (?, ?, 'claimed', ?)",
+                        (key, topic, now),
+                    )
+                    self._db.execute("COMMIT")
+                    return trend
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return None
+
+    def mark_posted(self, trending_topic: str):
+        """Record that a trend was posted about so later runs skip it"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO used_trends VALUES (?, ?, 'posted', ?)",
+                (normalize_trend(trending_topic), trending_topic, time.time()),
+            )
+
+    def release(self, trending_topic: str):
+        """Drop the claim of a run that did not post, so the trend can be retried"""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM used_trends WHERE topic_key = ? AND status = 'claimed'",
+                (normalize_trend(trending_topic),),
+            )
+
+    @asynccontextmanager
+    async def refresh_lock(self):
+        """Serialize trend fetches across processes so only one run fetches"""
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(0.2)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+_default_cache = None
+
+
+def get_trend_cache():
+    """Return the shared trend cache, or None when AUTOX_TREND_CACHE=0"""
+    global _default_cache
+    if os.getenv("AUTOX_TREND_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    if _default_cache is None:
+        _default_cache = TrendCache()
+    return _default_cache
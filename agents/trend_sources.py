@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import os
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
+
+from telemetry import get_telemetry
+
+DEFAULT_RSS_URL = "https://trends.google.com/trending/rss?geo={geo}"
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from a tag, the ht: namespace changes between feed versions"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(element, name: str) -> str:
+    for child in element:
+        if _local_name(child.tag) == name and child.text:
+            return child.text.strip()
+    return ""
+
+
+def parse_rss_feed(body: bytes) -> list:
+    """Parse a Google Trends RSS feed into trend dicts"""
+    root = ET.fromstring(body)
+    trends = []
+    for item in root.iter():
+        if _local_name(item.tag) != "item":
+            continue
+        title = _child_text(item, "title")
+        if not title:
+            continue
+        traffic = _child_text(item, "approx_traffic")
+        news_title = ""
+        for child in item:
+            if _local_name(child.tag) == "news_item":
+                news_title = _child_text(child, "news_item_title")
+                break
+        description = f"{traffic} searches" if traffic else ""
+        if news_title:
+            description = f"{description}: {news_title}" if description else news_title
+        trends.append(
+            {
+                "trending_topic": title,
+                "description": description,
+                "category": _child_text(item, "category"),
+            }
+        )
+    return trends
+
+
+def parse_json_feed(body: bytes) -> list:
+    """Parse a Google Trends daily trends JSON feed into trend dicts"""
+    text = body.decode("utf-8").strip()
+    # Google prefixes JSON responses with )]}' to block JSON hijacking
+    if text.startswith(")]}'"):
+        text = text[4:].lstrip(",").lstrip()
+    data = json.loads(text)
+    trends = []
+    for day in data.get("default", {}).get("trendingSearchesDays", []):
+        for search in day.get("trendingSearches", []):
+            title = search.get("title", {}).get("query", "")
+            if not title:
+                continue
+            traffic = search.get("formattedTraffic", "")
+            articles = search.get("articles") or [{}]
+            news_title = articles[0].get("title", "")
+            description = f"{traffic} searches" if traffic else ""
+            if news_title:
+                description = f"{description}: {news_title}" if description else news_title
+            trends.append(
+                {"trending_topic": title, "description": description, "category": ""}
+            )
+    return trends
+
+
+def parse_trends_feed(body: bytes) -> list:
+    """Parse either feed format, based on the first character of the body"""
+    if body.lstrip()[:1] == b"<":
+        return parse_rss_feed(body)
+    return parse_json_feed(body)
+
+
+class TrendSource:
+    """A backend that returns the current trends, most popular first"""
+
+    name = "base"
+
+    async def fetch(self, serial: str = None) -> list:
+        raise NotImplementedError
+
+
+class FeedTrendSource(TrendSource):
+    """Fetches the Google Trends RSS or JSON feed directly over HTTP.
+
+    Sends If-None-Match / If-Modified-Since from the previous response, so
+    an unchanged feed costs a 304 and is served from the last parse.
+    """
+
+    name = "rss"
+
+    def __init__(self, url: str = None, timeout: float = 10):
+        geo = os.getenv("AUTOX_TRENDS_GEO", "US")
+        self.url = url or os.getenv("AUTOX_TRENDS_URL", DEFAULT_RSS_URL.format(geo=geo))
+        self.timeout = timeout
+        self.etag = None
+        self.last_modified = None
+        self.not_modified = 0
+        self._trends = None
+
+    async def fetch(self, serial: str = None) -> list:
+        return await asyncio.to_thread(self._fetch)
+
+    def _fetch(self) -> list:
+        headers = {"User-Agent": "Mozilla/5.0 (AutoX trend fetcher)"}
+        if self._trends is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        request = urllib.request.Request(self.url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                self.etag = response.headers.get("ETag")
+                self.last_modified = response.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and self._trends is not None:
+                self.not_modified += 1
+                return self._trends
+            raise
+        self._trends = parse_trends_feed(body)
+        return self._trends
+
+
+class AgentTrendSource(TrendSource):
+    """Reads Google Trends in Chrome with a DroidAgent on the leased device"""
+
+    name = "agent"
+
+    async def fetch(self, serial: str = None) -> list:
+        from agents.find_trend import find_trends_with_agent
+
+        return await find_trends_with_agent(serial)
+
+
+class FallbackTrendSource(TrendSource):
+    """Tries each source in order until one returns trends"""
+
+    name = "fallback"
+
+    def __init__(self, sources: list):
+        self.sources = sources
+
+    async def fetch(self, serial: str = None) -> list:
+        last_error = None
+        for index, source in enumerate(self.sources):
+            if index:
+                get_telemetry().count_retry(f"trend_source_{source.name}")
+            try:
+                trends = await source.fetch(serial)
+            except Exception as e:
+                print(f"Trend source {source.name} failed: {e}")
+                last_error = e
+                continue
+            if trends:
+                return trends
+            print(f"Trend source {source.name} returned no trends")
+        if last_error:
+            raise last_error
+        return []
+
+
+TREND_SOURCES = {
+    "rss": FeedTrendSource,
+    "agent": AgentTrendSource,
+}
+
+_default_source = None
+
+
+def get_trend_source() -> TrendSource:
+    """Return the shared source chain configured by AUTOX_TREND_SOURCES"""
+    global _default_source
+    if _default_source is None:
+        names = os.getenv("AUTOX_TREND_SOURCES", "rss,agent").split(",")
+        sources = [TREND_SOURCES[name.strip()]() for name in names if name.strip()]
+        _default_source = FallbackTrendSource(sources)
+    return _default_source
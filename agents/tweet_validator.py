@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import os
+import re
+
+# Twitter counts code points in these ranges as 1, everything else as 2
+LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+# Links are shortened to t.co and always count as this many characters
+URL_LENGTH = 23
+
+URL_RE = re.compile(r"https?://\S+", re.IGNORECASE)
+HASHTAG_RE = re.compile(r"(?<![\w&])#\w+")
+
+# Code points that join or modify the previous emoji and add no length
+ZERO_WIDTH_JOINER = 0x200D
+VARIATION_SELECTORS = range(0xFE00, 0xFE10)
+SKIN_TONES = range(0x1F3FB, 0x1F400)
+KEYCAP = 0x20E3
+TAGS = range(0xE0020, 0xE0080)
+REGIONAL_INDICATORS = range(0x1F1E6, 0x1F200)
+
+# Phrases that give away a model reply or an advert instead of a tweet
+DEFAULT_BANNED_PHRASES = (
+    "as an ai",
+    "language model",
+    "here's a tweet",
+    "here is a tweet",
+    "here's your tweet",
+    "tweet:",
+    "character count",
+    "buy now",
+    "limited time offer",
+    "click the link",
+)
+
+
+def _is_light(code_point: int) -> bool:
+    return any(start <= code_point <= end for start, end in LIGHT_RANGES)
+
+
+def weighted_length(text: str) -> int:
+    """Length of a tweet the way Twitter counts it.
+
+    CJK characters and emoji count as 2, an emoji sequence joined with
+    ZWJ, skin tones or variation selectors counts as one emoji, a flag
+    (two regional indicators) as one, and every link as 23.
+    """
+    length = URL_LENGTH * len(URL_RE.findall(text))
+    text = URL_RE.sub("", text)
+    joined = False
+    pending_flag = False
+    for char in text:
+        code_point = ord(char)
+        if code_point == ZERO_WIDTH_JOINER:
+            joined = True
+            continue
+        if (
+            code_point in VARIATION_SELECTORS
+            or code_point in SKIN_TONES
+            or code_point in TAGS
+            or code_point == KEYCAP
+        ):
+            continue
+        if joined:
+            joined = False
+            continue
+        if code_point in REGIONAL_INDICATORS:
+            pending_flag = not pending_flag
+            if not pending_flag:
+                continue
+        else:
+            pending_flag = False
+        length += 1 if _is_light(code_point) else 2
+    return length
+
+
+def hashtags(text: str) -> list:
+    return HASHTAG_RE.findall(text)
+
+
+class TweetValidator:
+    """Checks candidate tweets locally before any agent tries to post them"""
+
+    def __init__(
+        self,
+        max_length: int = None,
+        max_hashtags: int = None,
+        banned_phrases: tuple = None,
+    ):
+        self.max_length = max_length or int(os.getenv("AUTOX_TWEET_MAX_LENGTH", "250"))
+        self.max_hashtags = max_hashtags if max_hashtags is not None else int(
+            os.getenv("AUTOX_TWEET_MAX_HASHTAGS", "3")
+        )
+        if banned_phrases is None:
+            extra = os.getenv("AUTOX_TWEET_BANNED_PHRASES", "")
+            banned_phrases = DEFAULT_BANNED_PHRASES + tuple(
+                phrase.strip() for phrase in extra.split(",") if phrase.strip()
+            )
+        self.banned_phrases = tuple(phrase.lower() for phrase in banned_phrases)
+
+    def problems(self, text: str) -> list:
+        """Return why a tweet cannot be posted, an empty list when it is fine"""
+        text = text.strip()
+        if not text:
+            return ["empty"]
+        problems = []
+        length = weighted_length(text)
+        if length > self.max_length:
+            problems.append(f"{length} characters, the limit is {self.max_length}")
+        tags = len(hashtags(text))
+        if tags > self.max_hashtags:
+            problems.append(f"{tags} hashtags, the limit is {self.max_hashtags}")
+        lowered = text.lower()
+        for phrase in self.banned_phrases:
+            if phrase in lowered:
+                problems.append(f"contains {phrase!r}")
+        if len(text) > 1 and text[0] == text[-1] and text[0] in "\"'“”":
+            problems.append("wrapped in quotes")
+        return problems
+
+    def score(self, text: str, trending_topic: str = "") -> float:
+        """Rank valid tweets, higher is better"""
+        lowered = text.lower()
+        score = 0.0
+        # The story has to land on droidrun and stay on the trend
+        if "droidrun" in lowered:
+            score += 2
+        topic_words = set(re.findall(r"\w{3,}", trending_topic.lower()))
+        if topic_words and topic_words & set(re.findall(r"\w{3,}", lowered)):
+            score += 2
+        if 1 <= len(hashtags(text)) <= self.max_hashtags:
+            score += 1
+        # Prefer using the space, but keep a margin under the limit
+        score += min(weighted_length(text), self.max_length * 0.9) / self.max_length
+        return score
+
+    def rank(self, candidates: list, trending_topic: str = "") -> list:
+        """Return the valid candidates, best first"""
+        valid = [text.strip() for text in candidates if not self.problems(text)]
+        return sorted(valid, key=lambda text: self.score(text, trending_topic), reverse=True)
@@ -1,41 +1,85 @@
 #!/usr/bin/env python3
 import asyncio
 import json
-from droidrun import AdbTools, DroidAgent
-from llama_index.llms.google_genai import GoogleGenAI
-from agents.prompts.prompts import OPEN_TWITTER_CREATE_POST_GOAL
-from dotenv import load_dotenv
 import os
+from adb_helper import dump_ui, foreground_package, latest_image_uri, share_intent
+from agents.agent_runner import run_agent
+from agents.llm_registry import get_llm
+from agents.model_router import route
+from agents.replay import record_if_missing, replay_or_none
+from agents.prompts.prompts import (
+    CONFIRM_TWITTER_POST_GOAL,
+    OPEN_TWITTER_CREATE_POST_GOAL,
+)
+from budgets import agent_limits
+from dotenv import load_dotenv
 
-load_dotenv()
+TWITTER_PACKAGE = "com.twitter.android"
 
+# Labels of the composer's Post button, "Tweet" in older app versions
+POST_BUTTON_LABELS = ("post", "post all", "tweet", "tweet all")
 
-async def post_to_twitter(post_content: str, has_image: bool = True):
-    """Post content to Twitter/X with optional image"""
-    # Load adb tools for the first connected device
-    tools = AdbTools()
 
-    # Set up the Gemini LLM
-    llm = GoogleGenAI(
-        api_key=os.getenv("GEMINI_API_KEY"),
-        model="gemini-2.5-flash",
-    )
+def intent_enabled() -> bool:
+    return os.getenv("AUTOX_TWEET_INTENT", "1").lower() in ("1", "true", "yes")
+
+
+async def open_prefilled_composer(
+    post_content: str, has_image: bool = True, serial: str = None
+) -> bool:
+    """Open the Twitter/X composer with the tweet and image already filled in"""
+    media_uri = None
+    if has_image:
+        # The image agent saved the image to the gallery, it is the newest one
+        media_uri = await asyncio.to_thread(latest_image_uri, serial)
+        if media_uri is None:
+            print("No image in the device gallery, cannot attach it with an intent")
+            return False
+    try:
+        await asyncio.to_thread(
+            share_intent, TWITTER_PACKAGE, post_content, media_uri, serial
+        )
+        package = await asyncio.to_thread(foreground_package, serial)
+    except Exception as e:
+        print(f"Could not open the Twitter/X composer with an intent: {e}")
+        return False
+    if package != TWITTER_PACKAGE:
+        print(f"Share intent did not open Twitter/X (focused: {package or 'unknown'})")
+        return False
+    return True
+
 
-    # Create the DroidAgent
-    agent = DroidAgent(
-        goal=OPEN_TWITTER_CREATE_POST_GOAL(post_content, has_image),
-        llm=llm,
-        tools=tools,
-        enable_tracing=True,
-        save_trajectories="action",
-        reasoning=True,
-        vision=True,
+def composer_unposted(post_content: str, serial: str = None) -> bool:
+    """Check that the composer is still open with the tweet in it, so nothing was posted"""
+    try:
+        if foreground_package(serial) != TWITTER_PACKAGE:
+            return False
+        nodes = dump_ui(serial)
+    except Exception as e:
+        print(f"Could not check the Twitter/X composer: {e}")
+        return False
+    draft = " ".join(post_content.split())[:40].lower()
+    has_draft = any(draft in " ".join(node["text"].split()).lower() for node in nodes)
+    has_post_button = any(
+        node["text"].strip().lower() in POST_BUTTON_LABELS
+        or node["resource_id"].endswith("/button_tweet")
+        for node in nodes
     )
+    return has_draft and has_post_button
+
+
+def post_sent(post_content: str, serial: str = None) -> bool:
+    """Check that Twitter/X is open and the composer with the tweet is gone"""
+    try:
+        if foreground_package(serial) != TWITTER_PACKAGE:
+            return False
+    except Exception as e:
+        print(f"Could not check the Twitter/X composer: {e}")
+        return False
+    return not composer_unposted(post_content, serial)
 
-    # Run the agent
-    result = await agent.run()
-    print(f"Twitter poster - Success: {result['success']}")
 
+def parse_post_result(result: dict) -> dict:
     if result.get("output"):
         try:
             # Parse the JSON output
@@ -50,7 +94,98 @@ async def post_to_twitter(post_content: str, has_image: bool = True):
         return {"success": False, "message": "No result from Twitter posting"}
 
 
+async def post_to_twitter(
+    post_content: str, has_image: bool = True, serial: str = None
+):
+    """Post content to Twitter/X with optional image.
+
+    A result with "unknown" set means the tweet may have been posted, it
+    must not be posted again.
+    """
+    # Fast path: a share intent fills in the composer, so the agent only
+    # has to check it and tap Post instead of typing the tweet
+    if intent_enabled() and await open_prefilled_composer(
+        post_content, has_image, serial
+    ):
+        # droidrun is slow to import, load it only when an agent actually runs
+        from droidrun import AdbTools, DroidAgent
+
+        async def confirm(model):
+            # Shared Gemini client, reused across runs
+            agent = DroidAgent(
+                goal=CONFIRM_TWITTER_POST_GOAL(post_content, has_image),
+                llm=get_llm(model),
+                tools=AdbTools(serial=serial),
+                enable_tracing=True,
+                save_trajectories="action",
+                reasoning=False,
+                vision=True,
+                **agent_limits(),
+            )
+            return await run_agent(agent, "confirm_twitter_post", model, serial)
+
+        result = await route(
+            "confirm_twitter_post", confirm, lambda result: result["success"]
+        )
+        print(f"Twitter post confirmation - Success: {result['success']}")
+        post_result = parse_post_result(result) if result["success"] else None
+        if post_result and post_result.get("success"):
+            return post_result
+        # The agent may have tapped Post before it failed, the full flow
+        # would then publish the tweet twice
+        if not await asyncio.to_thread(composer_unposted, post_content, serial):
+            print("Prefilled composer is gone, not posting again")
+            return {
+                "success": False,
+                "unknown": True,
+                "message": "Confirmation failed after the composer closed, the tweet may be posted",
+            }
+        print("Prefilled composer was not posted, falling back to the full flow")
+
+    # The media picker steps only exist when an image is attached
+    flow = "post_to_twitter_image" if has_image else "post_to_twitter_text"
+    # Recorded UI flows replay without the LLM; the agent takes over on a mismatch
+    replayed = await replay_or_none(
+        flow,
+        {"post_content": post_content},
+        serial,
+        commit_labels=POST_BUTTON_LABELS,
+        verify=lambda: post_sent(post_content, serial),
+    )
+    if replayed:
+        return replayed
+
+    from droidrun import AdbTools, DroidAgent
+
+    # Load adb tools for the leased device (first connected one if no serial)
+    tools = AdbTools(serial=serial)
+
+    async def attempt(model):
+        # Create the DroidAgent
+        agent = DroidAgent(
+            goal=OPEN_TWITTER_CREATE_POST_GOAL(post_content, has_image),
+            llm=get_llm(model),
+            tools=tools,
+            enable_tracing=True,
+            save_trajectories="action",
+            reasoning=True,
+            vision=True,
+            **agent_limits(),
+        )
+        return await run_agent(agent, "post_to_twitter", model, serial)
+
+    # Run the agent on the routed model, a failure only escalates on later runs
+    result = await route("post_to_twitter", attempt, lambda result: result["success"])
+    print(f"Twitter poster - Success: {result['success']}")
+
+    if result["success"]:
+        await record_if_missing(flow, {"post_content": post_content}, serial, result)
+
+    return parse_post_result(result)
+
+
 if __name__ == "__main__":
+    load_dotenv()
     # Test with sample content
     test_content = "Excited about the latest tech trends! 🚀 #TechNews #Innovation"
     asyncio.run(post_to_twitter(test_content, has_image=False))
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Deterministic stand-ins for DroidAgent, AdbTools, GoogleGenAI and adb.
+
+install_fakes() registers them in sys.modules before the agents are
+imported, so the real orchestration code runs unchanged without a phone
+or a Gemini key.
+"""
+import asyncio
+import base64
+import itertools
+import json
+import os
+import random
+import re
+import stat
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeConfig:
+    """Latency (seconds) and failure rates of the fakes"""
+
+    def __init__(
+        self,
+        agent_latency: float = 0.05,
+        agent_steps: int = 5,
+        llm_latency: float = 0.02,
+        adb_latency: float = 0.002,
+        jitter: float = 0.2,
+        agent_failure_rate: float = 0.0,
+        llm_failure_rate: float = 0.0,
+        model_failure_rates: dict = None,
+        model_latencies: dict = None,
+        seed: int = 1,
+    ):
+        self.agent_latency = agent_latency
+        self.agent_steps = agent_steps
+        self.llm_latency = llm_latency
+        self.adb_latency = adb_latency
+        self.jitter = jitter
+        self.agent_failure_rate = agent_failure_rate
+        self.llm_failure_rate = llm_failure_rate
+        # Per model name: extra failure rate and latency multiplier, so the
+        # model router can be exercised with cheap models that fail
+        self.model_failure_rates = model_failure_rates or {}
+        self.model_latencies = model_latencies or {}
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def as_dict(self) -> dict:
+        return {k: v for k, v in vars(self).items() if not k.startswith("_")}
+
+    def delay(self, latency: float) -> float:
+        """Return latency with a seeded +/- jitter"""
+        with self._lock:
+            spread = self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, latency * (1 + spread))
+
+    def words(self, count: int) -> str:
+        """Seeded filler words, so generated posts are not near duplicates"""
+        with self._lock:
+            return " ".join(f"word{self._random.randrange(100000)}" for _ in range(count))
+
+    def model_delay(self, latency: float, model: str) -> float:
+        return self.delay(latency * self.model_latencies.get(model, 1.0))
+
+    def model_fails(self, model: str) -> bool:
+        return self.fails(self.model_failure_rates.get(model, 0.0))
+
+    def fails(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+
+config = FakeConfig()
+
+_trend_ids = itertools.count(1)
+_TREND_RE = re.compile(r"bench trend \d+")
+
+
+class FakeAdbTools:
+    """Stands in for droidrun.AdbTools, connecting costs adb_latency"""
+
+    def __init__(self, serial: str = None, **kwargs):
+        self.serial = serial
+        time.sleep(config.delay(config.adb_latency))
+
+
+class FakeDroidAgent:
+    """Stands in for droidrun.DroidAgent, answers each goal like the real apps"""
+
+    def __init__(self, goal: str, llm=None, tools=None, **kwargs):
+        self.goal = goal
+        self.llm = llm
+        self.tools = tools
+
+    async def run(self) -> dict:
+        model = getattr(self.llm, "model", None)
+        await asyncio.sleep(config.model_delay(config.agent_latency, model))
+        if config.fails(config.agent_failure_rate):
+            raise RuntimeError("fake agent lost the device")
+        if config.model_fails(model):
+            # A model too weak for the UI flow gives up after its steps
+            return {"success": False, "reason": "fake model got lost", "steps": config.agent_steps}
+        if "Google Trends" in self.goal:
+            # Every fetch returns new trends so runs never collide on claims
+            count = int(re.search(r"top (\d+) trending", self.goal).group(1))
+            output = []
+            for trend_id in itertools.islice(_trend_ids, count):
+                output.append(
+                    {
+                        "trending_topic": f"bench trend {trend_id}",
+                        "description": f"{trend_id}K+ searches",
+                        "category": "Technology",
+                    }
+                )
+        else:
+            output = {"success": True, "message": "done"}
+        return {"success": True, "output": json.dumps(output), "steps": config.agent_steps}
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        self.raw = {
+            "usage_metadata": {
+                "prompt_token_count": len(prompt) // 4,
+                "candidates_token_count": len(text) // 4,
+            }
+        }
+
+
+class FakeGoogleGenAI:
+    """Stands in for llama_index GoogleGenAI, echoes the trend it was asked about"""
+
+    def __init__(self, api_key: str = None, model: str = None, **kwargs):
+        self.model = model
+
+    async def acomplete(self, prompt: str, **kwargs) -> FakeResponse:
+        await asyncio.sleep(config.model_delay(config.llm_latency, self.model))
+        if config.fails(config.llm_failure_rate):
+            raise RuntimeError("503 UNAVAILABLE (fake)")
+        if config.model_fails(self.model):
+            # A model too weak for the prompt answers something unusable
+            return FakeResponse("", prompt)
+        match = _TREND_RE.search(prompt)
+        topic = match.group(0) if match else "droidrun"
+        post = f"Everyone is talking about {topic} today {config.words(6)}, and droidrun automated it #AI"
+        image_prompt = f"Comic illustration of {topic} with a phone running droidrun"
+        if '"twitter_post"' in prompt:
+            text = json.dumps({"twitter_post": post, "image_prompt": image_prompt})
+        elif '"candidates"' in prompt:
+            count = int(re.search(r"Write (\d+) different", prompt).group(1))
+            text = json.dumps({"candidates": [f"{post} {config.words(2)}" for _ in range(count)]})
+        elif "image prompt" in prompt.lower():
+            text = image_prompt
+        else:
+            text = post
+        return FakeResponse(text, prompt)
+
+
+# 1x1 PNG returned by the fake image API
+FAKE_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(config.delay(config.llm_latency))
+        if config.fails(config.llm_failure_rate):
+            self.send_error(503, "fake image API overloaded")
+            return
+        part = {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(FAKE_PNG).decode()}}
+        body = json.dumps({"candidates": [{"content": {"parts": [part]}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeImageServer:
+    """Local stand-in for the image API of the http image backend.
+
+    Answers every POST in the Gemini generateContent format with a tiny
+    PNG, after llm_latency and with llm_failure_rate 503s.
+    """
+
+    def __init__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/generate"
+
+    def start(self) -> str:
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def install_fakes(fake_config: FakeConfig = None):
+    """Register the fakes as droidrun and llama_index.llms.google_genai"""
+    global config
+    if fake_config is not None:
+        config = fake_config
+
+    droidrun = types.ModuleType("droidrun")
+    droidrun.DroidAgent = FakeDroidAgent
+    droidrun.AdbTools = FakeAdbTools
+    sys.modules["droidrun"] = droidrun
+
+    # Only the GoogleGenAI module is faked, llama_index.core stays absent
+    for name in ("llama_index", "llama_index.llms"):
+        module = types.ModuleType(name)
+        module.__path__ = []
+        sys.modules[name] = module
+    google_genai = types.ModuleType("llama_index.llms.google_genai")
+    google_genai.GoogleGenAI = FakeGoogleGenAI
+    sys.modules["llama_index.llms.google_genai"] = google_genai
+
+
+FAKE_ADB = """#!/bin/sh
+# Fake adb: logs every command and answers the ones AutoX reads
+echo "$@" >> "{directory}/adb.log"
+serial=default
+if [ "$1" = "-s" ]; then serial=$2; shift 2; fi
+case "$1 $2 $3" in
+  "devices  ") cat "{directory}/devices.txt";;
+  "shell wm size") echo "Physical size: 1080x2400";;
+  "shell content query") echo "Row: 0 _id=41, date_added=1700000000"; echo "Row: 1 _id=42, date_added=1700000100";;
+  "shell am start")
+    if [ -f "{directory}/no-activity" ]; then
+      echo "Error: Activity not started, unable to resolve Intent"; exit 1
+    fi
+    # Remember the package the intent targets as the focused app
+    while [ $# -gt 0 ]; do
+      if [ "$1" = "-p" ]; then echo "$2" > "{directory}/focus-$serial"; fi
+      shift
+    done
+    echo "Status: ok";;
+  "shell dumpsys window")
+    package=$(cat "{directory}/focus-$serial" 2>/dev/null || echo com.android.launcher3)
+    echo "  mCurrentFocus=Window{{1 u0 $package/$package.MainActivity}}";;
+  "exec-out uiautomator dump") cat "{directory}/ui-$serial.xml" 2>/dev/null;;
+esac
+"""
+
+
+def write_fake_adb(directory: str, devices: int) -> str:
+    """Write an adb script that reports `devices` connected devices.
+
+    Every command it receives is appended to adb.log in `directory`. A UI
+    dump prints ui-<serial>.xml, and am start fails while a no-activity
+    file exists.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "devices.txt"), "w") as f:
+        f.write("List of devices attached\n")
+        for index in range(devices):
+            f.write(f"bench-{index:03d}\tdevice\n")
+    path = os.path.join(directory, "adb")
+    with open(path, "w") as f:
+        f.write(FAKE_ADB.format(directory=directory))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""Offline benchmarks of the orchestration code.
+
+Every scenario runs in a fresh subprocess with its own state directory,
+a fake adb and the fakes from benchmarks/fakes.py, so peak RSS and
+import costs are measured per scenario:
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --scenarios content --concurrency 1 10 100
+    python -m benchmarks.run_benchmarks --save baseline.json
+    python -m benchmarks.run_benchmarks --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ("startup", "main", "daemon", "content", "agents", "router")
+
+# Timed in a fresh interpreter, without the fakes, so eager imports of the
+# real agent stacks show up (or fail when they are not installed)
+IMPORT_PROBE = (
+    "import time; started = time.perf_counter(); import main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_workers(concurrency: int, runs: int, job) -> list:
+    """Run job(index) `runs` times with `concurrency` in flight.
+
+    Returns (seconds, ok) for every run.
+    """
+    results = []
+    indexes = iter(range(runs))
+
+    async def worker():
+        for index in indexes:
+            started = time.monotonic()
+            try:
+                ok = await job(index)
+            except Exception:
+                ok = False
+            results.append((time.monotonic() - started, bool(ok)))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+async def bench_main(concurrency: int, runs: int) -> list:
+    """Full runs through main.main(), rendered to /dev/null"""
+    from rich.console import Console
+
+    # Workers run without a terminal: pin the size RichCLI lays out for,
+    # so results do not depend on whether (or in which terminal) the suite runs
+    os.environ["COLUMNS"] = "120"
+    os.environ["LINES"] = "40"
+    import main
+
+    main.console = Console(file=open(os.devnull, "w"), force_terminal=True, width=120)
+
+    async def job(index):
+        await main.main()
+        return True
+
+    results = await run_workers(concurrency, runs, job)
+    # main() returns nothing, take the outcomes from the run history
+    posted = sum(1 for row in main.get_run_store().iter_index() if row[1] == "posted")
+    return [(seconds, index < posted) for index, (seconds, _) in enumerate(results)]
+
+
+async def bench_daemon(concurrency: int, runs: int) -> list:
+    """Whole runs scheduled by PipelineDaemon on the shared device pool"""
+    from rich.console import Console
+
+    from daemon import PipelineDaemon
+    from device_pool import DevicePool
+    from pipeline import run_pipeline
+
+    results = []
+
+    async def timed_run(serial):
+        started = time.monotonic()
+        run = await run_pipeline(serial)
+        results.append((time.monotonic() - started, run["status"] == "completed"))
+        return run
+
+    daemon = PipelineDaemon(
+        DevicePool(),
+        max_concurrent=concurrency,
+        max_runs=runs,
+        no_trend_backoff=0,
+        run_fn=timed_run,
+        console=Console(file=open(os.devnull, "w")),
+    )
+    await daemon.run()
+    return results
+
+
+async def bench_content(concurrency: int, runs: int) -> list:
+    """ContentGenerator on a new trend per run, so the cache never hits"""
+    from agents.content_generator import ContentGenerator
+
+    generator = ContentGenerator()
+
+    async def job(index):
+        content = await generator.generate_content_from_trend(
+            {
+                "trending_topic": f"bench trend {index}",
+                "description": f"{index}K+ searches",
+                "category": "Technology",
+            }
+        )
+        return content and content.get("twitter_post")
+
+    return await run_workers(concurrency, runs, job)
+
+
+async def bench_agents(concurrency: int, runs: int) -> list:
+    """The three DroidAgent wrappers, one call per run in rotation"""
+    from agents.find_trend import find_trend_with_agent
+    from agents.image_backends import get_image_backend
+    from agents.twitter_poster import post_to_twitter
+
+    async def job(index):
+        serial = f"bench-{index % concurrency:03d}"
+        wrapper = index % 3
+        if wrapper == 0:
+            return await find_trend_with_agent(serial)
+        if wrapper == 1:
+            image_prompt = f"image of bench trend {index}"
+            return (await get_image_backend().generate(image_prompt, serial))["success"]
+        return (await post_to_twitter(f"post about bench trend {index}", True, serial))["success"]
+
+    return await run_workers(concurrency, runs, job)
+
+
+async def bench_router(concurrency: int, runs: int) -> list:
+    """Content generation and trend agents routed between cheap and big models.
+
+    With --model-failure-rate the cheap models fail, so the router has to
+    escalate and then learn to start on the bigger model.
+    """
+    from agents.content_generator import ContentGenerator
+    from agents.find_trend import find_trends_with_agent
+
+    generator = ContentGenerator()
+
+    async def job(index):
+        if index % 2:
+            return await find_trends_with_agent(f"bench-{index % concurrency:03d}")
+        content = await generator.generate_content_from_trend(
+            {
+                "trending_topic": f"bench trend {index}",
+                "description": f"{index}K+ searches",
+                "category": "Technology",
+            }
+        )
+        return content and content.get("twitter_post")
+
+    return await run_workers(concurrency, runs, job)
+
+
+async def bench_startup(concurrency: int, runs: int) -> list:
+    """Import time of the main module in fresh interpreters"""
+    slots = asyncio.Semaphore(concurrency)
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+
+    async def probe():
+        async with slots:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-c",
+                IMPORT_PROBE,
+                cwd=REPO_ROOT,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            stdout, _ = await process.communicate()
+            if process.returncode != 0:
+                return 0.0, False
+            return float(stdout.decode().strip().splitlines()[-1]), True
+
+    return await asyncio.gather(*(probe() for _ in range(runs)))
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "main": bench_main,
+    "daemon": bench_daemon,
+    "content": bench_content,
+    "agents": bench_agents,
+    "router": bench_router,
+}
+
+
+def run_worker(params: dict):
+    """Run one scenario in this process and write its result as JSON"""
+    state_dir = params["state_dir"]
+    os.environ.update(
+        {
+            "AUTOX_STATE_DIR": state_dir,
+            "AUTOX_ADB": params["adb"],
+            "AUTOX_TREND_SOURCES": "agent",
+            "AUTOX_TREND_CACHE": "0",
+            "GEMINI_API_KEY": "benchmark",
+        }
+    )
+    sys.path.insert(0, REPO_ROOT)
+    from benchmarks.fakes import FakeConfig, FakeImageServer, install_fakes
+
+    install_fakes(FakeConfig(**params["fakes"]))
+    if params["image_backend"] == "http":
+        image_server = FakeImageServer()
+        os.environ["AUTOX_IMAGE_BACKENDS"] = "http,agent"
+        os.environ["AUTOX_IMAGE_API_URL"] = image_server.start()
+
+    started = time.monotonic()
+    benchmark = BENCHMARKS[params["scenario"]]
+    results = asyncio.run(benchmark(params["concurrency"], params["runs"]))
+    wall = time.monotonic() - started
+
+    from agents.llm_registry import registry
+
+    latencies = [seconds for seconds, _ in results]
+    ok = sum(1 for _, success in results if success)
+    result = {
+        "scenario": params["scenario"],
+        "concurrency": params["concurrency"],
+        "runs": len(results),
+        "ok": ok,
+        "failed": len(results) - ok,
+        "wall_seconds": round(wall, 3),
+        "throughput": round(len(results) / wall, 3) if wall else 0.0,
+        "p50": round(percentile(latencies, 0.50), 4),
+        "p95": round(percentile(latencies, 0.95), 4),
+        "p99": round(percentile(latencies, 0.99), 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "model_requests": {
+            model: stats["requests"] for model, stats in registry.stats().items()
+        },
+    }
+    with open(params["result_path"], "w") as f:
+        json.dump(result, f)
+
+
+def run_scenario(
+    scenario: str,
+    concurrency: int,
+    runs: int,
+    fakes: dict,
+    workdir: str,
+    image_backend: str = "agent",
+) -> dict:
+    """Run one scenario in a subprocess and return its result"""
+    from benchmarks.fakes import write_fake_adb
+
+    name = f"{scenario}-{concurrency}"
+    state_dir = os.path.join(workdir, name)
+    params = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "runs": runs,
+        "fakes": fakes,
+        "image_backend": image_backend,
+        "state_dir": state_dir,
+        "adb": write_fake_adb(os.path.join(state_dir, "bin"), concurrency),
+        "result_path": os.path.join(workdir, f"{name}.json"),
+    }
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run_benchmarks", "--worker", json.dumps(params)],
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if completed.returncode != 0:
+        return {
+            "scenario": scenario,
+            "concurrency": concurrency,
+            "error": completed.stderr.strip().splitlines()[-1:] or ["worker failed"],
+        }
+    with open(params["result_path"]) as f:
+        return json.load(f)
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Return the scenarios whose throughput fell more than tolerance below the baseline"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline if "error" not in r}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if not before or "error" in result or not before["throughput"]:
+            continue
+        change = result["throughput"] / before["throughput"] - 1
+        result["throughput_change"] = round(change, 3)
+        if change < -tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def print_results(results: list):
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+    compared = any("throughput_change" in r for r in results)
+    table = Table(title="⏱️ AutoX offline benchmarks")
+    columns = ["Scenario", "Conc.", "Runs", "Failed", "Runs/s", "p50 s", "p95 s", "p99 s", "RSS MB"]
+    if compared:
+        columns.append("Δ Runs/s")
+    for column in columns:
+        table.add_column(column, justify="left" if column == "Scenario" else "right")
+    for r in results:
+        if "error" in r:
+            table.add_row(r["scenario"], str(r["concurrency"]), "[red]error[/red]")
+            continue
+        row = [
+            r["scenario"],
+            str(r["concurrency"]),
+            str(r["runs"]),
+            str(r["failed"]),
+            f"{r['throughput']:.1f}",
+            f"{r['p50']:.3f}",
+            f"{r['p95']:.3f}",
+            f"{r['p99']:.3f}",
+            f"{r['peak_rss_mb']:.1f}",
+        ]
+        if compared:
+            change = r.get("throughput_change")
+            row.append("" if change is None else f"{change:+.0%}")
+        table.add_row(*row)
+    console.print(table)
+    for r in results:
+        if r["scenario"] == "router" and "error" not in r:
+            requests = ", ".join(f"{m} {n}" for m, n in sorted(r["model_requests"].items()))
+            console.print(f"router at concurrency {r['concurrency']}: {requests}")
+    for r in results:
+        if "error" in r:
+            console.print(f"[red]{r['scenario']} at concurrency {r['concurrency']} failed: {r['error'][0]}[/red]")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the AutoX orchestration with fake agents, LLM and adb"
+    )
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 10, 100])
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=None,
+        help="runs per scenario (default: 20, or 2x the concurrency if higher)",
+    )
+    parser.add_argument("--agent-latency", type=float, default=0.05)
+    parser.add_argument("--agent-steps", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.02)
+    parser.add_argument("--adb-latency", type=float, default=0.002)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--agent-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--model-failure-rate",
+        action="append",
+        default=[],
+        metavar="MODEL=RATE",
+        help="failure rate of the fake agents and LLM calls on one model, repeatable",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--image-backend",
+        choices=("agent", "http"),
+        default="agent",
+        help="make images with the fake agent or through a local fake image API",
+    )
+    parser.add_argument("--save", metavar="FILE", help="write the results as JSON")
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="compare with saved results and exit 1 on a throughput regression",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed throughput drop against the baseline (default: 0.2)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        run_worker(json.loads(args.worker))
+        return
+
+    fakes = {
+        "agent_latency": args.agent_latency,
+        "agent_steps": args.agent_steps,
+        "llm_latency": args.llm_latency,
+        "adb_latency": args.adb_latency,
+        "jitter": args.jitter,
+        "agent_failure_rate": args.agent_failure_rate,
+        "llm_failure_rate": args.llm_failure_rate,
+        "model_failure_rates": {
+            model: float(rate)
+            for model, _, rate in (v.partition("=") for v in args.model_failure_rate)
+        },
+        "seed": args.seed,
+    }
+    results = []
+    with tempfile.TemporaryDirectory(prefix="autox-bench-") as workdir:
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                runs = args.runs or max(20, 2 * concurrency)
+                print(f"Running {scenario} at concurrency {concurrency} ({runs} runs)...")
+                results.append(
+                    run_scenario(scenario, concurrency, runs, fakes, workdir, args.image_backend)
+                )
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"fakes": fakes, "results": results}, f, indent=2)
+    if regressions:
+        for r in regressions:
+            print(
+                f"Throughput regression: {r['scenario']} at concurrency "
+                f"{r['concurrency']} changed {r['throughput_change']:+.0%}"
+            )
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
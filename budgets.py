@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import os
+import time
+from datetime import datetime, timedelta
+
+# Seconds a stage may run before it is cancelled, AUTOX_STAGE_DEADLINE_<STAGE>
+# overrides them and 0 turns the deadline off. The post stage has none:
+# cancelled after Post was tapped, the tweet would be out but not recorded
+STAGE_DEADLINES = {"trend": 900, "content": 300, "image": 900, "post": 0}
+
+# Stages that can run twice without side effects: a second image only
+# lands in another gallery, and is only hedged with a host image backend
+# that can push it to the run's device. A second trend lookup would only
+# wait on the trend cache's refresh lock held by the first one
+HEDGEABLE_STAGES = ("image",)
+
+# How often a running agent's token use is compared with its budget
+TOKEN_CHECK_INTERVAL = 1.0
+
+
+class BudgetExceeded(Exception):
+    """Raised when an agent or stage used up its time, step or token budget"""
+
+
+def stage_deadline(stage: str):
+    """Seconds the stage may take, None for no deadline"""
+    value = float(
+        os.getenv(f"AUTOX_STAGE_DEADLINE_{stage.upper()}", STAGE_DEADLINES.get(stage, 0))
+    )
+    return value if value > 0 else None
+
+
+def agent_limits() -> dict:
+    """Step and time limits passed to every DroidAgent"""
+    return {
+        "max_steps": int(os.getenv("AUTOX_AGENT_MAX_STEPS", "20")),
+        "timeout": int(os.getenv("AUTOX_AGENT_TIMEOUT", "600")),
+    }
+
+
+def agent_token_budget() -> int:
+    """Tokens one agent run may use before it is cancelled, 0 for no limit"""
+    return int(os.getenv("AUTOX_AGENT_MAX_TOKENS", "0"))
+
+
+def hedged_stages() -> tuple:
+    """Stages that get a second attempt on another device once they run slow"""
+    names = os.getenv("AUTOX_HEDGE_STAGES", "").split(",")
+    return tuple(name.strip() for name in names if name.strip() in HEDGEABLE_STAGES)
+
+
+class StageLatency:
+    """p95 stage durations from the run history, refreshed every few minutes"""
+
+    def __init__(self, min_runs: int = None, window_days: float = 7, ttl: float = 600):
+        self.min_runs = min_runs or int(os.getenv("AUTOX_HEDGE_MIN_RUNS", "20"))
+        self.window_days = window_days
+        self.ttl = ttl
+        self._stats = None
+        self._loaded_at = 0.0
+
+    def p95(self, stage: str):
+        """The stage's p95 duration, None until min_runs durations are recorded"""
+        if self._stats is None or time.monotonic() - self._loaded_at > self.ttl:
+            from run_store import get_run_store
+
+            since = (datetime.now() - timedelta(days=self.window_days)).isoformat()
+            self._stats = get_run_store().stats(since)["stages"]
+            self._loaded_at = time.monotonic()
+        timing = self._stats.get(stage)
+        if not timing or timing["count"] < self.min_runs:
+            return None
+        return timing["p95"]
+
+
+_default_latency = None
+
+
+def hedge_delay(stage: str):
+    """Seconds after which a hedged stage starts its second attempt, or None"""
+    global _default_latency
+    override = os.getenv(f"AUTOX_HEDGE_AFTER_{stage.upper()}")
+    if override:
+        return float(override)
+    if _default_latency is None:
+        _default_latency = StageLatency()
+    return _default_latency.p95(stage)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import json
+import os
+import time
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(
+    os.getenv("AUTOX_STATE_DIR", ".autox"), "checkpoints"
+)
+
+
+class CheckpointStore:
+    """Keeps the state of every unfinished pipeline run on disk.
+
+    The run dict is rewritten atomically after each stage, so a failed or
+    interrupted run can be resumed at its first incomplete stage. The
+    checkpoint is removed once every stage has succeeded, and checkpoints
+    older than `max_age` are pruned.
+    """
+
+    def __init__(self, directory: str = None, max_age: float = None):
+        self.directory = directory or os.getenv(
+            "AUTOX_CHECKPOINT_DIR", DEFAULT_CHECKPOINT_DIR
+        )
+        self.max_age = max_age if max_age is not None else float(
+            os.getenv("AUTOX_CHECKPOINT_MAX_AGE", "604800")
+        )
+        self._last_prune = 0.0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{run_id}.json")
+
+    def save(self, run: dict):
+        """Atomically write the checkpoint of a run"""
+        path = self._path(run["run_id"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(run, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        if time.time() - self._last_prune > 3600:
+            self.prune()
+
+    def load(self, run_id: str) -> dict:
+        """Load the checkpoint of a run"""
+        with open(self._path(run_id)) as f:
+            return json.load(f)
+
+    def delete(self, run_id: str):
+        """Remove the checkpoint of a run"""
+        try:
+            os.remove(self._path(run_id))
+        except FileNotFoundError:
+            pass
+
+    def prune(self):
+        """Remove checkpoints that were not touched for max_age seconds"""
+        self._last_prune = time.time()
+        for run_id in self.run_ids():
+            path = self._path(run_id)
+            try:
+                if self._last_prune - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def run_ids(self) -> list:
+        """Return the ids of all checkpointed runs, oldest first"""
+        names = [n for n in os.listdir(self.directory) if n.endswith(".json")]
+        return sorted(name[: -len(".json")] for name in names)
+
+    def latest(self):
+        """Return the id of the most recent checkpointed run, or None"""
+        run_ids = self.run_ids()
+        return run_ids[-1] if run_ids else None
+
+
+_default_store = None
+
+
+def get_checkpoint_store():
+    """Return the shared checkpoint store, or None when AUTOX_CHECKPOINTS=0"""
+    global _default_store
+    if os.getenv("AUTOX_CHECKPOINTS", "1").lower() in ("0", "false", "no"):
+        return None
+    if _default_store is None:
+        _default_store = CheckpointStore()
+    return _default_store
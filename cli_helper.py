@@ -1,18 +1,22 @@
 import time
 import os
-import asyncio
+import shutil
+import itertools
+from collections import deque
 
 from rich.console import Console
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.layout import Layout
 from rich.text import Text
 from rich.align import Align
-from rich.live import Live
 from rich.console import Group
 from rich.spinner import Spinner
+from rich.table import Table
 from rich.box import SIMPLE
 
+# Height of the fixed header with the logo
+HEADER_SIZE = 18
+
 # Twitter ASCII Art
 LOGO = """               
               ..=                     
@@ -62,31 +66,72 @@ LOGO_FIRE_ONLY = """
 """
 
 
-class RichCLI:
+class StageTable:
+    """Renders every running stage as one row of a single table.
+
+    All rows share one spinner, and the frame is picked from the clock at
+    render time, so nothing has to be rebuilt while the stages run.
+    """
+
     def __init__(self):
+        self.spinner = Spinner("dots")
+        self.stages = {}
+
+    def __len__(self):
+        return len(self.stages)
+
+    def __rich__(self):
+        if not self.stages:
+            return Text("")
+        now = time.monotonic()
+        frame = self.spinner.render(now).plain
+        table = Table.grid(padding=(0, 1))
+        table.add_column(width=2)
+        table.add_column(no_wrap=True)
+        table.add_column(ratio=1, overflow="ellipsis", no_wrap=True)
+        table.add_column(justify="right")
+        for agent_name, description, color, started in self.stages.values():
+            table.add_row(
+                Text(frame, style=color),
+                Text(agent_name, style=f"bold {color}"),
+                description,
+                Text(f"{now - started:.0f}s", style="dim"),
+            )
+        return Panel(table, style="bright_black", padding=(0, 1))
+
+
+class RichCLI:
+    """Fixed header over a bounded buffer of result panels.
+
+    Only the newest `max_panels` panels are kept, and only the ones that fit
+    under the header are rendered, so render cost does not grow with the
+    length of the session. Each panel is measured once when it is added.
+    """
+
+    def __init__(self, max_panels: int = None):
         self.console = Console()
+        # Probing the terminal fails without a TTY, fall back to a default size
+        self.width, self.height = shutil.get_terminal_size((120, 40))
+        self.max_panels = max_panels or int(os.getenv("AUTOX_CLI_MAX_PANELS", "100"))
+        self.content_panels = deque(maxlen=self.max_panels)
+        self.hidden_panels = 0
+        self.stage_table = StageTable()
+        self._stage_ids = itertools.count()
         self.layout = Layout()
-        self.content_panels = []
         self.setup_layout()
 
     def setup_layout(self):
         """Setup the main layout structure with fixed header"""
         self.layout.split_column(
-            Layout(name="header", size=18), Layout(name="main", ratio=1)
+            Layout(name="header", size=HEADER_SIZE), Layout(name="main", ratio=1)
         )
         # Set the fixed header that never changes
         self.layout["header"].update(self.create_header())
+        self.update_main_content()
 
     def create_header(self):
         """Create the fixed header with Twitter logo"""
-        if os.get_terminal_size().columns < 80:
-            return Panel(
-                Align.center(Text(LOGO_FIRE_ONLY, style="bold dark-orange3")),
-                style="bold orange3",
-                padding=(0, 0),
-                box=SIMPLE,
-            )
-        elif os.get_terminal_size().columns < 120:
+        if self.width < 120:
             return Panel(
                 Align.center(Text(LOGO_FIRE_ONLY, style="bold dark-orange3")),
                 style="bold orange3",
@@ -101,21 +146,47 @@ class RichCLI:
                 box=SIMPLE,
             )
 
+    def _measure(self, panel) -> int:
+        options = self.console.options.update(width=self.width)
+        return len(self.console.render_lines(panel, options, pad=False))
+
     def add_content_panel(self, panel):
         """Add a content panel to the scrollable main area"""
-        self.content_panels.append(panel)
+        if len(self.content_panels) == self.max_panels:
+            self.hidden_panels += 1
+        self.content_panels.append((panel, self._measure(panel)))
         self.update_main_content()
 
+    def visible_panels(self) -> list:
+        """Return the newest panels that fit under the header and stage table"""
+        available = self.height - HEADER_SIZE - (len(self.stage_table) + 2 if self.stage_table else 0)
+        visible = []
+        for panel, lines in reversed(self.content_panels):
+            if visible and lines > available:
+                break
+            visible.append(panel)
+            available -= lines
+        visible.reverse()
+        return visible
+
     def update_main_content(self):
-        """Update the main content area with all panels"""
-        if self.content_panels:
-            self.layout["main"].update(Group(*self.content_panels))
-        else:
+        """Update the main content area with the visible panels and running stages"""
+        visible = self.visible_panels()
+        if not visible and not self.stage_table:
             self.layout["main"].update(Panel("Ready to start   ", style="dim"))
+            return
+        renderables = []
+        earlier = self.hidden_panels + len(self.content_panels) - len(visible)
+        if earlier:
+            renderables.append(Text(f"… {earlier} earlier messages", style="dim"))
+        renderables += visible
+        renderables.append(self.stage_table)
+        self.layout["main"].update(Group(*renderables))
 
     def clear_content(self):
         """Clear all content panels but keep the header"""
-        self.content_panels = []
+        self.content_panels.clear()
+        self.hidden_panels = 0
         self.update_main_content()
 
     async def run_with_spinner(
@@ -126,73 +197,29 @@ class RichCLI:
         color: str = "cyan",
         live_display=None,
     ):
-        """Run a coroutine with a real animated spinner in the main area"""
+        """Run a coroutine as a row of the running stages table"""
         result = None
         error = None
 
         if live_display:
-            # Create a spinner object
-            spinner = Spinner("dots", style=color)
-            spinner_panel = None
-
-            # Create task to update spinner
-            async def update_spinner():
-                start_time = time.time()
-                while True:
-                    try:
-                        # Update spinner frame
-                        spinner_text = Text()
-                        spinner_text.append(
-                            str(spinner.render(time.time() - start_time)), style=color
-                        )
-                        spinner_text.append(
-                            Text.from_markup(
-                                f" [bold {color}]{agent_name}[/bold {color}]: {description}"
-                            )
-                        )
-
-                        # Create new spinner panel
-                        new_spinner_panel = Panel(
-                            spinner_text,
-                            style=color,
-                            padding=(1, 2),
-                        )
-
-                        # Replace old spinner panel
-                        nonlocal spinner_panel
-                        if spinner_panel and spinner_panel in self.content_panels:
-                            idx = self.content_panels.index(spinner_panel)
-                            self.content_panels[idx] = new_spinner_panel
-                        else:
-                            self.content_panels.append(new_spinner_panel)
-
-                        spinner_panel = new_spinner_panel
-                        self.update_main_content()
-                        live_display.refresh()
-
-                        await asyncio.sleep(0.1)  # Update 10 times per second
-                    except asyncio.CancelledError:
-                        break
-
-            # Start spinner task
-            spinner_task = asyncio.create_task(update_spinner())
-
+            stage_id = next(self._stage_ids)
+            self.stage_table.stages[stage_id] = (
+                agent_name,
+                Text.from_markup(description),
+                color,
+                time.monotonic(),
+            )
+            self.update_main_content()
+            live_display.refresh()
             try:
                 result = await coro
             except Exception as e:
                 error = e
             finally:
-                # Stop spinner
-                spinner_task.cancel()
-                try:
-                    await spinner_task
-                except asyncio.CancelledError:
-                    pass
-
-                # Remove spinner panel after completion
-                if spinner_panel and spinner_panel in self.content_panels:
-                    self.content_panels.remove(spinner_panel)
-                    self.update_main_content()
+                # The Live display animates the row until the stage is removed
+                del self.stage_table.stages[stage_id]
+                self.update_main_content()
+                live_display.refresh()
         else:
             # Fallback without live display
             try:
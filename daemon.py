@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+import asyncio
+import signal
+import subprocess
+from datetime import datetime
+
+from rich.console import Console
+
+from agents.llm_registry import registry
+from pipeline import run_pipeline
+from stage_executor import StageExecutor
+
+# Substrings of LLM errors that mean the API quota or rate limit is used up
+QUOTA_ERROR_MARKERS = ("429", "resource_exhausted", "quota", "rate limit")
+
+# Errors of a device lease that pass once adb and the devices are back
+DEVICE_ERRORS = (RuntimeError, FileNotFoundError, subprocess.SubprocessError)
+
+
+def is_quota_error(error) -> bool:
+    """Check whether an error message looks like an exhausted LLM quota"""
+    message = str(error).lower()
+    return any(marker in message for marker in QUOTA_ERROR_MARKERS)
+
+
+class PipelineDaemon:
+    """Runs pipelines continuously with a cap on how many are in flight.
+
+    A new run only starts once a slot and a device are free and the LLM
+    quota is not cooling down, so a saturated host simply stops scheduling
+    instead of queueing work. SIGTERM/SIGINT stop scheduling and let the
+    runs in flight finish; a second signal cancels them.
+
+    With pipelined=True runs go through a StageExecutor instead, so the
+    stages of consecutive runs overlap. on_event(event, stage, run, error)
+    receives the stage events of every run and a final "run_end".
+    """
+
+    def __init__(
+        self,
+        device_pool,
+        max_concurrent: int = 1,
+        interval: float = 0.0,
+        max_runs: int = None,
+        quota_backoff: float = 60.0,
+        max_quota_backoff: float = 900.0,
+        no_trend_backoff: float = 60.0,
+        pipelined: bool = False,
+        stage_workers: dict = None,
+        run_fn=None,
+        on_event=None,
+        console=None,
+    ):
+        self.device_pool = device_pool
+        self.max_concurrent = max(1, max_concurrent)
+        self.interval = interval
+        self.max_runs = max_runs
+        self.quota_backoff = quota_backoff
+        self.max_quota_backoff = max_quota_backoff
+        self.no_trend_backoff = no_trend_backoff
+        self.pipelined = pipelined
+        self.stage_workers = stage_workers
+        self.on_event = on_event
+        self.run_fn = run_fn or (
+            lambda serial: run_pipeline(
+                serial, on_event=self.on_event, device_pool=self.device_pool
+            )
+        )
+        self.console = console or Console()
+        self.stopping = asyncio.Event()
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self._tasks = set()
+        self._executor = None
+        self._cooldown_until = 0.0
+        self._quota_strikes = 0
+
+    def log(self, message: str):
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.console.print(f"[dim]{timestamp}[/dim] {message}")
+
+    def stop(self):
+        """Stop scheduling new runs; on a second call cancel runs in flight"""
+        if self.stopping.is_set():
+            self.log("⏹️ [bold red]Cancelling runs in flight[/bold red]")
+            for task in self._tasks:
+                task.cancel()
+            if self._executor:
+                asyncio.ensure_future(self._executor.stop())
+            return
+        self.log("⏹️ [bold yellow]Shutting down, waiting for runs in flight[/bold yellow]")
+        self.stopping.set()
+
+    async def _until_stopped(self, coro):
+        """Await coro unless the daemon is stopped first, then return None"""
+        task = asyncio.ensure_future(coro)
+        stop_task = asyncio.ensure_future(self.stopping.wait())
+        await asyncio.wait({task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        stop_task.cancel()
+        if task.done():
+            return task.result()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return None
+
+    async def _sleep(self, seconds: float):
+        if seconds > 0:
+            await self._until_stopped(asyncio.sleep(seconds))
+
+    def _note_quota_error(self):
+        loop = asyncio.get_running_loop()
+        backoff = min(
+            self.quota_backoff * 2**self._quota_strikes, self.max_quota_backoff
+        )
+        self._quota_strikes += 1
+        self._cooldown_until = max(self._cooldown_until, loop.time() + backoff)
+        self.log(f"🐢 [yellow]LLM quota exhausted, pausing new runs for {backoff:.0f}s[/yellow]")
+
+    def _record_run(self, run: dict, serial: str = None):
+        """Update counters and quota backoff from a finished run"""
+        if self.on_event:
+            self.on_event("run_end", None, run, None)
+        errors = run.get("errors", {})
+        where = f" on {serial}" if serial else ""
+        if any(is_quota_error(error) for error in errors.values()):
+            self._note_quota_error()
+        elif "trend" in errors:
+            # Every current trend is already used, wait for the feed to move on
+            loop = asyncio.get_running_loop()
+            self._cooldown_until = max(
+                self._cooldown_until, loop.time() + self.no_trend_backoff
+            )
+        elif run.get("status") == "completed":
+            self._quota_strikes = 0
+        if run.get("status") == "completed":
+            self.completed += 1
+            self.log(f"✅ [green]Run finished{where}[/green]")
+        else:
+            self.failed += 1
+            self.log(f"❌ [red]Run failed{where}: {errors}[/red]")
+
+    async def _run_one(self, serial: str, slots: asyncio.Semaphore):
+        try:
+            run = await self.run_fn(serial)
+            self._record_run(run, serial)
+        except asyncio.CancelledError:
+            self.failed += 1
+            self.log(f"⏹️ [yellow]Run cancelled on {serial}[/yellow]")
+        except Exception as e:
+            self.failed += 1
+            if is_quota_error(e):
+                self._note_quota_error()
+            self.log(f"❌ [red]Run crashed on {serial}: {e}[/red]")
+        finally:
+            self.device_pool.release(serial)
+            slots.release()
+
+    def _reached_max_runs(self) -> bool:
+        return self.max_runs is not None and self.started >= self.max_runs
+
+    async def run(self):
+        """Schedule runs until stopped or max_runs have been started"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stop)
+
+        mode = "pipelined" if self.pipelined else "whole runs"
+        self.log(
+            f"🚀 [bold orange3]Daemon started[/bold orange3] "
+            f"(max {self.max_concurrent} runs in flight, {mode})"
+        )
+
+        try:
+            if self.pipelined:
+                await self._schedule_pipelined()
+            else:
+                await self._schedule_runs()
+        finally:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(sig)
+
+        self.log(
+            f"📊 Daemon stopped: {self.completed} completed, "
+            f"{self.failed} failed, {self.started} started"
+        )
+        for model, stats in registry.stats().items():
+            self.log(
+                f"🔌 {model}: {stats['clients_created']} clients created, "
+                f"{stats['leases']} leases, {stats['requests']} requests"
+            )
+
+    async def _schedule_pipelined(self):
+        """Feed runs into a StageExecutor so stages of consecutive runs overlap"""
+        loop = asyncio.get_running_loop()
+        self._executor = StageExecutor(
+            self.device_pool,
+            workers=self.stage_workers,
+            max_in_flight=self.max_concurrent,
+            on_event=self.on_event,
+            on_complete=self._record_run,
+        )
+        self._executor.start()
+        try:
+            while not self.stopping.is_set() and not self._reached_max_runs():
+                await self._sleep(self._cooldown_until - loop.time())
+                if self.stopping.is_set():
+                    break
+                # Blocks while max_concurrent runs are in the pipeline
+                if not await self._until_stopped(self._executor.submit()):
+                    break
+                self.started += 1
+                self.log(f"▶️ Queued run {self.started}")
+                await self._sleep(self.interval)
+
+            await self._executor.drain()
+        finally:
+            await self._executor.stop()
+            self._executor = None
+
+    async def _schedule_runs(self):
+        """Start whole runs as tasks, each on its own leased device"""
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_concurrent)
+        while not self.stopping.is_set():
+            if self._reached_max_runs():
+                break
+
+            # Backpressure: a free slot, no quota cooldown and a free device
+            if not await self._until_stopped(slots.acquire()):
+                break
+            await self._sleep(self._cooldown_until - loop.time())
+            if self.stopping.is_set():
+                slots.release()
+                break
+            try:
+                serial = await self._until_stopped(self.device_pool.acquire())
+            except DEVICE_ERRORS as e:
+                slots.release()
+                self.log(f"📱 [yellow]{e}, retrying in 30s[/yellow]")
+                await self._sleep(30)
+                continue
+            if not serial:
+                slots.release()
+                break
+
+            self.started += 1
+            self.log(f"▶️ Starting run {self.started} on [yellow]{serial}[/yellow]")
+            task = asyncio.create_task(self._run_one(serial, slots))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+            await self._sleep(self.interval)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,95 @@
+import asyncio
+import fcntl
+import os
+from contextlib import asynccontextmanager
+
+from adb_helper import list_devices
+
+# Directory holding one lock file per device serial
+DEFAULT_LOCK_DIR = os.path.join(os.getenv("AUTOX_STATE_DIR", ".autox"), "locks")
+
+
+class DevicePool:
+    """Leases connected Android devices to pipeline runs.
+
+    Every lease holds an exclusive flock() on a per-serial lock file, so a
+    device is only ever driven by one run, even across several main.py
+    processes on the same host.
+    """
+
+    def __init__(self, serials=None, lock_dir=None, poll_interval: float = 1.0):
+        configured = os.getenv("AUTOX_DEVICES", "")
+        self.serials = serials or [s.strip() for s in configured.split(",") if s.strip()]
+        self.lock_dir = lock_dir or DEFAULT_LOCK_DIR
+        self.poll_interval = poll_interval
+        self._locks = {}
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+    def devices(self) -> list:
+        """Return the serials this pool hands out"""
+        return list(self.serials) or list_devices()
+
+    def leased(self) -> list:
+        """Return the serials currently leased by this pool"""
+        return list(self._locks)
+
+    def _lock_path(self, serial: str) -> str:
+        safe_name = serial.replace(":", "_").replace("/", "_")
+        return os.path.join(self.lock_dir, f"{safe_name}.lock")
+
+    def try_acquire(self, exclude=(), devices=None):
+        """Lease the first free device without waiting, or return None"""
+        for serial in devices or self.devices():
+            if serial in self._locks or serial in exclude:
+                continue
+            fd = os.open(self._lock_path(serial), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+            self._locks[serial] = fd
+            return serial
+        return None
+
+    async def acquire(
+        self, timeout: float = None, exclude=(), prefer: str = None
+    ) -> str:
+        """Lease a device, waiting until one is free.
+
+        A preferred serial that is still connected is waited for instead of
+        handing out another device.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            devices = await asyncio.to_thread(self.devices)
+            if not devices:
+                raise RuntimeError("No connected Android devices found")
+            if prefer in devices:
+                devices = [prefer]
+            serial = self.try_acquire(exclude, devices)
+            if serial:
+                return serial
+            if deadline is not None and loop.time() >= deadline:
+                raise TimeoutError("Timed out waiting for a free device")
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self, serial: str):
+        """Return a leased device to the pool"""
+        fd = self._locks.pop(serial, None)
+        if fd is None:
+            return
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    @asynccontextmanager
+    async def lease(self, timeout: float = None):
+        """Lease a device for the duration of a pipeline run"""
+        serial = await self.acquire(timeout)
+        try:
+            yield serial
+        finally:
+            self.release(serial)
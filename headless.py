@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import json
+import socket
+import sys
+import time
+from datetime import datetime
+
+from checkpoints import get_checkpoint_store
+from pipeline import pending_stages
+
+
+def stage_result(stage: str, run: dict) -> dict:
+    """Return the fields a stage added to the run"""
+    if stage == "trend":
+        return {"trend_data": run.get("trend_data")}
+    if stage == "content":
+        return {"generated_content": run.get("generated_content")}
+    if stage == "image":
+        return {
+            "image_generated": run.get("image_generated", False),
+            "image_path": run.get("image_path"),
+        }
+    if stage == "post":
+        return {
+            "twitter_posted": run.get("twitter_posted", False),
+            "post_unknown": run.get("post_unknown", False),
+        }
+    return {}
+
+
+class EventWriter:
+    """Writes pipeline events as JSON lines to stdout or a socket.
+
+    `target` is "-" for stdout, "unix:/path/to.sock" or "tcp:host:port".
+    A socket is reconnected once when a write fails; events that still
+    cannot be sent are reported on stderr and dropped, so a restarting
+    log shipper never stops the pipeline.
+    """
+
+    def __init__(self, target: str = "-"):
+        self.target = target or "-"
+        # Keep the real stdout, stray prints are redirected to stderr
+        self._stdout = sys.stdout
+        self._socket = None
+        self._started = {}
+
+    def _connect(self):
+        if self.target.startswith("unix:"):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.target[len("unix:"):])
+        elif self.target.startswith("tcp:"):
+            host, port = self.target[len("tcp:"):].rsplit(":", 1)
+            sock = socket.create_connection((host, int(port)), timeout=5)
+        else:
+            raise ValueError(f"Unknown event target: {self.target}")
+        self._socket = sock
+
+    def _send(self, line: str):
+        if self.target == "-":
+            self._stdout.write(line)
+            self._stdout.flush()
+            return
+        for attempt in range(2):
+            try:
+                if self._socket is None:
+                    self._connect()
+                self._socket.sendall(line.encode())
+                return
+            except OSError as e:
+                self.close()
+                if attempt:
+                    print(f"Could not send event to {self.target}: {e}", file=sys.stderr)
+
+    def emit(self, event: str, **fields):
+        """Write one event with a timestamp"""
+        record = {"ts": datetime.now().isoformat(timespec="milliseconds"), "event": event}
+        record.update(fields)
+        self._send(json.dumps(record, default=str) + "\n")
+
+    def on_event(self, event: str, stage: str, run: dict, error=None):
+        """run_pipeline / StageExecutor / PipelineDaemon callback"""
+        if event == "run_end":
+            self.run_end(run)
+            return
+        key = (run["run_id"], stage)
+        if event == "stage_start":
+            self._started[key] = time.monotonic()
+            self.emit(event, run_id=run["run_id"], serial=run["serial"], stage=stage)
+            return
+        started = self._started.pop(key, None)
+        self.emit(
+            event,
+            run_id=run["run_id"],
+            serial=run["serial"],
+            stage=stage,
+            status="error" if error else "ok",
+            error=str(error) if error else None,
+            duration=round(time.monotonic() - started, 3) if started else None,
+            **stage_result(stage, run),
+        )
+
+    def run_end(self, run: dict):
+        """Write the final event of a run"""
+        resumable = bool(pending_stages(run)) and get_checkpoint_store() is not None
+        self.emit(
+            "run_end",
+            run_id=run["run_id"],
+            serial=run["serial"],
+            status=run["status"],
+            completed_stages=run.get("completed_stages", []),
+            errors=run.get("errors", {}),
+            timings=run.get("timings", {}),
+            resumable=resumable,
+        )
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_INVENTORY_PATH = os.path.join(
+    os.getenv("AUTOX_STATE_DIR", ".autox"), "inventory.sqlite3"
+)
+
+# An item that failed to post this many times is given up on
+MAX_ATTEMPTS = 3
+# A claim older than this belongs to a publisher that died mid-post
+CLAIM_TTL = 3600
+
+
+class ContentInventory:
+    """Posts generated ahead of time, waiting for the scheduler to publish them.
+
+    Items move from ready to claimed while a publisher posts them, then to
+    posted, or back to ready when posting failed (failed after
+    MAX_ATTEMPTS). An item that may have been posted is marked unknown and
+    never posted again. Items whose trend is older than `max_age` are dropped
+    instead of posted, a trend from yesterday makes a stale post.
+    """
+
+    def __init__(self, path: str = None, max_age: float = None):
+        self.path = path or os.getenv("AUTOX_INVENTORY_PATH", DEFAULT_INVENTORY_PATH)
+        self.max_age = max_age if max_age is not None else float(
+            os.getenv("AUTOX_INVENTORY_MAX_AGE", "43200")
+        )
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY,
+                trend TEXT NOT NULL,
+                twitter_post TEXT NOT NULL,
+                image_prompt TEXT,
+                image_path TEXT,
+                run_id TEXT,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                account TEXT,
+                posted_at REAL,
+                error TEXT
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_status ON items (status, created_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_posted ON items (account, posted_at)")
+
+    def _item(self, row) -> dict:
+        item = dict(row)
+        item["trend"] = json.loads(item["trend"])
+        return item
+
+    def add(self, run: dict) -> int:
+        """Store the content (and host image, if any) of a generated run"""
+        content = run["generated_content"]
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO items (trend, twitter_post, image_prompt, image_path, run_id, "
+                "status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 'ready', ?, ?)",
+                (
+                    json.dumps(run["trend_data"]),
+                    content["twitter_post"],
+                    content.get("image_prompt"),
+                    run.get("image_path") if run.get("image_generated") else None,
+                    run["run_id"],
+                    now,
+                    now,
+                ),
+            )
+        return cursor.lastrowid
+
+    def drop_stale(self) -> int:
+        """Drop ready items whose trend is older than max_age"""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE items SET status = 'dropped', error = 'trend went stale', updated_at = ? "
+                "WHERE status = 'ready' AND created_at <= ?",
+                (now, now - self.max_age),
+            )
+        return cursor.rowcount
+
+    def claim_next(self):
+        """Claim the oldest fresh ready item for posting, or return None"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Hand back items of publishers that died while posting
+                self._db.execute(
+                    "UPDATE items SET status = 'ready' WHERE status = 'claimed' AND updated_at <= ?",
+                    (now - CLAIM_TTL,),
+                )
+                row = self._db.execute(
+                    "SELECT * FROM items WHERE status = 'ready' AND created_at > ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (now - self.max_age,),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE items SET status = 'claimed', updated_at = ? WHERE id = ?",
+                        (now, row["id"]),
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return self._item(row) if row is not None else None
+
+    def mark_posted(self, item_id: int, account: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE items SET status = 'posted', account = ?, posted_at = ?, updated_at = ? "
+                "WHERE id = ?",
+                (account, now, now, item_id),
+            )
+
+    def mark_unknown(self, item_id: int, account: str, error: str):
+        """Give up on an item that may have been posted, it counts as a post of the account"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE items SET status = 'unknown', account = ?, posted_at = ?, "
+                "updated_at = ?, error = ? WHERE id = ?",
+                (account, now, now, error, item_id),
+            )
+
+    def release(self, item_id: int, error: str):
+        """Return an item that could not be posted, or fail it after MAX_ATTEMPTS"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE items SET attempts = attempts + 1, error = ?, updated_at = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'ready' END "
+                "WHERE id = ?",
+                (error, time.time(), MAX_ATTEMPTS, item_id),
+            )
+
+    def drop(self, item_id: int, reason: str):
+        with self._lock:
+            self._db.execute(
+                "UPDATE items SET status = 'dropped', error = ?, updated_at = ? WHERE id = ?",
+                (reason, time.time(), item_id),
+            )
+
+    def post_times(self, account: str, since: float) -> list:
+        """Times of the account's posts after since, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT posted_at FROM items WHERE account = ? AND posted_at > ? "
+                "ORDER BY posted_at",
+                (account, since),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def counts(self) -> dict:
+        """Number of items per status"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM items GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def ready_count(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM items WHERE status = 'ready' AND created_at > ?",
+                (time.time() - self.max_age,),
+            ).fetchone()[0]
+
+
+_default_inventory = None
+
+
+def get_inventory() -> ContentInventory:
+    """Return the shared content inventory"""
+    global _default_inventory
+    if _default_inventory is None:
+        _default_inventory = ContentInventory()
+    return _default_inventory
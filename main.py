@@ -1,216 +1,294 @@
 #!/usr/bin/env python3
 
+import argparse
 import asyncio
-import json
+import os
+import sys
 from datetime import datetime
-import time
 
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from rich.live import Live
+from rich.table import Table
+from dotenv import load_dotenv
 
-from cli_helper import RichCLI
+# Load .env before the modules below read their AUTOX_* settings
+load_dotenv()
 
-from agents.find_trend import find_trend
-from agents.content_generator import ContentGenerator
-from agents.image_generator import generate_image
-from agents.twitter_poster import post_to_twitter
+from device_pool import DevicePool
+from daemon import DEVICE_ERRORS, PipelineDaemon
+from headless import EventWriter
+from checkpoints import get_checkpoint_store
+from pipeline import pending_stages, run_pipeline, wait_for_prefetch
+from run_store import get_run_store
+from scheduler import PostScheduler, fill_inventory
 
 # Initialize rich console
 console = Console()
 
 
-# Initialize CLI
-cli = RichCLI()
-
-
-async def main():
-    """Main orchestration function with fixed header Live display"""
-    # Clear screen and set up Live display with fixed header
-    console.clear()
-
-    with Live(cli.layout, console=console, refresh_per_second=4, screen=True) as live:
-        try:
-            # Add initial status
-            startup_panel = Panel(
-                "🚀 [bold orange3]Starting Automated Trend-to-Tweet Pipeline[/bold orange3]",
-                style="orange3",
-                padding=(1, 2),
-            )
-            cli.add_content_panel(startup_panel)
-            live.refresh()
-
-            # Step 1: Find trending topics
-            trend_data, error = await cli.run_with_spinner(
-                find_trend(),
-                "Trend Finder",
-                "Analyzing trending topics using Android automation...",
-                "bright_magenta",
-                live,
-            )
-
-            if error or not trend_data:
-                error_panel = Panel(
+# Full-screen CLI, created on first use so headless runs never build it
+cli = None
+
+
+def get_cli():
+    global cli
+    if cli is None:
+        from cli_helper import RichCLI
+
+        cli = RichCLI()
+    return cli
+
+
+# Devices are leased per run so several pipelines can share one host
+device_pool = DevicePool()
+
+# Spinner label, description and color for every pipeline stage
+STAGE_DISPLAY = {
+    "trend": (
+        "Trend Finder",
+        "Analyzing trending topics using Android automation...",
+        "bright_magenta",
+    ),
+    "content": (
+        "Content Generator",
+        "Creating Twitter post and image prompt with AI...",
+        "dodger_blue1",
+    ),
+    "image": (
+        "Image Generator",
+        "Creating visual content with AI...",
+        "bright_green",
+    ),
+    "post": (
+        "Twitter Poster",
+        "Publishing content to Twitter...",
+        "cyan",
+    ),
+}
+
+
+def stage_panels(stage: str, run: dict, error=None) -> list:
+    """Build the result panels shown once a stage has finished"""
+    if stage == "trend":
+        if error or not run["trend_data"]:
+            return [
+                Panel(
                     "❌ [bold red]Failed to find trending topics. Exiting.[/bold red]",
                     style="red",
                 )
-                cli.add_content_panel(error_panel)
-                live.refresh()
-                return
-
-            success_panel = Panel(
-                f"✅ [bold green]Found trending topic:[/bold green] [yellow]{trend_data.get('trending_topic', 'Unknown')}[/yellow]",
+            ]
+        return [
+            Panel(
+                f"✅ [bold green]Found trending topic:[/bold green] [yellow]{run['trend_data'].get('trending_topic', 'Unknown')}[/yellow]",
                 style="green",
             )
-            cli.add_content_panel(success_panel)
-            live.refresh()
-
-            # Step 2: Generate content using Gemini API
-            content_generator = ContentGenerator()
-            generated_content, error = await cli.run_with_spinner(
-                content_generator.generate_content_from_trend(trend_data),
-                "Content Generator",
-                "Creating Twitter post and image prompt with AI...",
-                "dodger_blue1",
-                live,
-            )
+        ]
 
-            if error or not generated_content:
-                error_panel = Panel(
+    if stage == "content":
+        if error or not run["generated_content"]:
+            return [
+                Panel(
                     f"❌ [bold red]Content generation failed: {error}[/bold red]",
                     style="red",
                 )
-                cli.add_content_panel(error_panel)
-                live.refresh()
-                return
-
-            twitter_post = generated_content["twitter_post"]
-            image_prompt = generated_content["image_prompt"]
-
-            # Display generated content
-            content_panel = Panel(
-                f"[bold blue]Twitter Post:[/bold blue]\n[yellow]{twitter_post}[/yellow]\n\n",
+            ]
+        return [
+            Panel(
+                f"[bold blue]Twitter Post:[/bold blue]\n[yellow]{run['generated_content']['twitter_post']}[/yellow]\n\n",
                 title="📝 Generated Content",
                 style="dodger_blue1",
             )
-            cli.add_content_panel(content_panel)
-            live.refresh()
-
-            # Step 3: Generate image using Gemini
-            image_result, error = await cli.run_with_spinner(
-                generate_image(image_prompt),
-                "Image Generator",
-                "Creating visual content with AI...",
-                "bright_green",
-                live,
-            )
+        ]
 
-            if error or not image_result:
-                warning_panel = Panel(
+    panels = []
+    if stage == "image":
+        if error:
+            panels.append(
+                Panel(
                     f"⚠️ [bold yellow]Image generation failed: {error}[/bold yellow]",
                     style="yellow",
                 )
-                cli.add_content_panel(warning_panel)
-                image_success = False
-            else:
-                image_success = image_result.get("success", False)
-
-            if image_success:
-                success_panel = Panel(
+            )
+        if run["image_generated"]:
+            panels.append(
+                Panel(
                     "✅ [bold green]Image generated and downloaded successfully[/bold green]",
                     style="green",
                 )
-                cli.add_content_panel(success_panel)
-            else:
-                warning_panel = Panel(
+            )
+        else:
+            panels.append(
+                Panel(
                     "⚠️ [bold yellow]Image generation failed, will post without image[/bold yellow]",
                     style="yellow",
                 )
-                cli.add_content_panel(warning_panel)
-
-            live.refresh()
-
-            # Step 4: Post to Twitter
-            post_result, error = await cli.run_with_spinner(
-                post_to_twitter(twitter_post, has_image=image_success),
-                "Twitter Poster",
-                "Publishing content to Twitter...",
-                "cyan",
-                live,
             )
 
-            if error or not post_result:
-                error_panel = Panel(
+    if stage == "post":
+        if error:
+            panels.append(
+                Panel(
                     f"❌ [bold red]Twitter posting failed: {error}[/bold red]",
                     style="red",
                 )
-                cli.add_content_panel(error_panel)
-                post_success = False
-            else:
-                post_success = post_result.get("success", False)
-
-            if post_success:
-                success_panel = Panel(
+            )
+        if run["twitter_posted"]:
+            panels.append(
+                Panel(
                     "✅ [bold green]Successfully posted to Twitter![/bold green]",
                     style="green",
                 )
-                cli.add_content_panel(success_panel)
-            else:
-                error_panel = Panel(
-                    "❌ [bold red]Failed to post to Twitter[/bold red]", style="red"
+            )
+        elif run.get("post_unknown"):
+            panels.append(
+                Panel(
+                    "⚠️ [bold yellow]The tweet may have been posted, check Twitter before posting it again[/bold yellow]",
+                    style="yellow",
                 )
-                cli.add_content_panel(error_panel)
+            )
+        else:
+            panels.append(
+                Panel("❌ [bold red]Failed to post to Twitter[/bold red]", style="red")
+            )
+
+    return panels
+
 
+def summary_panel(run: dict) -> Panel:
+    """Build the execution summary panel for a completed run"""
+    image_success = run["image_generated"]
+    post_success = run["twitter_posted"]
+
+    summary_text = Text()
+    summary_text.append("📊 EXECUTION SUMMARY\n", style="bold white")
+    summary_text.append("─" * 50 + "\n", style="dim white")
+    summary_text.append("Trending Topic: ", style="bold white")
+    summary_text.append(
+        f"{run['trend_data'].get('trending_topic', 'Unknown')}\n", style="yellow"
+    )
+    summary_text.append("Twitter Post: ", style="bold white")
+    summary_text.append(f"{run['generated_content']['twitter_post']}\n", style="cyan")
+    summary_text.append("Image Generated: ", style="bold white")
+    summary_text.append(
+        f"{'Yes' if image_success else 'No'}\n",
+        style="green" if image_success else "red",
+    )
+    summary_text.append("Posted to Twitter: ", style="bold white")
+    summary_text.append(
+        f"{'Yes' if post_success else 'No'}\n",
+        style="green" if post_success else "red",
+    )
+    summary_text.append("Execution Time: ", style="bold white")
+    summary_text.append(
+        f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="dim white"
+    )
+
+    return Panel(summary_text, title="📊 Results", style="white", padding=(1, 2))
+
+
+def load_checkpoint(run_id: str):
+    """Load a checkpointed run, "latest" picks the most recent one"""
+    checkpoints = get_checkpoint_store()
+    if not checkpoints:
+        raise RuntimeError("Checkpoints are disabled (AUTOX_CHECKPOINTS=0)")
+    if run_id == "latest":
+        run_id = checkpoints.latest()
+        if not run_id:
+            raise RuntimeError("There is no unfinished run to resume")
+    return checkpoints.load(run_id)
+
+
+async def main(resume: str = None):
+    """Main orchestration function with fixed header Live display"""
+    # Fail before taking over the screen if the run cannot be resumed
+    resume_run = load_checkpoint(resume) if resume else None
+
+    # Clear screen and set up Live display with fixed header
+    console.clear()
+    cli = get_cli()
+
+    serial = None
+    with Live(cli.layout, console=console, refresh_per_second=4, screen=True) as live:
+
+        def run_stage(coro, stage):
+            return cli.run_with_spinner(coro, *STAGE_DISPLAY[stage], live)
+
+        def on_event(event, stage, run, error):
+            if event != "stage_end":
+                return
+            for panel in stage_panels(stage, run, error):
+                cli.add_content_panel(panel)
             live.refresh()
 
-            # Execution Summary
-            summary_text = Text()
-            summary_text.append("📊 EXECUTION SUMMARY\n", style="bold white")
-            summary_text.append("─" * 50 + "\n", style="dim white")
-            summary_text.append("Trending Topic: ", style="bold white")
-            summary_text.append(
-                f"{trend_data.get('trending_topic', 'Unknown')}\n", style="yellow"
-            )
-            summary_text.append("Twitter Post: ", style="bold white")
-            summary_text.append(f"{twitter_post}\n", style="cyan")
-            summary_text.append("Image Generated: ", style="bold white")
-            summary_text.append(
-                f"{'Yes' if image_success else 'No'}\n",
-                style="green" if image_success else "red",
-            )
-            summary_text.append("Posted to Twitter: ", style="bold white")
-            summary_text.append(
-                f"{'Yes' if post_success else 'No'}\n",
-                style="green" if post_success else "red",
-            )
-            summary_text.append("Execution Time: ", style="bold white")
-            summary_text.append(
-                f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", style="dim white"
+        try:
+            # Add initial status
+            if resume_run:
+                startup_panel = Panel(
+                    f"🔁 [bold orange3]Resuming run {resume_run['run_id']}[/bold orange3]",
+                    style="orange3",
+                    padding=(1, 2),
+                )
+            else:
+                startup_panel = Panel(
+                    "🚀 [bold orange3]Starting Automated Trend-to-Tweet Pipeline[/bold orange3]",
+                    style="orange3",
+                    padding=(1, 2),
+                )
+            cli.add_content_panel(startup_panel)
+            live.refresh()
+
+            # Lease a device; every stage of this run stays on it
+            serial, error = await cli.run_with_spinner(
+                device_pool.acquire(prefer=resume_run and resume_run["serial"]),
+                "Device Pool",
+                "Waiting for a free Android device...",
+                "orange3",
+                live,
             )
 
-            summary_panel = Panel(
-                summary_text, title="📊 Results", style="white", padding=(1, 2)
+            if error or not serial:
+                error_panel = Panel(
+                    f"❌ [bold red]No device available: {error}[/bold red]",
+                    style="red",
+                )
+                cli.add_content_panel(error_panel)
+                live.refresh()
+                return
+
+            device_panel = Panel(
+                f"📱 [bold green]Using device:[/bold green] [yellow]{serial}[/yellow]",
+                style="green",
             )
-            cli.add_content_panel(summary_panel)
+            cli.add_content_panel(device_panel)
             live.refresh()
 
-            # Save execution log
-            execution_log = {
-                "timestamp": datetime.now().isoformat(),
-                "trend_data": trend_data,
-                "generated_content": generated_content,
-                "image_generated": image_success,
-                "twitter_posted": post_success,
-                "twitter_post": twitter_post,
-                "image_prompt": image_prompt,
-            }
+            # Trend -> content -> image -> post
+            run = await run_pipeline(
+                serial,
+                run_stage=run_stage,
+                on_event=on_event,
+                run=resume_run,
+                device_pool=device_pool,
+            )
+            if pending_stages(run) and get_checkpoint_store():
+                resume_panel = Panel(
+                    f"🔁 [bold yellow]Run {run['run_id']} is incomplete, resume it with "
+                    f"./AutoX --resume {run['run_id']}[/bold yellow]",
+                    style="yellow",
+                )
+                cli.add_content_panel(resume_panel)
+                live.refresh()
+            if run["status"] != "completed":
+                return
 
-            with open("execution_log.json", "w") as f:
-                json.dump(execution_log, f, indent=2)
+            # Execution Summary
+            cli.add_content_panel(summary_panel(run))
+            live.refresh()
 
             log_panel = Panel(
-                "📝 [bold green]Execution log saved to execution_log.json[/bold green]",
+                f"📝 [bold green]Run saved to history in {get_run_store().directory}[/bold green]",
                 style="green",
             )
             cli.add_content_panel(log_panel)
@@ -231,14 +309,279 @@ async def main():
             cli.add_content_panel(error_panel)
             live.refresh()
             raise
+        finally:
+            if serial:
+                device_pool.release(serial)
+            await wait_for_prefetch()
+
+
+async def main_headless(resume: str = None, events=None):
+    """Run the pipeline once without the Live display, reporting JSON-line events"""
+    events = events or EventWriter()
+    resume_run = load_checkpoint(resume) if resume else None
+    events.emit("run_start", resume=resume_run["run_id"] if resume_run else None)
+
+    try:
+        serial = await device_pool.acquire(prefer=resume_run and resume_run["serial"])
+    except (*DEVICE_ERRORS, TimeoutError) as e:
+        events.emit("error", error=f"No device available: {e}")
+        return None
+
+    events.emit("device", serial=serial)
+    try:
+        run = await run_pipeline(
+            serial, on_event=events.on_event, run=resume_run, device_pool=device_pool
+        )
+        events.run_end(run)
+        return run
+    except Exception as e:
+        events.emit("error", error=str(e), serial=serial)
+        raise
+    finally:
+        device_pool.release(serial)
+        await wait_for_prefetch()
+
+
+def show_stats(since: str = None, until: str = None):
+    """Print success rates and stage timings from the run history"""
+    stats = get_run_store().stats(since, until)
+    if not stats["runs"]:
+        console.print(Panel("No runs recorded yet", style="dim"))
+        return
+
+    summary_text = Text()
+    summary_text.append("Runs: ", style="bold white")
+    summary_text.append(f"{stats['runs']} ({stats['first']} → {stats['last']})\n")
+    summary_text.append("Success Rate: ", style="bold white")
+    summary_text.append(f"{stats['success_rate']:.1%}\n", style="green")
+    summary_text.append("Outcomes: ", style="bold white")
+    summary_text.append(
+        ", ".join(
+            f"{name} {count}" for name, count in sorted(stats["outcomes"].items())
+        )
+    )
+    console.print(Panel(summary_text, title="📊 Run History", style="white"))
+
+    table = Table(title="⏱️ Stage Timings (seconds)")
+    for column in ("Stage", "Runs", "Mean", "p50", "p95", "Max"):
+        table.add_column(column, justify="left" if column == "Stage" else "right")
+    for stage, timing in stats["stages"].items():
+        table.add_row(
+            stage,
+            str(timing["count"]),
+            f"{timing['mean']:.1f}",
+            f"{timing['p50']:.1f}",
+            f"{timing['p95']:.1f}",
+            f"{timing['max']:.1f}",
+        )
+    console.print(table)
+
+    from agents.model_router import get_model_router
+
+    router = get_model_router()
+    routed = router.stats() if router else {}
+    if routed:
+        table = Table(title="🧭 Model Routing (last outcomes per model)")
+        for column in ("Task", "Model", "Samples", "Success", "Mean s", "Next"):
+            table.add_column(
+                column, justify="left" if column in ("Task", "Model") else "right"
+            )
+        for (task, model), model_stats in routed.items():
+            table.add_row(
+                task,
+                model,
+                str(model_stats["samples"]),
+                f"{model_stats['success_rate']:.0%}",
+                f"{model_stats['latency']:.1f}",
+                "✓" if router.choose(task) == model else "",
+            )
+        console.print(table)
+
+
+def show_checks() -> bool:
+    """Print the preflight checks, return True when nothing failed"""
+    from preflight import ERROR, OK, run_checks
+
+    table = Table(title="🩺 Preflight Checks")
+    table.add_column("Check")
+    table.add_column("Status")
+    table.add_column("Details")
+    failed = False
+    for name, status, detail in run_checks():
+        failed = failed or status == ERROR
+        icon = {OK: "✅", ERROR: "❌"}.get(status, "⚠️")
+        color = {OK: "green", ERROR: "red"}.get(status, "yellow")
+        table.add_row(name, f"{icon} [{color}]{status}[/{color}]", detail)
+    console.print(table)
+    return not failed
+
+
+async def run_daemon(args, events=None):
+    """Run pipelines continuously until SIGTERM or Ctrl+C"""
+    daemon = PipelineDaemon(
+        device_pool,
+        max_concurrent=args.max_concurrent,
+        interval=args.interval,
+        max_runs=args.max_runs,
+        pipelined=args.pipelined,
+        on_event=events.on_event if events else None,
+        # Keep stdout for the JSON events in headless mode
+        console=Console(stderr=True) if events else console,
+    )
+    await daemon.run()
+
+
+async def run_fill(count: int):
+    """Generate content for the inventory ahead of posting time"""
+    from inventory import get_inventory
+
+    inventory = get_inventory()
+    added = await fill_inventory(
+        device_pool, count, inventory, lambda message: console.print(f"📦 {message}")
+    )
+    console.print(
+        Panel(
+            f"📦 [bold green]Added {added} items to the inventory[/bold green] "
+            f"({inventory.ready_count()} ready)",
+            style="green",
+        )
+    )
+
+
+async def run_publish(args):
+    """Publish inventory items at the configured posting times"""
+    scheduler = PostScheduler(device_pool, max_posts=args.max_runs, console=console)
+    await scheduler.run()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Automated trend-to-tweet pipeline driven by Android agents"
+    )
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="run",
+        choices=["run", "stats", "fill", "publish"],
+        help="run the pipeline (default), show run history stats, fill the "
+        "content inventory or publish from it on schedule",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="check the environment, API key and adb devices, then exit",
+    )
+    parser.add_argument(
+        "--since",
+        help="stats: only include runs at or after this ISO timestamp, e.g. 2025-10-01",
+    )
+    parser.add_argument(
+        "--until",
+        help="stats: only include runs before this ISO timestamp",
+    )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="resume a failed or interrupted run at its first incomplete stage "
+        "(default: the most recent one)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running pipelines until SIGTERM instead of running once",
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=int(os.getenv("AUTOX_MAX_CONCURRENT", "1")),
+        help="daemon mode: maximum number of runs in flight (default: 1)",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=float(os.getenv("AUTOX_RUN_INTERVAL", "0")),
+        help="daemon mode: seconds between run starts, 0 runs back to back",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="daemon mode: give every stage its own queue so consecutive runs overlap",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        default=os.getenv("AUTOX_HEADLESS", "0").lower() in ("1", "true", "yes"),
+        help="no full-screen display, write stage events as JSON lines instead",
+    )
+    parser.add_argument(
+        "--events",
+        default=os.getenv("AUTOX_EVENTS", "-"),
+        metavar="TARGET",
+        help="headless mode: where to write events, - for stdout (default), "
+        "unix:/path/to.sock or tcp:host:port",
+    )
+    parser.add_argument(
+        "--max-runs",
+        type=int,
+        default=None,
+        help="daemon mode: stop after starting this many runs, "
+        "publish: stop after this many posts",
+    )
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=int(os.getenv("AUTOX_FILL_COUNT", "5")),
+        help="fill: number of items to generate (default: 5)",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
+
+    if args.command == "stats":
+        show_stats(args.since, args.until)
+        raise SystemExit(0)
+
+    if args.check:
+        raise SystemExit(0 if show_checks() else 1)
+
+    if args.command in ("fill", "publish"):
+        try:
+            asyncio.run(
+                run_fill(args.count) if args.command == "fill" else run_publish(args)
+            )
+        except KeyboardInterrupt:
+            console.print("⏹️ [bold yellow]Process interrupted by user[/bold yellow]")
+        raise SystemExit(0)
+
+    if args.headless:
+        events = EventWriter(args.events)
+        if args.events == "-":
+            # Agent prints go to stderr so stdout only carries events
+            sys.stdout = sys.stderr
+        try:
+            asyncio.run(
+                run_daemon(args, events)
+                if args.daemon
+                else main_headless(args.resume, events)
+            )
+        except KeyboardInterrupt:
+            events.emit("interrupted")
+        except Exception as e:
+            events.emit("fatal", error=str(e))
+            raise SystemExit(1)
+        finally:
+            events.close()
+        raise SystemExit(0)
+
     # Show startup info
     console.print(
         Panel(
             "[bold cyan]🤖 Automated Social Media Content Creation[/bold cyan]\n\n"
-            "📱 Make sure your Android device is connected and ADB is enabled!\n"
+            "📱 Make sure your Android devices are connected and ADB is enabled!\n"
             "🔑 Also ensure you have set your GEMINI_API_KEY in your .env file\n"
             "⚡ Press Ctrl+C anytime to stop the process",
             title="🚀 Setup Information",
@@ -248,7 +591,7 @@ if __name__ == "__main__":
     )
 
     try:
-        asyncio.run(main())
+        asyncio.run(run_daemon(args) if args.daemon else main(args.resume))
     except KeyboardInterrupt:
         console.print(
             Panel(
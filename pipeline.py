@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+
+from agents.trend_cache import get_trend_cache
+from budgets import hedge_delay, hedged_stages, stage_deadline
+from checkpoints import get_checkpoint_store
+from run_store import get_run_store, run_record
+from telemetry import get_telemetry
+
+# Stages of one pipeline run, in execution order
+STAGES = ("trend", "content", "image", "post")
+
+# A failure in one of these ends the run, image and post failures are recorded
+REQUIRED_STAGES = ("trend", "content")
+
+
+class StageError(Exception):
+    """Raised by a stage when the run cannot continue"""
+
+
+class StageTimeout(StageError):
+    """Raised when a stage ran past its deadline and was cancelled"""
+
+
+def new_run(serial: str = None) -> dict:
+    """Create the state dict that is threaded through every stage of a run"""
+    run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    return {
+        "run_id": run_id,
+        "serial": serial,
+        "status": "running",
+        "completed_stages": [],
+        "trend_data": None,
+        "generated_content": None,
+        "image_generated": False,
+        "image_path": None,
+        "twitter_posted": False,
+        "errors": {},
+        "timings": {},
+    }
+
+
+async def trend_stage(run: dict):
+    """Find a trending topic on the run's device"""
+    # Agent modules are imported by the stages that use them, so starting
+    # the CLI, --check and stats never load the droidrun/llama_index stacks
+    from agents.find_trend import find_trend
+
+    def on_fetch(trends, trend_data):
+        # This run fetched a new list, it also generates the content that
+        # later runs claiming the other trends will use
+        if os.getenv("AUTOX_CONTENT_PREFETCH", "1").lower() in ("0", "false", "no"):
+            return
+        trend_cache = get_trend_cache()
+        others = [trend for trend in trends if trend is not trend_data]
+        run["prefetch_trends"] = trend_cache.available(others) if trend_cache else others
+
+    trend_data = await find_trend(serial=run["serial"], on_fetch=on_fetch)
+    if not trend_data:
+        raise StageError("Failed to find trending topics")
+    run["trend_data"] = trend_data
+    return trend_data
+
+
+# Content prefetches running in the background, referenced until they finish
+_prefetch_tasks = set()
+
+
+def _prefetch_done(task: asyncio.Task):
+    _prefetch_tasks.discard(task)
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        print(f"Prefetching content failed: {task.exception()}")
+    else:
+        print(f"Prefetched content for {task.result()} more trends")
+
+
+async def wait_for_prefetch():
+    """Wait for background prefetches, so a single run keeps what they generate"""
+    if _prefetch_tasks:
+        await asyncio.gather(*_prefetch_tasks, return_exceptions=True)
+
+
+async def content_stage(run: dict):
+    """Generate the Twitter post and image prompt for the trend"""
+    from agents.content_generator import ContentGenerator
+
+    content_generator = ContentGenerator()
+    prefetch_trends = run.pop("prefetch_trends", None)
+    if prefetch_trends:
+        # Content for the rest of the trend list is generated in the
+        # background, this run goes on as soon as its own content is ready
+        task = asyncio.create_task(content_generator.prefetch(prefetch_trends))
+        _prefetch_tasks.add(task)
+        task.add_done_callback(_prefetch_done)
+    generated_content = await content_generator.generate_content_from_trend(
+        run["trend_data"]
+    )
+    if not generated_content:
+        raise StageError("No content was generated")
+    run["generated_content"] = generated_content
+    return generated_content
+
+
+async def image_stage(run: dict):
+    """Generate the image and put it into the run's device gallery"""
+    from agents.image_backends import get_image_backend, push_image
+
+    run["image_generated"] = False
+    image_path = run.get("image_path")
+    if image_path and os.path.exists(image_path):
+        # Resumed on another device, push the image made on the host again
+        image_result = await push_image(image_path, serial=run["serial"])
+    else:
+        image_result = await get_image_backend().generate(
+            run["generated_content"]["image_prompt"], serial=run["serial"]
+        )
+    run["image_generated"] = bool(image_result and image_result.get("success", False))
+    run["image_path"] = (image_result or {}).get("path")
+    return image_result
+
+
+async def post_stage(run: dict):
+    """Publish the post, with the image if one was generated"""
+    from agents.twitter_poster import post_to_twitter
+
+    run["twitter_posted"] = False
+    try:
+        post_result = await post_to_twitter(
+            run["generated_content"]["twitter_post"],
+            has_image=run["image_generated"],
+            serial=run["serial"],
+        )
+        run["twitter_posted"] = bool(
+            post_result and post_result.get("success", False)
+        )
+        run["post_unknown"] = bool(
+            post_result and not run["twitter_posted"] and post_result.get("unknown")
+        )
+    except asyncio.CancelledError:
+        # Post may already be tapped, so the run must not post again on resume
+        run["post_unknown"] = True
+        raise
+    finally:
+        _record_trend_use(run)
+    if run["twitter_posted"]:
+        _index_posted_content(run)
+    return post_result
+
+
+def _index_posted_content(run: dict):
+    """Add the posted tweet and image prompt to the near-duplicate index"""
+    from agents.duplicate_index import get_duplicate_index
+
+    duplicates = get_duplicate_index()
+    if not duplicates:
+        return
+    content = run["generated_content"]
+    duplicates.add(content["twitter_post"], "post", run["run_id"])
+    if run["image_generated"]:
+        duplicates.add(content["image_prompt"], "image_prompt", run["run_id"])
+
+
+def _record_trend_use(run: dict):
+    """Mark the run's trend as posted, or free its claim for another run.
+
+    A run whose post may have gone out keeps its claim.
+    """
+    trend_cache = get_trend_cache()
+    if not trend_cache or not run["trend_data"] or run.get("post_unknown"):
+        return
+    trending_topic = run["trend_data"].get("trending_topic", "")
+    if run["twitter_posted"]:
+        trend_cache.mark_posted(trending_topic)
+    else:
+        trend_cache.release(trending_topic)
+
+
+STAGE_FUNCTIONS = {
+    "trend": trend_stage,
+    "content": content_stage,
+    "image": image_stage,
+    "post": post_stage,
+}
+
+
+def stage_succeeded(run: dict, stage: str) -> bool:
+    """Check whether a stage that raised no error actually did its job"""
+    if stage == "image":
+        return run["image_generated"]
+    if stage == "post":
+        return run["twitter_posted"]
+    return True
+
+
+def record_stage(run: dict, stage: str, error=None, duration: float = None):
+    """Record a finished stage in the run and checkpoint it"""
+    if duration is not None:
+        run["timings"][stage] = round(duration, 3)
+    if error:
+        run["errors"][stage] = str(error)
+    elif stage_succeeded(run, stage) and stage not in run["completed_stages"]:
+        run["completed_stages"].append(stage)
+    checkpoints = get_checkpoint_store()
+    if checkpoints:
+        checkpoints.save(run)
+
+
+def pending_stages(run: dict) -> list:
+    """Return the stages to run, from the first incomplete one onwards.
+
+    A posted run has nothing left to do, even when its image failed:
+    running the post stage again would publish the tweet twice. The same
+    goes for a run whose post stage was cancelled midway.
+    """
+    if run.get("twitter_posted") or run.get("post_unknown") or "post" in run["completed_stages"]:
+        return []
+    for index, stage in enumerate(STAGES):
+        if stage not in run["completed_stages"]:
+            return list(STAGES[index:])
+    return []
+
+
+def prepare_resume(run: dict, serial: str) -> dict:
+    """Reset a checkpointed run so it restarts at its first incomplete stage"""
+    if run["serial"] != serial and "image" in run["completed_stages"]:
+        # The image is only in the other device's gallery, make (or push) it again here
+        run["completed_stages"].remove("image")
+    for stage in pending_stages(run):
+        if stage in run["completed_stages"]:
+            run["completed_stages"].remove(stage)
+        run["errors"].pop(stage, None)
+    run["serial"] = serial
+    run["status"] = "running"
+    run["resumed"] = run.get("resumed", 0) + 1
+    run.setdefault("timings", {})
+    return run
+
+
+async def traced_stage(stage: str, run: dict, device_pool=None):
+    """Run one stage of a run inside a telemetry span, within its deadline.
+
+    With a device pool, stages listed in AUTOX_HEDGE_STAGES are hedged.
+    """
+    async with get_telemetry().span(
+        stage, "stage", trace_id=run["run_id"], serial=run["serial"]
+    ) as span:
+        if device_pool and stage in hedged_stages():
+            coro = hedged_stage(stage, run, device_pool)
+        else:
+            coro = STAGE_FUNCTIONS[stage](run)
+        deadline = stage_deadline(stage)
+        try:
+            return await asyncio.wait_for(coro, deadline)
+        except asyncio.TimeoutError:
+            span["budget_exceeded"] = "deadline"
+            raise StageTimeout(f"{stage} stage timed out after {deadline:g}s") from None
+
+
+# Run keys a winning hedge attempt hands back to the run
+HEDGE_RESULTS = {
+    "image": ("image_generated", "image_path"),
+}
+
+
+def _hedge_won(stage: str, task: asyncio.Task, attempt: dict, hedged: bool) -> bool:
+    if task.cancelled() or task.exception() is not None:
+        return False
+    if stage == "image":
+        # An image only in the other device's gallery cannot be posted here
+        return attempt["image_generated"] and (not hedged or bool(attempt["image_path"]))
+    return True
+
+
+async def hedged_stage(stage: str, run: dict, device_pool):
+    """Run an idempotent stage, adding a second attempt on another device when slow.
+
+    Once the stage runs past its p95 duration, the same stage starts on a
+    free device and the first attempt to succeed wins, the other one is
+    cancelled. A hedged image is pushed from the host to the run's device,
+    so images are only hedged with a host image backend.
+    """
+    from agents.image_backends import get_image_backend
+
+    delay = hedge_delay(stage)
+    if stage == "image" and not get_image_backend().on_host:
+        # The agent backend leaves the hedged image in the other device's
+        # gallery, so the hedge could never win
+        delay = None
+    primary = asyncio.ensure_future(STAGE_FUNCTIONS[stage](run))
+    attempts = {primary: run}
+    pending = {primary}
+    serial = winner = None
+    try:
+        if delay is not None:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                # Listing the devices runs adb, keep it off the event loop
+                serial = await asyncio.to_thread(
+                    device_pool.try_acquire, (run["serial"],)
+                )
+        if serial:
+            get_telemetry().count_retry(f"hedge_{stage}")
+            print(f"{stage} stage is running past {delay:g}s, hedging on {serial}")
+            attempt = dict(run, serial=serial, errors={}, timings={})
+            hedge = asyncio.ensure_future(STAGE_FUNCTIONS[stage](attempt))
+            attempts[hedge] = attempt
+            pending.add(hedge)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if _hedge_won(stage, task, attempts[task], task is hedge):
+                        winner = task
+        else:
+            # Finished in time, not hedged, or no other device is free
+            if pending:
+                await asyncio.wait(pending)
+            pending = set()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if serial:
+            device_pool.release(serial)
+
+    if winner is None:
+        # Neither attempt succeeded, report the primary's outcome
+        return primary.result()
+    if winner is primary:
+        return winner.result()
+    print(f"Hedged {stage} attempt on {serial} won")
+    for key in HEDGE_RESULTS[stage]:
+        if key in attempts[winner]:
+            run[key] = attempts[winner][key]
+    if stage == "image":
+        from agents.image_backends import push_image
+
+        return await push_image(run["image_path"], serial=run["serial"])
+    return winner.result()
+
+
+async def await_stage(coro, stage: str):
+    """Default stage runner, returns (result, error) like RichCLI.run_with_spinner"""
+    try:
+        return await coro, None
+    except Exception as e:
+        return None, e
+
+
+async def run_pipeline(
+    serial: str = None,
+    run_stage=None,
+    on_event=None,
+    run: dict = None,
+    device_pool=None,
+) -> dict:
+    """Run the trend -> content -> image -> post flow once on one device.
+
+    run_stage(coro, stage) awaits a stage and returns (result, error), and
+    on_event(event, stage, run, error) is called on every "stage_start" and
+    "stage_end", which is how front ends render progress. Pass a
+    checkpointed run to resume it at its first incomplete stage, and the
+    device pool to let slow stages hedge on another device.
+    """
+    run_stage = run_stage or await_stage
+    run = prepare_resume(run, serial) if run else new_run(serial)
+
+    for stage in pending_stages(run):
+        if on_event:
+            on_event("stage_start", stage, run, None)
+        started = time.monotonic()
+        try:
+            _, error = await run_stage(traced_stage(stage, run, device_pool), stage)
+        except asyncio.CancelledError:
+            # Checkpoint what the stage left behind, e.g. a post that may be sent
+            record_stage(run, stage, "cancelled", time.monotonic() - started)
+            raise
+        record_stage(run, stage, error, time.monotonic() - started)
+        if on_event:
+            on_event("stage_end", stage, run, error)
+        if error and stage in REQUIRED_STAGES:
+            return fail_run(run)
+
+    return complete_run(run)
+
+
+def fail_run(run: dict) -> dict:
+    """Mark a run that stopped at a required stage as failed"""
+    run["status"] = "failed"
+    # The post stage never runs, free the trend for another run now
+    _record_trend_use(run)
+    save_run_history(run)
+    checkpoints = get_checkpoint_store()
+    if checkpoints:
+        checkpoints.save(run)
+    return run
+
+
+def complete_run(run: dict) -> dict:
+    """Mark a run that went through every stage as completed and log it"""
+    run["status"] = "completed"
+    save_run_history(run)
+    checkpoints = get_checkpoint_store()
+    if checkpoints:
+        if pending_stages(run):
+            checkpoints.save(run)
+        else:
+            checkpoints.delete(run["run_id"])
+    return run
+
+
+def save_run_history(run: dict):
+    """Append a finished run to the run history"""
+    get_run_store().append(run_record(run, datetime.now().isoformat()))
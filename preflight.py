@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import urllib.error
+import urllib.request
+
+from adb_helper import ADB_PATH, list_devices
+
+MODELS_URL = "https://generativelanguage.googleapis.com/v1beta/models?pageSize=1&key={key}"
+
+# Packages the agents import on first use
+REQUIRED_PACKAGES = ("droidrun", "llama_index.llms.google_genai", "rich", "dotenv")
+
+OK, WARNING, ERROR = "ok", "warning", "error"
+
+
+def check_env_file():
+    if os.path.exists(".env"):
+        return OK, "found .env"
+    return WARNING, "no .env in the working directory, using the process environment"
+
+
+def check_api_key():
+    """Check that GEMINI_API_KEY is set and accepted by the Gemini API"""
+    key = os.getenv("GEMINI_API_KEY", "").strip()
+    if not key:
+        return ERROR, "GEMINI_API_KEY is not set"
+    request = urllib.request.Request(MODELS_URL.format(key=key))
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        if e.code in (400, 401, 403):
+            return ERROR, f"GEMINI_API_KEY was rejected (HTTP {e.code})"
+        return WARNING, f"could not verify GEMINI_API_KEY (HTTP {e.code})"
+    except (urllib.error.URLError, OSError) as e:
+        return WARNING, f"GEMINI_API_KEY is set, but the API is unreachable: {e}"
+    return OK, "GEMINI_API_KEY is valid"
+
+
+def check_packages():
+    """Find the packages without importing them"""
+    missing = []
+    for name in REQUIRED_PACKAGES:
+        try:
+            found = importlib.util.find_spec(name) is not None
+        except ModuleNotFoundError:
+            found = False
+        if not found:
+            missing.append(name)
+    if missing:
+        return ERROR, f"missing packages: {', '.join(missing)} (pip install -r requirements.txt)"
+    return OK, "all packages installed"
+
+
+def check_adb():
+    if not shutil.which(ADB_PATH):
+        return ERROR, f"adb not found at {ADB_PATH!r}, install platform-tools or set AUTOX_ADB"
+    try:
+        devices = list_devices()
+    except Exception as e:
+        return ERROR, f"adb devices failed: {e}"
+    configured = [s.strip() for s in os.getenv("AUTOX_DEVICES", "").split(",") if s.strip()]
+    if configured:
+        absent = [serial for serial in configured if serial not in devices]
+        if len(absent) == len(configured):
+            return ERROR, f"none of AUTOX_DEVICES is connected ({', '.join(configured)})"
+        if absent:
+            return WARNING, f"not connected: {', '.join(absent)}"
+        return OK, f"{len(configured)} configured devices connected"
+    if not devices:
+        return ERROR, "no device in adb devices, connect a phone and enable USB debugging"
+    return OK, f"{len(devices)} devices connected: {', '.join(devices)}"
+
+
+def check_state_dir():
+    state_dir = os.getenv("AUTOX_STATE_DIR", ".autox")
+    try:
+        os.makedirs(state_dir, exist_ok=True)
+        with tempfile.TemporaryFile(dir=state_dir):
+            pass
+    except OSError as e:
+        return ERROR, f"{state_dir} is not writable: {e}"
+    return OK, f"{state_dir} is writable"
+
+
+def check_settings():
+    """Validate the AUTOX_* settings that name a backend or mode"""
+    from agents.content_generator import CONTENT_MODES
+    from agents.image_backends import IMAGE_BACKENDS
+    from agents.trend_sources import TREND_SOURCES
+
+    mode = os.getenv("AUTOX_CONTENT_MODE", "sequential")
+    if mode not in CONTENT_MODES:
+        return ERROR, f"AUTOX_CONTENT_MODE={mode} is not one of {', '.join(CONTENT_MODES)}"
+    names = [n.strip() for n in os.getenv("AUTOX_TREND_SOURCES", "rss,agent").split(",")]
+    unknown = [name for name in names if name and name not in TREND_SOURCES]
+    if unknown:
+        return ERROR, f"unknown trend sources: {', '.join(unknown)}"
+    backends = [n.strip() for n in os.getenv("AUTOX_IMAGE_BACKENDS", "agent").split(",")]
+    unknown = [name for name in backends if name and name not in IMAGE_BACKENDS]
+    if unknown:
+        return ERROR, f"unknown image backends: {', '.join(unknown)}"
+    return OK, (
+        f"content mode {mode}, trend sources {', '.join(n for n in names if n)}, "
+        f"image backends {', '.join(n for n in backends if n)}"
+    )
+
+
+CHECKS = {
+    "Environment": check_env_file,
+    "API key": check_api_key,
+    "Packages": check_packages,
+    "ADB": check_adb,
+    "State directory": check_state_dir,
+    "Settings": check_settings,
+}
+
+
+def run_checks() -> list:
+    """Run every check and return (name, status, detail) tuples"""
+    results = []
+    for name, check in CHECKS.items():
+        try:
+            status, detail = check()
+        except Exception as e:
+            status, detail = ERROR, str(e)
+        results.append((name, status, detail))
+    return results
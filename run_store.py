@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import fcntl
+import json
+import os
+import re
+
+DEFAULT_HISTORY_DIR = os.path.join(os.getenv("AUTOX_STATE_DIR", ".autox"), "history")
+
+# Stage timing columns of the index, in pipeline order
+TIMED_STAGES = ("trend", "content", "image", "post")
+
+INDEX_FIELDS = ("timestamp", "outcome", "segment", "offset", "length", "trend") + tuple(
+    f"{stage}_seconds" for stage in TIMED_STAGES
+)
+
+
+def run_outcome(run: dict) -> str:
+    """Classify a finished run as posted, not_posted or failed"""
+    if run.get("status") != "completed":
+        return "failed"
+    return "posted" if run.get("twitter_posted") else "not_posted"
+
+
+def run_record(run: dict, timestamp: str) -> dict:
+    """Build the history record of a run, storing every field only once"""
+    generated_content = run.get("generated_content") or {}
+    return {
+        "run_id": run.get("run_id"),
+        "timestamp": timestamp,
+        "outcome": run_outcome(run),
+        "serial": run.get("serial"),
+        "trend_data": run.get("trend_data"),
+        "twitter_post": generated_content.get("twitter_post"),
+        "image_prompt": generated_content.get("image_prompt"),
+        "image_generated": run.get("image_generated", False),
+        "twitter_posted": run.get("twitter_posted", False),
+        "completed_stages": run.get("completed_stages", []),
+        "errors": run.get("errors", {}),
+        "timings": run.get("timings", {}),
+    }
+
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class RunStore:
+    """Append-only run history split into size-rotated JSONL segments.
+
+    Every record gets one tab-separated line in index.tsv with its
+    timestamp, outcome, location, trend and stage timings, so stats and
+    queries scan the small index instead of parsing full records. Writers
+    hold an flock() while appending, which keeps concurrent runs from
+    interleaving records.
+    """
+
+    def __init__(self, directory: str = None, segment_bytes: int = None):
+        self.directory = directory or os.getenv("AUTOX_HISTORY_DIR", DEFAULT_HISTORY_DIR)
+        self.segment_bytes = segment_bytes or int(
+            os.getenv("AUTOX_HISTORY_SEGMENT_BYTES", str(16 * 1024 * 1024))
+        )
+        self.index_path = os.path.join(self.directory, "index.tsv")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"runs-{segment:06d}.jsonl")
+
+    def _current_segment(self) -> int:
+        segments = [
+            int(match.group(1))
+            for name in os.listdir(self.directory)
+            if (match := re.match(r"runs-(\d+)\.jsonl$", name))
+        ]
+        return max(segments) if segments else 1
+
+    def append(self, record: dict):
+        """Append a record to the current segment and index it"""
+        line = (json.dumps(record, default=str) + "\n").encode()
+        lock_fd = os.open(
+            os.path.join(self.directory, ".lock"), os.O_RDWR | os.O_CREAT, 0o644
+        )
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            segment = self._current_segment()
+            path = self._segment_path(segment)
+            if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+                segment += 1
+                path = self._segment_path(segment)
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                offset = os.lseek(fd, 0, os.SEEK_END)
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+            trend = (record.get("trend_data") or {}).get("trending_topic", "")
+            timings = record.get("timings", {})
+            columns = [
+                record["timestamp"],
+                record["outcome"],
+                str(segment),
+                str(offset),
+                str(len(line)),
+                re.sub(r"\s+", " ", trend),
+            ] + [
+                f"{timings[stage]:.3f}" if stage in timings else ""
+                for stage in TIMED_STAGES
+            ]
+            with open(self.index_path, "a") as f:
+                f.write("\t".join(columns) + "\n")
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+
+    def iter_index(self, since: str = None, until: str = None):
+        """Yield index rows as tuples of INDEX_FIELDS strings"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path) as f:
+            for line in f:
+                row = line.rstrip("\n").split("\t")
+                if len(row) != len(INDEX_FIELDS):
+                    continue
+                if since and row[0] < since:
+                    continue
+                if until and row[0] >= until:
+                    continue
+                yield row
+
+    def read(self, segment: int, offset: int, length: int) -> dict:
+        """Read one record from its segment"""
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def query(
+        self, since: str = None, until: str = None, trend: str = None, outcome: str = None
+    ):
+        """Yield full records matching the filters, using the index to find them"""
+        trend = trend.lower() if trend else None
+        for row in self.iter_index(since, until):
+            if outcome and row[1] != outcome:
+                continue
+            if trend and trend not in row[5].lower():
+                continue
+            yield self.read(int(row[2]), int(row[3]), int(row[4]))
+
+    def stats(self, since: str = None, until: str = None) -> dict:
+        """Aggregate outcomes and stage timings from the index"""
+        outcomes = {}
+        durations = {stage: [] for stage in TIMED_STAGES}
+        first = last = None
+        total = 0
+        for row in self.iter_index(since, until):
+            total += 1
+            first = first or row[0]
+            last = row[0]
+            outcomes[row[1]] = outcomes.get(row[1], 0) + 1
+            for stage, value in zip(TIMED_STAGES, row[6:]):
+                if value:
+                    durations[stage].append(float(value))
+
+        stage_stats = {}
+        for stage, values in durations.items():
+            if not values:
+                continue
+            stage_stats[stage] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": _percentile(values, 0.50),
+                "p95": _percentile(values, 0.95),
+                "max": max(values),
+            }
+        return {
+            "runs": total,
+            "first": first,
+            "last": last,
+            "outcomes": outcomes,
+            "success_rate": outcomes.get("posted", 0) / total if total else 0.0,
+            "stages": stage_stats,
+        }
+
+
+_default_store = None
+
+
+def get_run_store() -> RunStore:
+    """Return the shared run history"""
+    global _default_store
+    if _default_store is None:
+        _default_store = RunStore()
+    return _default_store
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import signal
+import time
+from datetime import datetime, timedelta
+
+from rich.console import Console
+
+from agents.trend_cache import get_trend_cache
+from inventory import get_inventory
+from pipeline import new_run, traced_stage, wait_for_prefetch
+from telemetry import get_telemetry
+
+DAY = 86400
+
+
+def parse_post_times(value: str) -> list:
+    """Parse "HH:MM,HH:MM" posting slots into sorted (hour, minute) tuples"""
+    times = set()
+    for slot in value.split(","):
+        slot = slot.strip()
+        if not slot:
+            continue
+        hour, _, minute = slot.partition(":")
+        hour, minute = int(hour), int(minute or 0)
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"invalid posting time {slot!r}")
+        times.add((hour, minute))
+    return sorted(times)
+
+
+def next_slot(times: list, now: datetime) -> datetime:
+    """Return the first posting slot after now, local time"""
+    for day in (0, 1):
+        date = now.date() + timedelta(days=day)
+        for hour, minute in times:
+            slot = datetime(date.year, date.month, date.day, hour, minute)
+            if slot > now:
+                return slot
+    raise ValueError("no posting times configured")
+
+
+def parse_accounts(value: str) -> dict:
+    """Parse "serial=account,..." into a serial -> account mapping"""
+    accounts = {}
+    for pair in value.split(","):
+        serial, _, account = pair.partition("=")
+        if serial.strip() and account.strip():
+            accounts[serial.strip()] = account.strip()
+    return accounts
+
+
+async def fill_inventory(device_pool, count: int, inventory=None, log=print) -> int:
+    """Generate content for up to `count` trends and store it in the inventory.
+
+    Runs the trend, content and image stages like a pipeline run, one item
+    per leased device. Only images made on the host (the http backend) can
+    be stored, so without a host backend the image stage is skipped and
+    items are stored without image. A trend whose content fails is
+    skipped, the fill stops once no trend is found. Returns the number of
+    items added.
+    """
+    from agents.image_backends import get_image_backend
+
+    inventory = inventory or get_inventory()
+    with_images = get_image_backend().on_host
+    if not with_images:
+        log("No host image backend in AUTOX_IMAGE_BACKENDS, storing posts without images")
+    added = 0
+    for _ in range(count):
+        async with device_pool.lease() as serial:
+            run = new_run(serial)
+            try:
+                for stage in ("trend", "content"):
+                    await traced_stage(stage, run, device_pool)
+            except Exception as e:
+                _release_trend(run)
+                if not run["trend_data"]:
+                    log(f"Stopped filling the inventory: {e}")
+                    break
+                # One trend the content stage cannot handle does not stop the fill
+                log(f"Skipped {run['trend_data'].get('trending_topic', 'Unknown')}: {e}")
+                continue
+            if with_images:
+                try:
+                    await traced_stage("image", run, device_pool)
+                except Exception as e:
+                    log(f"Image generation failed, storing the post without image: {e}")
+                    run["image_generated"] = False
+                if run["image_generated"] and not run.get("image_path"):
+                    log("The image only exists on the device, storing the post without image")
+            item_id = inventory.add(run)
+        # The inventory owns the trend now, so runs never pick it again
+        trend_cache = get_trend_cache()
+        if trend_cache:
+            trend_cache.mark_posted(run["trend_data"].get("trending_topic", ""))
+        added += 1
+        log(f"Stored item {item_id}: {run['trend_data'].get('trending_topic', 'Unknown')}")
+    await wait_for_prefetch()
+    return added
+
+
+def _release_trend(run: dict):
+    trend_cache = get_trend_cache()
+    if trend_cache and run["trend_data"]:
+        trend_cache.release(run["trend_data"].get("trending_topic", ""))
+
+
+class PostScheduler:
+    """Publishes inventory items at configured times within account rate limits.
+
+    With post_times every slot publishes one item per device, without them
+    items are published as soon as an account is allowed to post again.
+    Every account (AUTOX_ACCOUNTS maps device serials to accounts, the
+    serial is the account otherwise) posts at most max_per_day items per
+    24 hours and waits min_gap seconds between posts. Items whose trend
+    went stale are dropped instead of published.
+    """
+
+    def __init__(
+        self,
+        device_pool,
+        inventory=None,
+        post_times: list = None,
+        max_per_day: int = None,
+        min_gap: float = None,
+        accounts: dict = None,
+        max_posts: int = None,
+        idle_wait: float = 60.0,
+        post_fn=None,
+        console=None,
+    ):
+        self.device_pool = device_pool
+        self.inventory = inventory or get_inventory()
+        self.post_times = (
+            post_times
+            if post_times is not None
+            else parse_post_times(os.getenv("AUTOX_POST_TIMES", ""))
+        )
+        self.max_per_day = max_per_day or int(os.getenv("AUTOX_MAX_POSTS_PER_DAY", "8"))
+        self.min_gap = min_gap if min_gap is not None else float(
+            os.getenv("AUTOX_MIN_POST_GAP", "1800")
+        )
+        self.accounts = (
+            accounts if accounts is not None else parse_accounts(os.getenv("AUTOX_ACCOUNTS", ""))
+        )
+        self.max_posts = max_posts
+        self.idle_wait = idle_wait
+        self.post_fn = post_fn
+        self.console = console or Console()
+        self.stopping = asyncio.Event()
+        self.posted = 0
+        self.failed = 0
+
+    def log(self, message: str):
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.console.print(f"[dim]{timestamp}[/dim] {message}")
+
+    def stop(self):
+        self.log("⏹️ [bold yellow]Stopping the scheduler[/bold yellow]")
+        self.stopping.set()
+
+    async def _sleep(self, seconds: float):
+        if seconds <= 0:
+            return
+        try:
+            await asyncio.wait_for(self.stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def account_for(self, serial: str) -> str:
+        return self.accounts.get(serial, serial)
+
+    def wait_for_account(self, account: str) -> float:
+        """Seconds until the account may post again, 0 when it may post now"""
+        now = time.time()
+        posts = self.inventory.post_times(account, now - DAY)
+        if not posts:
+            return 0.0
+        wait = posts[-1] + self.min_gap - now
+        if len(posts) >= self.max_per_day:
+            # Until enough posts of the last 24 hours have left the window
+            wait = max(wait, posts[len(posts) - self.max_per_day] + DAY - now)
+        return max(0.0, wait)
+
+    def _done(self) -> bool:
+        return self.stopping.is_set() or (
+            self.max_posts is not None and self.posted >= self.max_posts
+        )
+
+    async def run(self):
+        """Publish until stopped or max_posts items were posted"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stop)
+        slots = ", ".join(f"{h:02d}:{m:02d}" for h, m in self.post_times) or "continuous"
+        self.log(
+            f"🗓️ [bold orange3]Scheduler started[/bold orange3] ({slots}, "
+            f"{self.max_per_day} posts per account per day, {self.min_gap:.0f}s apart)"
+        )
+        try:
+            while not self._done():
+                if self.post_times:
+                    slot = next_slot(self.post_times, datetime.now())
+                    self.log(f"⏰ Next posting slot at {slot.strftime('%Y-%m-%d %H:%M')}")
+                    await self._sleep((slot - datetime.now()).total_seconds())
+                    if self._done():
+                        break
+                    await self.publish_round()
+                else:
+                    published = await self.publish_round()
+                    await self._sleep(self._next_wait() if not published else 0)
+        finally:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(sig)
+        self.log(
+            f"📊 Scheduler stopped: {self.posted} posted, {self.failed} failed, "
+            f"inventory {self.inventory.counts()}"
+        )
+
+    def _next_wait(self) -> float:
+        """How long continuous mode sleeps when nothing could be published"""
+        if not self.inventory.ready_count():
+            return self.idle_wait
+        waits = [
+            self.wait_for_account(self.account_for(serial))
+            for serial in self.device_pool.devices()
+        ]
+        return max(1.0, min(waits, default=self.idle_wait))
+
+    async def publish_round(self) -> int:
+        """Publish one item on every device whose account may post, return the count"""
+        dropped = self.inventory.drop_stale()
+        if dropped:
+            self.log(f"🗑️ Dropped {dropped} items whose trend went stale")
+        published = 0
+        accounts = set()
+        for serial in await asyncio.to_thread(self.device_pool.devices):
+            account = self.account_for(serial)
+            if self._done() or account in accounts:
+                continue
+            if self.wait_for_account(account) > 0:
+                continue
+            if not self.device_pool.try_acquire(devices=[serial]):
+                continue
+            accounts.add(account)
+            try:
+                result = await self.publish_one(serial, account)
+            finally:
+                self.device_pool.release(serial)
+            if result is None:
+                self.log("📭 [yellow]The inventory is empty[/yellow]")
+                break
+            published += result
+        return published
+
+    async def publish_one(self, serial: str, account: str):
+        """Post the next item on a device: True when posted, None when nothing is left"""
+        from agents.duplicate_index import get_duplicate_index
+        from agents.image_backends import push_image
+
+        duplicates = get_duplicate_index()
+        while True:
+            item = self.inventory.claim_next()
+            if item is None:
+                return None
+            # Something similar may have been posted since the item was made
+            if duplicates and duplicates.find(item["twitter_post"], "post"):
+                self.inventory.drop(item["id"], "near duplicate of a posted tweet")
+                self.log(f"♻️ Dropped item {item['id']}, a similar tweet was posted")
+                continue
+            break
+
+        async with get_telemetry().span(
+            "publish", "stage", trace_id=item["run_id"], serial=serial, account=account
+        ):
+            try:
+                has_image = bool(item["image_path"] and os.path.exists(item["image_path"]))
+                if has_image:
+                    await push_image(item["image_path"], serial)
+                result = await self._post(item["twitter_post"], has_image, serial)
+                success = bool(result and result.get("success", False))
+                unknown = bool(not success and result and result.get("unknown"))
+                error = (result or {}).get("message", "not posted")
+            except asyncio.CancelledError:
+                # Post may already be tapped, never hand the item out again
+                self.inventory.mark_unknown(item["id"], account, "cancelled while posting")
+                raise
+            except Exception as e:
+                success, unknown, error = False, False, str(e)
+
+        if success or unknown:
+            if duplicates:
+                duplicates.add(item["twitter_post"], "post", item["run_id"])
+                if has_image and item["image_prompt"]:
+                    duplicates.add(item["image_prompt"], "image_prompt", item["run_id"])
+        if unknown:
+            self.inventory.mark_unknown(item["id"], account, error)
+            self.failed += 1
+            self.log(f"⚠️ [yellow]Item {item['id']} may be posted on {serial}: {error}[/yellow]")
+            return False
+        if not success:
+            self.inventory.release(item["id"], error)
+            self.failed += 1
+            self.log(f"❌ [red]Item {item['id']} not posted on {serial}: {error}[/red]")
+            return False
+
+        self.inventory.mark_posted(item["id"], account)
+        self.posted += 1
+        self.log(
+            f"✅ [green]Posted item {item['id']} as {account}:[/green] "
+            f"{item['trend'].get('trending_topic', 'Unknown')}"
+        )
+        return True
+
+    async def _post(self, post_content: str, has_image: bool, serial: str):
+        if self.post_fn:
+            return await self.post_fn(post_content, has_image, serial)
+        from agents.twitter_poster import post_to_twitter
+
+        return await post_to_twitter(post_content, has_image=has_image, serial=serial)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import asyncio
+import time
+
+from pipeline import (
+    REQUIRED_STAGES,
+    STAGES,
+    await_stage,
+    traced_stage,
+    complete_run,
+    fail_run,
+    new_run,
+    record_stage,
+)
+
+# Stages that drive the Android UI and need a leased device
+DEVICE_STAGES = ("trend", "image", "post")
+
+# Stages that must stay on the device of the stage before them, the image
+# is downloaded into the gallery of the device that posts it
+PINNED_STAGES = ("post",)
+
+
+class StageExecutor:
+    """Runs pipeline stages as independent workers connected by queues.
+
+    Every stage has its own queue and worker pool, so run N+1 can look for
+    trends while run N is still generating its image or posting. The trend
+    stage leases a device only for its own duration; image and post share
+    one lease so the downloaded image is posted from the same gallery.
+    """
+
+    def __init__(
+        self,
+        device_pool,
+        workers: dict = None,
+        max_in_flight: int = 4,
+        on_event=None,
+        on_complete=None,
+    ):
+        self.device_pool = device_pool
+        self.workers = {stage: 1 for stage in STAGES}
+        self.workers.update(workers or {})
+        self.on_event = on_event
+        self.on_complete = on_complete
+        self.queues = {stage: asyncio.Queue() for stage in STAGES}
+        self._slots = asyncio.Semaphore(max(1, max_in_flight))
+        self._worker_tasks = []
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def start(self):
+        """Start the worker pools of every stage"""
+        for stage in STAGES:
+            for _ in range(max(1, self.workers[stage])):
+                self._worker_tasks.append(asyncio.create_task(self._worker(stage)))
+
+    async def submit(self, run: dict = None) -> dict:
+        """Queue a new run, waiting while max_in_flight runs are in the pipeline"""
+        await self._slots.acquire()
+        run = run or new_run()
+        self._pending += 1
+        self._idle.clear()
+        await self.queues[STAGES[0]].put(run)
+        return run
+
+    async def drain(self):
+        """Wait until every submitted run has left the pipeline"""
+        await self._idle.wait()
+
+    async def stop(self):
+        """Cancel the workers, releasing the devices of runs still in flight"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._idle.set()
+
+    async def _worker(self, stage: str):
+        queue = self.queues[stage]
+        while True:
+            run = await queue.get()
+            try:
+                await self._execute(stage, run)
+            except asyncio.CancelledError:
+                record_stage(run, stage, "cancelled")
+                self._release(run)
+                raise
+            except Exception as e:
+                record_stage(run, stage, e)
+                fail_run(run)
+                self._finish(run)
+            finally:
+                queue.task_done()
+
+    async def _execute(self, stage: str, run: dict):
+        if stage in DEVICE_STAGES and not run["serial"]:
+            run["serial"] = await self.device_pool.acquire()
+
+        if self.on_event:
+            self.on_event("stage_start", stage, run, None)
+        started = time.monotonic()
+        _, error = await await_stage(
+            traced_stage(stage, run, self.device_pool), stage
+        )
+        record_stage(run, stage, error, time.monotonic() - started)
+        if self.on_event:
+            self.on_event("stage_end", stage, run, error)
+
+        next_index = STAGES.index(stage) + 1
+        if error and stage in REQUIRED_STAGES:
+            fail_run(run)
+            self._finish(run)
+        elif next_index == len(STAGES):
+            complete_run(run)
+            self._finish(run)
+        else:
+            next_stage = STAGES[next_index]
+            if next_stage not in PINNED_STAGES:
+                self._release(run)
+            await self.queues[next_stage].put(run)
+
+    def _release(self, run: dict):
+        if run["serial"]:
+            self.device_pool.release(run["serial"])
+            run["serial"] = None
+
+    def _finish(self, run: dict):
+        self._release(run)
+        self._slots.release()
+        self._pending -= 1
+        if self._pending == 0:
+            self._idle.set()
+        if self.on_complete:
+            self.on_complete(run)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+DEFAULT_TELEMETRY_DIR = os.path.join(os.getenv("AUTOX_STATE_DIR", ".autox"), "telemetry")
+
+# Upper bounds of the duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)
+
+# Counters that are summed from child spans into their parents
+ROLLUP_FIELDS = ("prompt_tokens", "completion_tokens", "llm_calls", "retries")
+
+_current_span = contextvars.ContextVar("autox_current_span", default=None)
+
+
+def current_span():
+    """Return the span the calling task runs in, or None"""
+    return _current_span.get()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    inner = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + inner + "}"
+
+
+def _usage_counts(response):
+    """Return (prompt_tokens, completion_tokens) from a llama_index response"""
+    raw = getattr(response, "raw", None)
+    if raw is None:
+        return 0, 0
+    usage = raw.get("usage_metadata") if isinstance(raw, dict) else getattr(
+        raw, "usage_metadata", None
+    )
+    if usage is None:
+        return 0, 0
+    if not isinstance(usage, dict):
+        usage = {
+            "prompt_token_count": getattr(usage, "prompt_token_count", 0),
+            "candidates_token_count": getattr(usage, "candidates_token_count", 0),
+        }
+    return (
+        usage.get("prompt_token_count") or 0,
+        usage.get("candidates_token_count") or 0,
+    )
+
+
+class Telemetry:
+    """Records spans for stages, agent runs and LLM calls.
+
+    Finished spans are appended to a JSONL trace and aggregated into a
+    Prometheus text file that the node_exporter textfile collector (or any
+    scraper reading the file) can pick up. Token counts, LLM calls and
+    retries roll up from child spans into their parents, so a stage span
+    carries the totals of everything that ran inside it.
+    """
+
+    def __init__(
+        self, trace_path: str = None, metrics_path: str = None, enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.trace_path = trace_path or os.getenv(
+            "AUTOX_TRACE_PATH", os.path.join(DEFAULT_TELEMETRY_DIR, "trace.jsonl")
+        )
+        self.metrics_path = metrics_path or os.getenv(
+            "AUTOX_METRICS_PATH", os.path.join(DEFAULT_TELEMETRY_DIR, "autox.prom")
+        )
+        for path in (self.trace_path, self.metrics_path):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._buckets = {}
+        self._tokens = {}
+        self._steps = {}
+        self._retries = {}
+        self._llm_handler_installed = False
+
+    @asynccontextmanager
+    async def span(self, name: str, kind: str, trace_id: str = None, **attributes):
+        """Time a block as a span, nested spans become its children"""
+        parent = _current_span.get()
+        span = {
+            "trace_id": trace_id
+            or (parent["trace_id"] if parent else uuid.uuid4().hex[:16]),
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_id": parent["span_id"] if parent else None,
+            "name": name,
+            "kind": kind,
+            "start": time.time(),
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "llm_calls": 0,
+            "retries": 0,
+        }
+        span.update(attributes)
+        token = _current_span.set(span)
+        started = time.monotonic()
+        span["status"] = "ok"
+        try:
+            yield span
+        except asyncio.CancelledError:
+            span["status"] = "cancelled"
+            raise
+        except Exception as e:
+            span["status"] = "error"
+            span["error"] = str(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span["duration"] = round(time.monotonic() - started, 4)
+            if parent:
+                for field in ROLLUP_FIELDS:
+                    parent[field] += span[field]
+            self._finish(span)
+
+    def record_llm_usage(self, response, span: dict = None):
+        """Add one LLM call and its token usage to a span (default: current)"""
+        span = span or _current_span.get()
+        if span is None:
+            return
+        prompt_tokens, completion_tokens = _usage_counts(response)
+        span["llm_calls"] += 1
+        span["prompt_tokens"] += prompt_tokens
+        span["completion_tokens"] += completion_tokens
+
+    def count_retry(self, reason: str = ""):
+        """Count a retry or fallback in the current span"""
+        span = _current_span.get()
+        if span is None:
+            return
+        span["retries"] += 1
+        if reason:
+            span.setdefault("retry_reasons", []).append(reason)
+        with self._lock:
+            key = (span["name"], reason)
+            self._retries[key] = self._retries.get(key, 0) + 1
+
+    def install_llm_handler(self):
+        """Count LLM calls made inside DroidAgent through llama_index events"""
+        if self._llm_handler_installed:
+            return
+        try:
+            from llama_index.core.instrumentation import get_dispatcher
+            from llama_index.core.instrumentation.event_handlers import (
+                BaseEventHandler,
+            )
+        except ImportError:
+            return
+        telemetry = self
+
+        class UsageEventHandler(BaseEventHandler):
+            @classmethod
+            def class_name(cls) -> str:
+                return "AutoXUsageEventHandler"
+
+            def handle(self, event, **kwargs):
+                if type(event).__name__ not in ("LLMChatEndEvent", "LLMCompletionEndEvent"):
+                    return
+                span = _current_span.get()
+                # Explicit llm spans record their own usage
+                if span is None or span["kind"] == "llm":
+                    return
+                telemetry.record_llm_usage(getattr(event, "response", None), span)
+
+        get_dispatcher().add_event_handler(UsageEventHandler())
+        self._llm_handler_installed = True
+
+    def _finish(self, span: dict):
+        if not self.enabled:
+            return
+        line = json.dumps(span, default=str) + "\n"
+        with self._lock:
+            with open(self.trace_path, "a") as f:
+                f.write(line)
+            self._aggregate(span)
+            self._write_metrics()
+
+    def _aggregate(self, span: dict):
+        key = (span["kind"], span["name"], span["status"])
+        count, total = self._spans.get(key, (0, 0.0))
+        self._spans[key] = (count + 1, total + span["duration"])
+
+        buckets = self._buckets.setdefault(
+            (span["kind"], span["name"]), [0] * (len(DURATION_BUCKETS) + 1)
+        )
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if span["duration"] <= bound:
+                buckets[index] += 1
+        buckets[-1] += 1
+
+        if span["kind"] in ("llm", "agent"):
+            # Count tokens once, where they were recorded, not in the rollups
+            model = span.get("model", "")
+            for kind in ("prompt", "completion"):
+                key = (model, kind)
+                self._tokens[key] = self._tokens.get(key, 0) + span[f"{kind}_tokens"]
+        if span.get("steps"):
+            self._steps[span["name"]] = self._steps.get(span["name"], 0) + span["steps"]
+
+    def _write_metrics(self):
+        lines = [
+            "# HELP autox_spans_total Finished spans by kind, name and status.",
+            "# TYPE autox_spans_total counter",
+        ]
+        for (kind, name, status), (count, _) in sorted(self._spans.items()):
+            lines.append(
+                f"autox_spans_total{_labels(kind=kind, name=name, status=status)} {count}"
+            )
+
+        lines += [
+            "# HELP autox_span_duration_seconds Span latency by kind and name.",
+            "# TYPE autox_span_duration_seconds histogram",
+        ]
+        for (kind, name), buckets in sorted(self._buckets.items()):
+            for bound, count in zip(DURATION_BUCKETS, buckets):
+                labels = _labels(kind=kind, name=name, le=bound)
+                lines.append(f"autox_span_duration_seconds_bucket{labels} {count}")
+            labels = _labels(kind=kind, name=name, le="+Inf")
+            lines.append(f"autox_span_duration_seconds_bucket{labels} {buckets[-1]}")
+            total = sum(
+                t for (k, n, _), (_, t) in self._spans.items() if (k, n) == (kind, name)
+            )
+            labels = _labels(kind=kind, name=name)
+            lines.append(f"autox_span_duration_seconds_sum{labels} {total:.4f}")
+            lines.append(f"autox_span_duration_seconds_count{labels} {buckets[-1]}")
+
+        lines += [
+            "# HELP autox_llm_tokens_total LLM tokens by model and type.",
+            "# TYPE autox_llm_tokens_total counter",
+        ]
+        for (model, kind), count in sorted(self._tokens.items()):
+            lines.append(f"autox_llm_tokens_total{_labels(model=model, type=kind)} {count}")
+
+        lines += [
+            "# HELP autox_agent_steps_total DroidAgent steps by span name.",
+            "# TYPE autox_agent_steps_total counter",
+        ]
+        for name, count in sorted(self._steps.items()):
+            lines.append(f"autox_agent_steps_total{_labels(name=name)} {count}")
+
+        lines += [
+            "# HELP autox_retries_total Retries and fallbacks by span name and reason.",
+            "# TYPE autox_retries_total counter",
+        ]
+        for (name, reason), count in sorted(self._retries.items()):
+            lines.append(f"autox_retries_total{_labels(name=name, reason=reason)} {count}")
+
+        tmp_path = f"{self.metrics_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.metrics_path)
+
+
+_default_telemetry = None
+
+
+def get_telemetry() -> Telemetry:
+    """Return the process-wide telemetry recorder"""
+    global _default_telemetry
+    if _default_telemetry is None:
+        enabled = os.getenv("AUTOX_TELEMETRY", "1").lower() not in ("0", "false", "no")
+        _default_telemetry = Telemetry(enabled=enabled)
+        if enabled:
+            _default_telemetry.install_llm_handler()
+    return _default_telemetry
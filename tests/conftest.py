@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Modules read AUTOX_STATE_DIR when imported, keep the tests' state out of .autox
+os.environ["AUTOX_STATE_DIR"] = tempfile.mkdtemp(prefix="autox-tests-")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+from benchmarks.fakes import install_fakes, write_fake_adb  # noqa: E402
+
+install_fakes()
+
+
+class FakeAdb:
+    """The fake adb of benchmarks.fakes, with access to the commands it received"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def commands(self) -> list:
+        try:
+            with open(self.path("adb.log")) as f:
+                return f.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+
+@pytest.fixture
+def fake_adb(tmp_path, monkeypatch):
+    import adb_helper
+
+    directory = str(tmp_path / "adb")
+    monkeypatch.setattr(adb_helper, "ADB_PATH", write_fake_adb(directory, devices=2))
+    return FakeAdb(directory)
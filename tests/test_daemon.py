@@ -0,0 +1,54 @@
+import asyncio
+import io
+import subprocess
+
+import pytest
+from rich.console import Console
+
+from daemon import PipelineDaemon
+
+
+class FlakyPool:
+    """A device pool whose first leases fail like a missing or crashing adb"""
+
+    def __init__(self, errors: list):
+        self.errors = errors
+        self.released = []
+
+    async def acquire(self, timeout=None, exclude=(), prefer=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        return "emulator-5554"
+
+    def release(self, serial):
+        self.released.append(serial)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        FileNotFoundError("adb"),
+        subprocess.CalledProcessError(1, ["adb", "devices"]),
+        RuntimeError("No connected Android devices found"),
+    ],
+)
+def test_device_errors_back_off_instead_of_stopping(error):
+    pool = FlakyPool([error])
+
+    async def run_fn(serial):
+        return {"status": "completed", "errors": {}}
+
+    daemon = PipelineDaemon(
+        pool, max_runs=1, run_fn=run_fn, console=Console(file=io.StringIO())
+    )
+    backoffs = []
+
+    async def sleep(seconds):
+        backoffs.append(seconds)
+
+    daemon._sleep = sleep
+    asyncio.run(daemon._schedule_runs())
+
+    assert 30 in backoffs
+    assert daemon.completed == 1
+    assert pool.released == ["emulator-5554"]
@@ -0,0 +1,25 @@
+from agents import duplicate_index
+from agents.duplicate_index import DuplicateIndex
+
+POST = "Solar storms light up northern skies tonight as auroras reach far south #Aurora"
+
+
+def test_reworded_post_is_found(tmp_path):
+    index = DuplicateIndex(str(tmp_path / "index.sqlite3"))
+    index.add(POST, "post", "run-1")
+    index.add("Markets rally after the central bank holds rates steady #Economy", "post")
+
+    match = index.find(POST.replace("tonight", "this evening"))
+
+    assert match["run_id"] == "run-1"
+    assert index.find(POST, "image_prompt") is None
+
+
+def test_lookup_reads_only_the_newest_documents_of_a_bucket(tmp_path, monkeypatch):
+    monkeypatch.setattr(duplicate_index, "BUCKET_LIMIT", 2)
+    index = DuplicateIndex(str(tmp_path / "index.sqlite3"))
+    # Posts that share every bucket with the checked one fill them up
+    for run in range(5):
+        index.add(POST, "post", f"run-{run}")
+
+    assert index.find(POST)["run_id"] in ("run-3", "run-4")
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from agents import find_trend
+from agents.trend_cache import TrendCache
+from pipeline import fail_run, new_run
+
+TRENDS = [{"trending_topic": "first"}, {"trending_topic": "second"}]
+
+
+class CountingSource:
+    def __init__(self):
+        self.fetches = 0
+
+    async def fetch(self, serial=None):
+        self.fetches += 1
+        return [dict(trend) for trend in TRENDS]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = TrendCache(str(tmp_path / "trends.sqlite3"), ttl=900)
+    monkeypatch.setattr(find_trend, "get_trend_cache", lambda: cache)
+    monkeypatch.setattr("pipeline.get_trend_cache", lambda: cache)
+    return cache
+
+
+def test_fully_claimed_fresh_list_is_not_fetched_again(cache, monkeypatch):
+    source = CountingSource()
+    monkeypatch.setattr(find_trend, "get_trend_source", lambda: source)
+
+    topics = [asyncio.run(find_trend.find_trend()) for _ in range(3)]
+
+    assert [t and t["trending_topic"] for t in topics] == ["first", "second", None]
+    assert source.fetches == 1
+
+
+def test_failed_run_releases_its_trend(cache):
+    cache.put_trends(TRENDS)
+    run = new_run("bench-000")
+    run["trend_data"] = cache.claim_next(TRENDS)
+
+    fail_run(run)
+
+    assert cache.claim_next(TRENDS)["trending_topic"] == "first"
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from agents import content_generator
+from agents.content_generator import ContentGenerator
+from agents.generation_cache import GenerationCache
+from agents.prompts.prompts import CREATE_IMAGE_PROMPT_FROM_TREND_PROMPT
+
+POST = "Solar storms light up northern skies tonight as auroras reach far south #Aurora"
+FITTING_PROMPT = "Aurora solar storms over northern skies, glowing green curtains"
+UNRELATED_PROMPT = "Aurora logo on a plain white background"
+REGENERATED_PROMPT = "Green aurora curtains over a snowy northern town at night"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return GenerationCache(str(tmp_path / "cache.sqlite3"), ttl=3600, variants=3)
+
+
+def test_repeated_generation_counts_towards_variants(cache):
+    for _ in range(2):
+        cache.put("key", "same text")
+        assert cache.get("key") is None
+
+    cache.put("key", "same text")
+
+    assert cache.get("key") == "same text"
+
+
+def generator_with_prompt(cache, monkeypatch, image_prompt: str):
+    async def route(task, call, accept):
+        return image_prompt
+
+    async def generate_twitter_post(self, trending_topic, description="", category=""):
+        return POST
+
+    async def generate_image_prompt(self, trending_topic, twitter_post):
+        assert twitter_post == POST
+        return REGENERATED_PROMPT
+
+    monkeypatch.setattr(content_generator, "route", route)
+    monkeypatch.setattr(ContentGenerator, "generate_twitter_post", generate_twitter_post)
+    monkeypatch.setattr(ContentGenerator, "generate_image_prompt", generate_image_prompt)
+    return ContentGenerator(mode="concurrent", cache=cache)
+
+
+@pytest.mark.parametrize(
+    "image_prompt, fits", [(FITTING_PROMPT, True), (UNRELATED_PROMPT, False)]
+)
+def test_speculative_prompt_is_cached_only_when_it_fits(cache, monkeypatch, image_prompt, fits):
+    generator = generator_with_prompt(cache, monkeypatch, image_prompt)
+    key = generator._cache_key(CREATE_IMAGE_PROMPT_FROM_TREND_PROMPT, "Aurora", "science")
+
+    for _ in range(cache.variants):
+        content = asyncio.run(generator._generate_concurrent("Aurora", "", "science"))
+        assert content == (POST, image_prompt if fits else REGENERATED_PROMPT)
+
+    assert (cache.get(key) == image_prompt) is fits
@@ -0,0 +1,104 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+
+import pytest
+
+from agents.image_backends import (
+    FallbackImageBackend,
+    HttpImageBackend,
+    ImageBackend,
+    archive_image,
+    parse_image_response,
+)
+from benchmarks import fakes
+from benchmarks.fakes import FAKE_PNG, FakeConfig, FakeImageServer
+
+SERIAL = "bench-001"
+ENCODED = base64.b64encode(FAKE_PNG).decode()
+
+
+@pytest.fixture
+def image_server(monkeypatch):
+    monkeypatch.setattr(fakes, "config", FakeConfig(llm_latency=0))
+    server = FakeImageServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_parse_raw_image_body():
+    assert parse_image_response(FAKE_PNG, "image/jpeg; charset=binary") == (FAKE_PNG, "image/jpeg")
+
+
+@pytest.mark.parametrize("key, mime_key", [("inlineData", "mimeType"), ("inline_data", "mime_type")])
+def test_parse_gemini_inline_data(key, mime_key):
+    parts = [{"text": "Here is your image"}, {key: {mime_key: "image/webp", "data": ENCODED}}]
+    body = json.dumps({"candidates": [{"content": {"parts": parts}}]}).encode()
+
+    assert parse_image_response(body, "application/json") == (FAKE_PNG, "image/webp")
+
+
+def test_parse_b64_json():
+    body = json.dumps({"data": [{"b64_json": ENCODED}]}).encode()
+
+    assert parse_image_response(body, "application/json") == (FAKE_PNG, "image/png")
+
+
+def test_parse_response_without_image():
+    body = json.dumps({"candidates": [{"content": {"parts": [{"text": "blocked"}]}}]}).encode()
+
+    with pytest.raises(ValueError):
+        parse_image_response(body, "application/json")
+
+
+def test_archive_image_writes_file_and_index(tmp_path):
+    path = archive_image(FAKE_PNG, "image/jpeg", "a cat", str(tmp_path))
+
+    assert path.endswith(".jpg")
+    with open(path, "rb") as f:
+        assert f.read() == FAKE_PNG
+    with open(tmp_path / "index.jsonl") as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 1
+    assert records[0]["path"] == path
+    assert records[0]["sha256"] == hashlib.sha256(FAKE_PNG).hexdigest()
+    assert records[0]["bytes"] == len(FAKE_PNG)
+    assert records[0]["prompt"] == "a cat"
+
+
+def test_http_backend_pushes_the_image_into_the_gallery(tmp_path, fake_adb, image_server):
+    backend = HttpImageBackend(url=image_server.url, archive_dir=str(tmp_path / "images"))
+
+    result = asyncio.run(backend.generate("a cat", serial=SERIAL))
+
+    assert result["success"]
+    name = os.path.basename(result["path"])
+    assert os.path.dirname(result["path"]) == str(tmp_path / "images")
+    device_path = f"/sdcard/Pictures/AutoX/{name}"
+    assert result["device_path"] == device_path
+    assert fake_adb.commands() == [
+        f"-s {SERIAL} shell mkdir -p /sdcard/Pictures/AutoX",
+        f"-s {SERIAL} push {result['path']} {device_path}",
+        f"-s {SERIAL} shell am broadcast -a android.intent.action.MEDIA_SCANNER_SCAN_FILE "
+        f"-d file://{device_path}",
+    ]
+
+
+class StaticBackend(ImageBackend):
+    name = "static"
+
+    async def generate(self, image_prompt, serial=None):
+        return {"success": True, "message": "static image"}
+
+
+def test_failed_api_falls_back_to_the_next_backend(tmp_path, fake_adb, image_server):
+    fakes.config.llm_failure_rate = 1.0
+    http = HttpImageBackend(url=image_server.url, archive_dir=str(tmp_path / "images"))
+
+    result = asyncio.run(FallbackImageBackend([http, StaticBackend()]).generate("a cat", SERIAL))
+
+    assert result == {"success": True, "message": "static image"}
+    assert fake_adb.commands() == []
@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+import pipeline
+from checkpoints import CheckpointStore
+from pipeline import pending_stages, run_pipeline
+from stage_executor import StageExecutor
+
+
+class FakePool:
+    def __init__(self):
+        self.leased = []
+
+    async def acquire(self, timeout=None, exclude=(), prefer=None):
+        self.leased.append("emulator-5554")
+        return "emulator-5554"
+
+    def try_acquire(self, exclude=(), devices=None):
+        return None
+
+    def release(self, serial):
+        self.leased.remove(serial)
+
+
+class HangingPoster:
+    """Taps Post and then hangs, so cancelling it leaves the outcome unknown"""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = asyncio.Event()
+
+    async def __call__(self, post_content, has_image=True, serial=None):
+        self.calls += 1
+        self.started.set()
+        await asyncio.sleep(3600)
+
+
+@pytest.fixture
+def checkpoints(tmp_path, monkeypatch):
+    store = CheckpointStore(str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(pipeline, "get_checkpoint_store", lambda: store)
+    monkeypatch.setattr(pipeline, "get_trend_cache", lambda: None)
+    monkeypatch.setattr(pipeline, "save_run_history", lambda run: None)
+    return store
+
+
+@pytest.fixture
+def poster(monkeypatch):
+    async def trend_stage(run):
+        run["trend_data"] = {"trending_topic": "Aurora"}
+
+    async def content_stage(run):
+        run["generated_content"] = {"twitter_post": "Auroras tonight", "image_prompt": ""}
+
+    async def image_stage(run):
+        run["image_generated"] = False
+
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, "trend", trend_stage)
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, "content", content_stage)
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, "image", image_stage)
+    poster = HangingPoster()
+    monkeypatch.setattr("agents.twitter_poster.post_to_twitter", poster)
+    return poster
+
+
+async def cancel_during_post(coro, poster):
+    task = asyncio.ensure_future(coro)
+    await poster.started.wait()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def assert_not_posted_again(checkpoints, poster):
+    run = checkpoints.load(checkpoints.latest())
+    assert run["post_unknown"]
+    assert pending_stages(run) == []
+
+    run = asyncio.run(run_pipeline("emulator-5554", run=run))
+
+    assert poster.calls == 1
+    assert run["status"] == "completed"
+    assert checkpoints.latest() is None
+
+
+def test_resuming_a_run_cancelled_during_post_does_not_post_again(checkpoints, poster):
+    asyncio.run(cancel_during_post(run_pipeline("emulator-5554"), poster))
+
+    assert_not_posted_again(checkpoints, poster)
+
+
+def test_stopping_the_executor_during_post_checkpoints_the_unknown_post(checkpoints, poster):
+    pool = FakePool()
+
+    async def run_and_stop():
+        executor = StageExecutor(pool)
+        executor.start()
+        await executor.submit()
+        await poster.started.wait()
+        await executor.stop()
+
+    asyncio.run(run_and_stop())
+
+    assert pool.leased == []
+    assert_not_posted_again(checkpoints, poster)
+
+
+def test_post_that_may_be_out_is_not_resumable(checkpoints, poster, monkeypatch):
+    async def post_to_twitter(post_content, has_image=True, serial=None):
+        return {"success": False, "unknown": True, "message": "the tweet may be posted"}
+
+    released = []
+
+    class TrendCache:
+        def release(self, trending_topic):
+            released.append(trending_topic)
+
+    monkeypatch.setattr("agents.twitter_poster.post_to_twitter", post_to_twitter)
+    monkeypatch.setattr(pipeline, "get_trend_cache", TrendCache)
+
+    run = asyncio.run(run_pipeline("emulator-5554"))
+
+    assert run["post_unknown"] and not run["twitter_posted"]
+    assert pending_stages(run) == []
+    assert checkpoints.latest() is None
+    assert released == []
+
+
+@pytest.mark.parametrize("backends, hedged", [("agent", False), ("http,agent", True)])
+def test_images_are_hedged_only_with_a_host_backend(monkeypatch, backends, hedged):
+    leases = []
+
+    class Pool(FakePool):
+        def try_acquire(self, exclude=(), devices=None):
+            leases.append(exclude)
+            return None
+
+    async def image_stage(run):
+        await asyncio.sleep(0.05)
+        run["image_generated"] = True
+
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, "image", image_stage)
+    monkeypatch.setattr(pipeline, "hedge_delay", lambda stage: 0.01)
+    monkeypatch.setenv("AUTOX_IMAGE_BACKENDS", backends)
+    monkeypatch.setattr("agents.image_backends._default_backend", None)
+    run = pipeline.new_run("emulator-5554")
+
+    asyncio.run(pipeline.hedged_stage("image", run, Pool()))
+
+    assert run["image_generated"]
+    assert leases == ([("emulator-5554",)] if hedged else [])
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from agents import replay
+from agents.replay import ReplayEngine, replay_or_none
+
+SERIAL = "bench-000"
+POST = "Hello from AutoX"
+
+SCREEN_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<hierarchy rotation="0">
+  <node text="What's happening?" resource-id="" package="com.twitter.android"
+        content-desc="" bounds="[0,200][1080,600]" />
+  <node text="Post" resource-id="com.twitter.android:id/button_tweet"
+        package="com.twitter.android" content-desc="" bounds="[850,100][1050,180]" />
+</hierarchy>
+"""
+
+
+def tap(label):
+    return {"action_type": "tap", "x": 10, "y": 10, "element_text": label}
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch, fake_adb):
+    with open(fake_adb.path(f"ui-{SERIAL}.xml"), "w") as f:
+        f.write(SCREEN_XML)
+    engine = ReplayEngine(str(tmp_path / "recordings"), step_delay=0, checkpoint_timeout=0)
+    monkeypatch.setenv("AUTOX_REPLAY", "1")
+    monkeypatch.setattr(replay, "_default_engine", engine)
+    return engine
+
+
+def record(engine, taps):
+    # The post is typed after the first tap, into the composer
+    actions = taps[:1] + [{"action_type": "input_text", "text": POST}] + taps[1:]
+    assert asyncio.run(
+        engine.record("post_to_twitter_text", SERIAL, actions, {"post_content": POST})
+    )
+
+
+def replay_post():
+    return asyncio.run(
+        replay_or_none(
+            "post_to_twitter_text", {"post_content": POST}, SERIAL, commit_labels=("post",)
+        )
+    )
+
+
+def test_mismatch_before_the_post_tap_hands_over_to_the_agent(engine, fake_adb):
+    record(engine, [tap("What's happening?"), tap("Drafts"), tap("Post")])
+
+    assert replay_post() is None
+    assert not any("input tap 950 140" in command for command in fake_adb.commands())
+
+
+def test_mismatch_after_the_post_tap_never_hands_over(engine, fake_adb):
+    record(engine, [tap("What's happening?"), tap("Post"), tap("Got it")])
+
+    result = replay_post()
+
+    assert result == {
+        "success": False,
+        "unknown": True,
+        "message": "Replay of post_to_twitter_text unconfirmed: "
+        "step 4 of post_to_twitter_text: 'Got it' is not on the screen",
+    }
+    assert f"-s {SERIAL} shell input tap 950 140" in fake_adb.commands()
+
+
+def test_replay_without_its_outcome_is_not_a_success(engine):
+    steps = [{"action_type": "input_text", "text": "a cat"}, tap("Post")]
+    assert asyncio.run(engine.record("generate_image", SERIAL, steps, {"image_prompt": "a cat"}))
+
+    result = asyncio.run(
+        replay_or_none("generate_image", {"image_prompt": "a cat"}, SERIAL, verify=lambda: False)
+    )
+
+    assert result is None
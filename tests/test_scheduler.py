@@ -0,0 +1,98 @@
+import asyncio
+import io
+
+import pytest
+from rich.console import Console
+
+from inventory import ContentInventory
+from scheduler import PostScheduler
+
+SERIAL = "emulator-5554"
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    inventory = ContentInventory(str(tmp_path / "inventory.sqlite3"))
+    inventory.add(
+        {
+            "run_id": "run-1",
+            "trend_data": {"trending_topic": "Aurora"},
+            "generated_content": {"twitter_post": "Auroras tonight", "image_prompt": ""},
+        }
+    )
+    return inventory
+
+
+def scheduler_posting(inventory, result):
+    calls = []
+
+    async def post_fn(post_content, has_image, serial):
+        calls.append(post_content)
+        return result
+
+    scheduler = PostScheduler(
+        None,
+        inventory=inventory,
+        post_times=[],
+        post_fn=post_fn,
+        console=Console(file=io.StringIO()),
+    )
+    return scheduler, calls
+
+
+def test_failed_post_is_retried(inventory, monkeypatch):
+    monkeypatch.setattr("agents.duplicate_index.get_duplicate_index", lambda: None)
+    scheduler, calls = scheduler_posting(inventory, {"success": False, "message": "no"})
+
+    for _ in range(2):
+        asyncio.run(scheduler.publish_one(SERIAL, SERIAL))
+
+    assert len(calls) == 2
+    assert inventory.counts() == {"ready": 1}
+
+
+def test_post_that_may_be_out_is_never_posted_again(inventory, monkeypatch):
+    monkeypatch.setattr("agents.duplicate_index.get_duplicate_index", lambda: None)
+    result = {"success": False, "unknown": True, "message": "the tweet may be posted"}
+    scheduler, calls = scheduler_posting(inventory, result)
+
+    assert asyncio.run(scheduler.publish_one(SERIAL, SERIAL)) is False
+    assert asyncio.run(scheduler.publish_one(SERIAL, SERIAL)) is None
+
+    assert len(calls) == 1
+    assert inventory.counts() == {"unknown": 1}
+    assert len(inventory.post_times(SERIAL, 0)) == 1
+
+
+def test_fill_skips_a_trend_whose_content_fails(tmp_path, monkeypatch):
+    import pipeline
+    from device_pool import DevicePool
+    from scheduler import fill_inventory
+
+    topics = iter(["Broken", "Aurora"])
+
+    async def trend_stage(run):
+        run["trend_data"] = {"trending_topic": next(topics, None)}
+        if run["trend_data"]["trending_topic"] is None:
+            run["trend_data"] = None
+            raise pipeline.StageError("Failed to find trending topics")
+
+    async def content_stage(run):
+        if run["trend_data"]["trending_topic"] == "Broken":
+            raise ValueError("No valid tweet after 2 attempts")
+        run["generated_content"] = {"twitter_post": "Auroras tonight", "image_prompt": ""}
+
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, "trend", trend_stage)
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, "content", content_stage)
+    monkeypatch.setattr("scheduler.get_trend_cache", lambda: None)
+    monkeypatch.setenv("AUTOX_IMAGE_BACKENDS", "agent")
+    monkeypatch.setattr("agents.image_backends._default_backend", None)
+    inventory = ContentInventory(str(tmp_path / "inventory.sqlite3"))
+    pool = DevicePool([SERIAL], lock_dir=str(tmp_path / "locks"))
+    logs = []
+
+    added = asyncio.run(fill_inventory(pool, 3, inventory, logs.append))
+
+    assert added == 1
+    assert "Skipped Broken: No valid tweet after 2 attempts" in logs
+    assert logs[-1] == "Stopped filling the inventory: Failed to find trending topics"
@@ -0,0 +1,24 @@
+import json
+import os
+
+from agents.trajectory_store import TrajectoryStore
+
+
+def write_trajectory(directory, goal):
+    os.makedirs(directory)
+    with open(os.path.join(directory, "macro.json"), "w") as f:
+        json.dump({"description": goal, "actions": [{"action_type": "tap", "x": 1, "y": 2}]}, f)
+
+
+def test_ingest_new_takes_only_the_agents_own_trajectory(tmp_path):
+    source = tmp_path / "trajectories"
+    own_goal = 'Post "Hello"\nwith the image ✨'
+    write_trajectory(source / "20260101_own", own_goal)
+    write_trajectory(source / "20260101_other", "Find the top 5 trending topics")
+    store = TrajectoryStore(str(tmp_path / "store"))
+
+    ingested = store.ingest_new(str(source), 0, "post_to_twitter", "bench-000", goal=own_goal)
+
+    assert len(ingested) == 1
+    assert store.load(ingested[0])["actions"]["macro.json"]["description"] == own_goal
+    assert os.listdir(source) == ["20260101_other"]
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from agents.trend_sources import FeedTrendSource, parse_trends_feed
+
+RSS_FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss xmlns:ht="https://trends.google.com/trending/rss" version="2.0">
+  <channel>
+    <title>Daily Search Trends</title>
+    <item>
+      <title>droidrun</title>
+      <ht:approx_traffic>50K+</ht:approx_traffic>
+      <ht:news_item>
+        <ht:news_item_title>Phones now use themselves</ht:news_item_title>
+      </ht:news_item>
+      <ht:news_item>
+        <ht:news_item_title>An older story</ht:news_item_title>
+      </ht:news_item>
+    </item>
+    <item>
+      <title>eclipse</title>
+      <category>Science</category>
+    </item>
+  </channel>
+</rss>
+"""
+
+JSON_FEED = b")]}',\n" + json.dumps(
+    {
+        "default": {
+            "trendingSearchesDays": [
+                {
+                    "trendingSearches": [
+                        {
+                            "title": {"query": "world cup"},
+                            "formattedTraffic": "2M+",
+                            "articles": [{"title": "Final tonight"}],
+                        },
+                        {"title": {"query": ""}},
+                        {"title": {"query": "eclipse"}, "articles": []},
+                    ]
+                }
+            ]
+        }
+    }
+).encode()
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Sun, 18 Oct 2026 08:00:00 GMT"
+
+
+class FeedServer:
+    """Serves one feed with an ETag and Last-Modified, 304 when the client has it"""
+
+    def __init__(self, body: bytes, content_type: str, etag: str = ETAG):
+        self.body = body
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                if etag:
+                    unchanged = self.headers.get("If-None-Match") == etag
+                else:
+                    unchanged = self.headers.get("If-Modified-Since") == LAST_MODIFIED
+                if unchanged:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Last-Modified", LAST_MODIFIED)
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        host, port = self._server.server_address
+        self.url = f"http://{host}:{port}/trends"
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(*args, **kwargs):
+        servers.append(FeedServer(*args, **kwargs))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_rss_feed():
+    assert parse_trends_feed(RSS_FEED) == [
+        {
+            "trending_topic": "droidrun",
+            "description": "50K+ searches: Phones now use themselves",
+            "category": "",
+        },
+        {"trending_topic": "eclipse", "description": "", "category": "Science"},
+    ]
+
+
+def test_json_feed():
+    assert parse_trends_feed(JSON_FEED) == [
+        {"trending_topic": "world cup", "description": "2M+ searches: Final tonight", "category": ""},
+        {"trending_topic": "eclipse", "description": "", "category": ""},
+    ]
+
+
+@pytest.mark.parametrize(
+    "body, content_type", [(RSS_FEED, "application/rss+xml"), (JSON_FEED, "application/json")]
+)
+def test_feed_source_fetches_either_format(serve, body, content_type):
+    server = serve(body, content_type)
+
+    trends = asyncio.run(FeedTrendSource(server.url).fetch())
+
+    assert trends == parse_trends_feed(body)
+
+
+def test_unchanged_feed_is_served_from_the_last_parse(serve):
+    server = serve(RSS_FEED, "application/rss+xml")
+    source = FeedTrendSource(server.url)
+
+    first = asyncio.run(source.fetch())
+    server.body = b"<rss><channel><item><title>changed</title></item></channel></rss>"
+    second = asyncio.run(source.fetch())
+
+    assert second == first
+    assert source.not_modified == 1
+    assert "If-None-Match" not in server.requests[0]
+    assert server.requests[1]["If-None-Match"] == ETAG
+    assert server.requests[1]["If-Modified-Since"] == LAST_MODIFIED
+
+
+def test_if_modified_since_without_etag(serve):
+    server = serve(JSON_FEED, "application/json", etag=None)
+    source = FeedTrendSource(server.url)
+
+    first = asyncio.run(source.fetch())
+    second = asyncio.run(source.fetch())
+
+    assert second == first
+    assert source.not_modified == 1
+    assert "If-None-Match" not in server.requests[1]
+    assert server.requests[1]["If-Modified-Since"] == LAST_MODIFIED
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import sys
+
+import pytest
+
+from adb_helper import share_intent
+from agents import twitter_poster
+
+SERIAL = "bench-000"
+
+COMPOSER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<hierarchy rotation="0">
+  <node text="Hello from AutoX #AI" resource-id="com.twitter.android:id/tweet_text"
+        package="com.twitter.android" content-desc="" bounds="[0,200][1080,600]" />
+  <node text="Post" resource-id="com.twitter.android:id/button_tweet"
+        package="com.twitter.android" content-desc="" bounds="[850,100][1050,180]" />
+</hierarchy>
+"""
+
+
+class ScriptedAgent:
+    """DroidAgent whose confirmation fails and whose full posting flow succeeds"""
+
+    goals = []
+
+    def __init__(self, goal: str, **kwargs):
+        self.goal = goal
+
+    async def run(self) -> dict:
+        ScriptedAgent.goals.append(self.goal)
+        if "already open" in self.goal:
+            return {"success": False, "reason": "lost track after tapping", "steps": 3}
+        output = json.dumps({"success": True, "message": "posted"})
+        return {"success": True, "output": output, "steps": 8}
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    ScriptedAgent.goals = []
+    monkeypatch.setattr(sys.modules["droidrun"], "DroidAgent", ScriptedAgent)
+    monkeypatch.setenv("AUTOX_TRAJECTORIES", "0")
+    return ScriptedAgent
+
+
+def test_prefilled_composer_sends_the_share_intent(fake_adb):
+    opened = asyncio.run(
+        twitter_poster.open_prefilled_composer("Error rates are down", True, SERIAL)
+    )
+
+    assert opened
+    start = [c for c in fake_adb.commands() if " am start " in c]
+    assert len(start) == 1
+    assert start[0].startswith(f"-s {SERIAL} shell am start -W -a android.intent.action.SEND")
+    assert "-t image/* --es android.intent.extra.TEXT 'Error rates are down'" in start[0]
+    # The newest gallery image of the fake is _id 42
+    assert (
+        "--eu android.intent.extra.STREAM content://media/external/images/media/42 "
+        "--grant-read-uri-permission -p com.twitter.android"
+    ) in start[0]
+    assert f"-s {SERIAL} shell dumpsys window windows" in fake_adb.commands()
+
+
+def test_share_intent_fails_on_am_exit_status(fake_adb):
+    open(fake_adb.path("no-activity"), "w").close()
+
+    with pytest.raises(RuntimeError, match="unable to resolve Intent"):
+        share_intent(twitter_poster.TWITTER_PACKAGE, "hello", serial=SERIAL)
+    assert not asyncio.run(twitter_poster.open_prefilled_composer("hello", False, SERIAL))
+
+
+def test_failed_confirmation_does_not_post_again(fake_adb, agent):
+    # The composer left the screen: the confirm agent may have posted already
+    result = asyncio.run(
+        twitter_poster.post_to_twitter("Hello from AutoX #AI", has_image=False, serial=SERIAL)
+    )
+
+    assert not result["success"]
+    assert result["unknown"]
+    assert len(agent.goals) == 1
+    assert f"-s {SERIAL} exec-out uiautomator dump /dev/tty" in fake_adb.commands()
+
+
+def test_failed_confirmation_falls_back_while_composer_is_open(fake_adb, agent):
+    with open(fake_adb.path(f"ui-{SERIAL}.xml"), "w") as f:
+        f.write(COMPOSER_XML)
+
+    result = asyncio.run(
+        twitter_poster.post_to_twitter("Hello from AutoX #AI", has_image=False, serial=SERIAL)
+    )
+
+    assert result["success"]
+    assert len(agent.goals) == 2
+    assert "Open Twitter/X app" in agent.goals[1]